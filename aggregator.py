@@ -0,0 +1,168 @@
+import sys
+from array import array
+from typing import Dict, ItemsView, Iterable, Mapping
+
+# Largest number of words counted in a dense matrix, larger word sets use sparse rows per user
+DENSE_WORD_LIMIT = 64
+
+
+class WordCountAggregator:
+    """
+    Compact accumulator of word counts per user for scans.
+
+    Words are interned to small integer IDs and users to dense indexes. For up to
+    `DENSE_WORD_LIMIT` words, the counts are one flat array with a row of a fixed number of
+    counts per user, which avoids a dictionary per user and an object per count. Larger word
+    sets are mostly sparse per user, so the counts are then kept in one dictionary of word IDs
+    per user instead.
+
+    It offers the read interface of the nested `{user_id: {word: count}}` dictionaries used
+    elsewhere, so it can be passed to `update_word_counts` directly.
+    """
+
+    __slots__ = ('_word_ids', '_words', '_user_indexes', '_dense', '_sparse')
+
+    def __init__(self, words: Iterable[str] = ()):
+        """
+        Initializes an empty aggregator.
+
+        Args:
+            words (Iterable[str], optional): The words to intern up front, usually the scanned
+                words. Other words are interned when first added. Defaults to ().
+        """
+        self._word_ids = {}
+        self._words = []
+        self._user_indexes = {}
+        self._dense = array('I')
+        self._sparse = None
+        for word in words:
+            self._word_id(word)
+
+    def __len__(self) -> int:
+        """
+        Gets the number of users with counts.
+
+        Returns:
+            int: The number of users.
+        """
+        return len(self._user_indexes)
+
+    def _word_id(self, word: str) -> int:
+        """
+        Gets the ID of a word, interning it and widening the rows if it is new.
+
+        Args:
+            word (str): The word.
+
+        Returns:
+            int: The word ID.
+        """
+        word_id = self._word_ids.get(word)
+        if word_id is not None:
+            return word_id
+        word_id = self._word_ids[word] = len(self._words)
+        self._words.append(sys.intern(word))
+        if self._sparse is not None:
+            return word_id
+        # The previous words are the width of the rows
+        rows = [self._dense[user_index * word_id:(user_index + 1) * word_id]
+                for user_index in range(len(self._user_indexes))]
+        if len(self._words) > DENSE_WORD_LIMIT:
+            self._sparse = [{column: count for column, count in enumerate(row) if count} for row in rows]
+            self._dense = None
+        elif rows:
+            self._dense = array('I')
+            for row in rows:
+                self._dense.extend(row)
+                self._dense.append(0)
+        return word_id
+
+    def _user_index(self, user_id: int) -> int:
+        """
+        Gets the index of a user, adding an empty row if the user is new.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: The user index.
+        """
+        user_index = self._user_indexes.get(user_id)
+        if user_index is not None:
+            return user_index
+        user_index = self._user_indexes[user_id] = len(self._user_indexes)
+        if self._sparse is None:
+            self._dense.frombytes(bytes(self._dense.itemsize * len(self._words)))
+        else:
+            self._sparse.append({})
+        return user_index
+
+    def add(self, user_id: int, word: str, count: int) -> None:
+        """
+        Adds to the count of a user and word.
+
+        Args:
+            user_id (int): The ID of the user.
+            word (str): The word.
+            count (int): The count to add.
+        """
+        word_id = self._word_id(word)
+        user_index = self._user_index(user_id)
+        if self._sparse is None:
+            self._dense[user_index * len(self._words) + word_id] += count
+        else:
+            row = self._sparse[user_index]
+            row[word_id] = row.get(word_id, 0) + count
+
+    def merge(self, word_counts: Mapping[int, Mapping[str, int]]) -> None:
+        """
+        Adds nested counts, e.g. the partial counts of a matched batch.
+
+        Args:
+            word_counts (Mapping[int, Mapping[str, int]]): The counts per word for each user ID.
+        """
+        for user_id, user_word_counts in word_counts.items():
+            for word, count in user_word_counts.items():
+                self.add(user_id, word, count)
+
+    def get(self, user_id: int, word: str) -> int:
+        """
+        Gets the count of a user and word.
+
+        Args:
+            user_id (int): The ID of the user.
+            word (str): The word.
+
+        Returns:
+            int: The count, 0 if the user never said the word.
+        """
+        user_index = self._user_indexes.get(user_id)
+        word_id = self._word_ids.get(word)
+        if user_index is None or word_id is None:
+            return 0
+        if self._sparse is None:
+            return self._dense[user_index * len(self._words) + word_id]
+        return self._sparse[user_index].get(word_id, 0)
+
+    def items(self) -> ItemsView[int, Dict[str, int]]:
+        """
+        Gets the counts grouped per user, like `dict.items` of nested dictionaries.
+
+        The nested dictionaries are built on every call, so this is meant for writing the
+        result, not for lookups while counting.
+
+        Returns:
+            ItemsView[int, Dict[str, int]]: The counts per word for each user ID.
+        """
+        words = self._words
+        stride = len(words)
+        word_counts = {}
+        for user_id, user_index in self._user_indexes.items():
+            if self._sparse is None:
+                row = enumerate(self._dense[user_index * stride:(user_index + 1) * stride])
+            else:
+                row = self._sparse[user_index].items()
+            user_word_counts = {words[word_id]: count for word_id, count in row if count}
+            if user_word_counts:
+                word_counts[user_id] = user_word_counts
+        return word_counts.items()
@@ -0,0 +1,167 @@
+"""
+Benchmarks full, per-user, per-word and multi-word scans against a synthetic Discord history.
+
+Usage:
+    python -m benchmarks.bench_scan --messages 20000 --words 200 --unicode-ratio 0.1
+
+The benchmark uses a temporary SQLite database, the configured bot database is never touched.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from functools import wraps
+
+_temp_dir = tempfile.TemporaryDirectory()
+os.environ['WORD_COUNTER_DB'] = 'sqlite:///' + os.path.join(_temp_dir.name, 'bench.db')
+
+import db.async_queries as async_queries
+import db.queries as queries
+import logic
+from benchmarks.fakes import build_corpus
+from matcher import ENGINES, set_default_engine
+
+
+class StageTimer:
+    """
+    Accumulates the time spent in wrapped functions.
+
+    Attributes:
+        seconds (float): The total time spent in the wrapped functions.
+    """
+
+    def __init__(self):
+        """
+        Initializes the timer at zero.
+        """
+        self.seconds = 0.0
+
+    def wrap(self, func):
+        """
+        Wraps a function so its run time is added to the timer.
+
+        Args:
+            func (Callable): A function or coroutine function.
+
+        Returns:
+            Callable: The timed function.
+        """
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def timed_coroutine(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.seconds += time.perf_counter() - start
+            return timed_coroutine
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - start
+        return timed
+
+
+async def run_scan(bot, message_count: int, **scan_kwargs) -> dict:
+    """
+    Runs one scan with fresh tables and measures it.
+
+    Args:
+        bot (FakeBot): The fake bot with the synthetic guild.
+        message_count (int): The number of messages in the corpus.
+        **scan_kwargs: Keyword arguments for `logic.scan`.
+
+    Returns:
+        dict: The wall time, messages per second, matching time and database write time.
+    """
+    match_timer = StageTimer()
+    write_timer = StageTimer()
+    process_message, update_word_counts = logic.process_message, logic.update_word_counts
+    save_scan_progress = async_queries.save_scan_progress
+    logic.process_message = match_timer.wrap(process_message)
+    logic.update_word_counts = write_timer.wrap(update_word_counts)
+    async_queries.save_scan_progress = write_timer.wrap(save_scan_progress)
+    try:
+        start = time.perf_counter()
+        await logic.scan(bot, bot.guild.id, **scan_kwargs)
+        wall_time = time.perf_counter() - start
+    finally:
+        logic.process_message, logic.update_word_counts = process_message, update_word_counts
+        async_queries.save_scan_progress = save_scan_progress
+
+    return {
+        'wall': wall_time,
+        'messages_per_second': message_count / wall_time if wall_time else 0.0,
+        'matching': match_timer.seconds,
+        'db_write': write_timer.seconds,
+    }
+
+
+def reset_database(words, users):
+    """
+    Recreates the tables and registers the tracked words and users.
+
+    Args:
+        words (List[str]): The tracked words.
+        users (List[FakeUser]): The users.
+    """
+    queries.drop_tables()
+    # The thread catalog was dropped with the tables, so it must be listed from the guild again
+    logic._refreshed_catalogs.clear()
+    queries.add_words(*words)
+    queries.add_user_ids(*[user.id for user in users])
+
+
+async def main():
+    """
+    Parses the arguments, builds the corpus and prints the results of every scan type.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark scans against a synthetic Discord history')
+    parser.add_argument('--messages', type=int, default=20000, help='Number of messages in the corpus')
+    parser.add_argument('--words', type=int, default=200, help='Number of tracked words')
+    parser.add_argument('--unicode-ratio', type=float, default=0.1, help='Share of messages with non-ASCII text')
+    parser.add_argument('--channels', type=int, default=10, help='Number of text channels')
+    parser.add_argument('--threads', type=int, default=2, help='Number of threads per channel')
+    parser.add_argument('--users', type=int, default=100, help='Number of authors')
+    parser.add_argument('--engine', choices=list(ENGINES), default=None,
+                        help='Matcher engine, all engines if omitted')
+    parser.add_argument('--concurrency', type=int, default=1, help='Channels and threads scanned at the same time')
+    parser.add_argument('--workers', type=int, default=0, help='Worker processes matching messages, 0 for none')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the corpus')
+    args = parser.parse_args()
+
+    logic.set_scan_workers(args.workers)
+    bot, words, users = build_corpus(args.messages, args.words, args.unicode_ratio, args.channels,
+                                     args.threads, args.users, seed=args.seed)
+    scans = {
+        'full': {'concurrency': args.concurrency},
+        'per-user': {'target_user_id': users[0].id, 'concurrency': args.concurrency},
+        'per-word': {'target_word': words[0], 'concurrency': args.concurrency},
+        'multi-word': {'target_words': words[:20], 'concurrency': args.concurrency},
+    }
+    # User scans backfill from the checkpoints of a previous incremental scan, like in the running bot,
+    # without them they fall back to a full incremental scan
+    checkpointed_scans = {'per-user'}
+
+    print(f'Corpus: {args.messages} messages, {args.words} words, {args.unicode_ratio:.0%} unicode, '
+          f'{args.channels} channels, {args.threads} threads per channel, {args.users} users, '
+          f'{args.workers} workers')
+    print(f"{'engine':<14}{'scan':<12}{'wall s':>10}{'msg/s':>12}{'match s':>10}{'db write s':>12}")
+    for engine in [args.engine] if args.engine else list(ENGINES):
+        set_default_engine(engine)
+        for scan_name, scan_kwargs in scans.items():
+            reset_database(words, users)
+            if scan_name in checkpointed_scans:
+                await logic.scan(bot, bot.guild.id, incremental=True, concurrency=args.concurrency)
+            result = await run_scan(bot, args.messages, **scan_kwargs)
+            print(f"{engine:<14}{scan_name:<12}{result['wall']:>10.3f}{result['messages_per_second']:>12.0f}"
+                  f"{result['matching']:>10.3f}{result['db_write']:>12.3f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
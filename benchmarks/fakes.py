@@ -0,0 +1,353 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+
+class FakeUser:
+    """
+    Stand-in for discord.User / discord.Member.
+
+    Attributes:
+        id (int): The user ID.
+        display_name (str): The display name.
+    """
+
+    def __init__(self, user_id: int):
+        """
+        Initializes the fake user.
+
+        Args:
+            user_id (int): The user ID.
+        """
+        self.id = user_id
+        self.display_name = f'user{user_id}'
+
+
+class FakeMessage:
+    """
+    Stand-in for discord.Message with the attributes the scan uses.
+
+    Attributes:
+        id (int): The message ID, increasing with creation time like a snowflake.
+        author (FakeUser): The author of the message.
+        content (str): The raw message content.
+        channel (FakeMessageable): The channel or thread the message was sent in.
+    """
+
+    def __init__(self, message_id: int, author: FakeUser, content: str, channel=None):
+        """
+        Initializes the fake message.
+
+        Args:
+            message_id (int): The message ID.
+            author (FakeUser): The author of the message.
+            content (str): The raw message content.
+            channel (FakeMessageable, optional): The channel of the message. Defaults to None.
+        """
+        self.id = message_id
+        self.author = author
+        self.content = content
+        self.channel = channel
+
+
+def _snowflake_id(value) -> Optional[int]:
+    """
+    Gets the ID of a snowflake-like object or integer.
+
+    Args:
+        value: A discord.Object, message, or integer ID, or None.
+
+    Returns:
+        Optional[int]: The ID, or None if no value was given.
+    """
+    if value is None:
+        return None
+    return getattr(value, 'id', value)
+
+
+class FakeMessageable:
+    """
+    Stand-in for a discord.TextChannel or discord.Thread message history.
+
+    Attributes:
+        id (int): The channel ID.
+        name (str): The channel name.
+        messages (List[FakeMessage]): The messages, oldest first.
+    """
+
+    def __init__(self, channel_id: int, name: str, messages: List[FakeMessage]):
+        """
+        Initializes the fake channel.
+
+        Args:
+            channel_id (int): The channel ID.
+            name (str): The channel name.
+            messages (List[FakeMessage]): The messages, oldest first.
+        """
+        self.id = channel_id
+        self.name = name
+        self.messages = messages
+        for message in messages:
+            message.channel = self
+
+    @property
+    def last_message_id(self) -> Optional[int]:
+        """
+        Gets the ID of the newest message.
+
+        Returns:
+            Optional[int]: The newest message ID, or None if the channel is empty.
+        """
+        return self.messages[-1].id if self.messages else None
+
+    async def history(self, limit=100, before=None, after=None, around=None, oldest_first=None):
+        """
+        Iterates the message history like `discord.abc.Messageable.history`.
+
+        Messages are returned newest first, unless `after` is given or `oldest_first` is True.
+
+        Args:
+            limit (int, optional): The maximum number of messages, None for all. Defaults to 100.
+            before (optional): Only return messages before this message or ID.
+            after (optional): Only return messages after this message or ID.
+            around (optional): Not supported, must be None.
+            oldest_first (bool, optional): The order of the messages.
+
+        Yields:
+            FakeMessage: The messages of the channel.
+        """
+        if around is not None:
+            raise NotImplementedError('around is not supported by the fake history')
+        before_id = _snowflake_id(before)
+        after_id = _snowflake_id(after)
+        if oldest_first is None:
+            oldest_first = after_id is not None
+
+        messages = [
+            message for message in self.messages
+            if (before_id is None or message.id < before_id) and (after_id is None or message.id > after_id)
+        ]
+        if not oldest_first:
+            messages.reverse()
+        for message in messages[:limit] if limit is not None else messages:
+            yield message
+
+
+class FakeThread(FakeMessageable):
+    """
+    Stand-in for discord.Thread.
+
+    Attributes:
+        parent_id (int): The ID of the parent channel.
+        archived (bool): Whether the thread is archived.
+        archive_timestamp (datetime): The time the archived state last changed.
+    """
+
+    def __init__(self, thread_id: int, name: str, messages: List[FakeMessage], parent_id: int,
+                 archived: bool = False, archive_timestamp: Optional[datetime] = None):
+        """
+        Initializes the fake thread.
+
+        Args:
+            thread_id (int): The thread ID.
+            name (str): The thread name.
+            messages (List[FakeMessage]): The messages, oldest first.
+            parent_id (int): The ID of the parent channel.
+            archived (bool, optional): Whether the thread is archived. Defaults to False.
+            archive_timestamp (datetime, optional): The time the archived state last changed.
+                Defaults to a time derived from the thread ID.
+        """
+        super().__init__(thread_id, name, messages)
+        self.parent_id = parent_id
+        self.archived = archived
+        self.archive_timestamp = archive_timestamp or datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(
+            seconds=thread_id
+        )
+
+
+class FakeTextChannel(FakeMessageable):
+    """
+    Stand-in for discord.TextChannel with active and archived threads.
+
+    Attributes:
+        threads (List[FakeThread]): The active threads.
+        archived (List[FakeThread]): The archived threads.
+    """
+
+    def __init__(self, channel_id: int, name: str, messages: List[FakeMessage],
+                 threads: Optional[List[FakeThread]] = None):
+        """
+        Initializes the fake text channel.
+
+        Args:
+            channel_id (int): The channel ID.
+            name (str): The channel name.
+            messages (List[FakeMessage]): The messages, oldest first.
+            threads (List[FakeThread], optional): The threads of the channel. Defaults to None.
+        """
+        super().__init__(channel_id, name, messages)
+        threads = threads or []
+        self.threads = [thread for thread in threads if not thread.archived]
+        self.archived = [thread for thread in threads if thread.archived]
+
+    async def archived_threads(self, limit=100, before=None, private=False, joined=False):
+        """
+        Iterates the archived threads like `discord.TextChannel.archived_threads`, most recently
+        archived first.
+
+        Args:
+            limit (int, optional): The maximum number of threads, None for all. Defaults to 100.
+            before (optional): Not supported, must be None.
+            private (bool, optional): Ignored. Defaults to False.
+            joined (bool, optional): Ignored. Defaults to False.
+
+        Yields:
+            FakeThread: The archived threads.
+        """
+        archived = sorted(self.archived, key=lambda thread: thread.archive_timestamp, reverse=True)
+        for thread in archived[:limit] if limit is not None else archived:
+            yield thread
+
+
+class FakeGuild:
+    """
+    Stand-in for discord.Guild.
+
+    Attributes:
+        id (int): The guild ID.
+        text_channels (List[FakeTextChannel]): The text channels.
+        members (List[FakeUser]): The members.
+    """
+
+    def __init__(self, guild_id: int, text_channels: List[FakeTextChannel], members: List[FakeUser]):
+        """
+        Initializes the fake guild.
+
+        Args:
+            guild_id (int): The guild ID.
+            text_channels (List[FakeTextChannel]): The text channels.
+            members (List[FakeUser]): The members.
+        """
+        self.id = guild_id
+        self.text_channels = text_channels
+        self.members = members
+        for channel in text_channels:
+            channel.guild = self
+
+    def get_channel_or_thread(self, channel_id: int):
+        """
+        Gets a text channel or thread by ID.
+
+        Args:
+            channel_id (int): The channel or thread ID.
+
+        Returns:
+            The channel or thread, or None if not found.
+        """
+        for channel in self.text_channels:
+            if channel.id == channel_id:
+                return channel
+            for thread in channel.threads + channel.archived:
+                if thread.id == channel_id:
+                    return thread
+        return None
+
+
+class FakeBot:
+    """
+    Stand-in for the discord.py bot with a single guild.
+
+    Attributes:
+        guild (FakeGuild): The guild of the bot.
+    """
+
+    def __init__(self, guild: FakeGuild):
+        """
+        Initializes the fake bot.
+
+        Args:
+            guild (FakeGuild): The guild of the bot.
+        """
+        self.guild = guild
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        """
+        Gets the guild by ID.
+
+        Args:
+            guild_id (int): The guild ID.
+
+        Returns:
+            Optional[FakeGuild]: The guild, or None if the ID does not match.
+        """
+        return self.guild if guild_id == self.guild.id else None
+
+    def get_partial_messageable(self, channel_id: int, guild_id: Optional[int] = None, type=None):
+        """
+        Gets a messageable for a channel or thread ID like `discord.Client.get_partial_messageable`.
+
+        Args:
+            channel_id (int): The channel or thread ID.
+            guild_id (int, optional): The guild ID. Defaults to None.
+            type (discord.ChannelType, optional): Ignored. Defaults to None.
+
+        Returns:
+            FakeMessageable: The channel or thread.
+        """
+        return self.guild.get_channel_or_thread(channel_id)
+
+
+UNICODE_FILLERS = ['café', 'naïve', 'über', 'señor', 'straße', 'smörgåsbord', 'déjà', 'crème', 'ça']
+
+
+def build_corpus(message_count: int, vocabulary_size: int, unicode_ratio: float = 0.1,
+                 channel_count: int = 10, threads_per_channel: int = 2, user_count: int = 100,
+                 tracked_ratio: float = 0.2, seed: int = 0):
+    """
+    Builds a fake guild with a synthetic message history.
+
+    Args:
+        message_count (int): The total number of messages across channels and threads.
+        vocabulary_size (int): The number of tracked words.
+        unicode_ratio (float, optional): The share of messages containing non-ASCII text.
+            Defaults to 0.1.
+        channel_count (int, optional): The number of text channels. Defaults to 10.
+        threads_per_channel (int, optional): The number of threads per channel, half of them
+            archived. Defaults to 2.
+        user_count (int, optional): The number of authors. Defaults to 100.
+        tracked_ratio (float, optional): The share of tokens that are tracked words. Defaults to 0.2.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        Tuple[FakeBot, List[str], List[FakeUser]]: The bot, the tracked words and the authors.
+    """
+    rng = random.Random(seed)
+    tracked_words = [f'word{index}' for index in range(vocabulary_size)]
+    filler_words = [f'filler{index}' for index in range(1000)]
+    users = [FakeUser(user_id) for user_id in range(1, user_count + 1)]
+
+    message_lists = [[] for _ in range(channel_count * (1 + threads_per_channel))]
+    for message_id in range(1, message_count + 1):
+        tokens = [
+            rng.choice(tracked_words) if tracked_words and rng.random() < tracked_ratio else rng.choice(filler_words)
+            for _ in range(rng.randint(3, 30))
+        ]
+        if rng.random() < unicode_ratio:
+            tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(UNICODE_FILLERS))
+        if rng.random() < 0.5:
+            tokens[0] = tokens[0].capitalize()
+        content = ' '.join(tokens)
+        rng.choice(message_lists).append(FakeMessage(message_id, rng.choice(users), content))
+
+    channels = []
+    message_lists = iter(message_lists)
+    for channel_index in range(channel_count):
+        channel_id = 1_000_000 + channel_index * 1000
+        threads = [
+            FakeThread(channel_id + thread_index + 1, f'thread-{channel_index}-{thread_index}', next(message_lists),
+                       parent_id=channel_id, archived=thread_index % 2 == 1)
+            for thread_index in range(threads_per_channel)
+        ]
+        channels.append(FakeTextChannel(channel_id, f'channel-{channel_index}', next(message_lists), threads))
+
+    return FakeBot(FakeGuild(1, channels, users)), tracked_words, users
@@ -5,27 +5,48 @@ from discord.ext import commands
 import os
 import asyncio
 
-setup_logging()
 bot_logger = logging.getLogger('bot')
-bot_logger.info('Logging setup complete')
 
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-bot_logger.info('Intents setup complete')
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+def create_bot() -> commands.Bot:
+    """
+    Creates the Discord bot with its intents and configuration.
+
+    Returns:
+        commands.Bot: The configured bot.
+    """
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    bot_logger.info('Intents setup complete')
 
-bot.config = get_bot_config()
+    bot = commands.Bot(command_prefix='!', intents=intents)
+    bot.config = get_bot_config()
+    return bot
 
 
-async def main():
+async def main(bot: commands.Bot):
     """
     Loads all cog extensions and starts the Discord bot.
+
+    Args:
+        bot (commands.Bot): The bot to start.
     """
     for filename in os.listdir(COG_FOLDER_PATH):
         if filename.endswith('.py'):
             await bot.load_extension(f'cogs.{filename[:-3]}')
     await bot.start(bot.config.token)
 
-asyncio.run(main())
+if __name__ == '__main__':
+    # Scan worker processes are spawned and import this module again, so logging, the bot and
+    # the database layer are only set up here
+    setup_logging()
+    bot_logger.info('Logging setup complete')
+
+    from logic import set_scan_workers
+    from matcher import set_default_engine
+
+    bot = create_bot()
+    set_default_engine(bot.config.matcher_engine)
+    set_scan_workers(bot.config.scan_workers)
+    asyncio.run(main(bot))
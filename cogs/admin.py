@@ -2,8 +2,9 @@ import discord
 from discord import Embed, Color, app_commands
 from discord.ext import commands
 import logging
-import db.queries as queries
-from logic import scan
+import db.async_queries as async_queries
+from db.count_buffer import count_buffer
+from scan_jobs import scan_scheduler
 
 bot_logger = logging.getLogger('cogs.admin')
 
@@ -30,7 +31,7 @@ class AdminCommands(commands.Cog):
     @app_commands.command(name="aw", description="Add a word to the database (admin-only)")
     async def add_word(self, interaction: discord.Interaction, word: str):
         """
-        Adds a word to the database if the user is an admin.
+        Adds a word to the database if the user is an admin and queues a scan for it.
 
         Args:
             interaction (discord.Interaction): The interaction object representing the command invocation.
@@ -39,16 +40,19 @@ class AdminCommands(commands.Cog):
         await interaction.response.defer()
         bot_logger.info(f'Add word requested - Word: {word}, Admin: {interaction.user.display_name}')
 
-        if queries.check_user_is_admin(interaction.user.id):
-            queries.add_words(word)
-            await scan(self.bot, self.bot.config.server_id, target_word=word)
-            bot_logger.info(f"Word '{word}' added and scanned by admin {interaction.user.display_name}")
+        if await async_queries.check_user_is_admin(interaction.user.id):
+            await async_queries.add_words(word)
+            job = scan_scheduler.submit(target_words=[word])
+            bot_logger.info(f"Word '{word}' added by admin {interaction.user.display_name}, scan queued")
 
             add_word_embed = Embed(
                 title='Word added',
                 description=f"""Word that was added to the database:
                 {word}""",
                 color=Color.green()
+            ).set_footer(
+                text=f'Counting past messages in the background (queue position {scan_scheduler.position(job)}), '
+                     'see /sj'
             )
             await interaction.followup.send(embed=add_word_embed)
             bot_logger.debug('Add word confirmation sent')
@@ -57,6 +61,49 @@ class AdminCommands(commands.Cog):
             bot_logger.warning(f'Unauthorized add word attempt by {interaction.user.display_name} '
                                f'(ID: {interaction.user.id})')
 
+    @app_commands.command(name="aws", description="Add several comma-separated words to the database (admin-only)")
+    async def add_words(self, interaction: discord.Interaction, words: str):
+        """
+        Adds several words to the database if the user is an admin and queues one scan for all of them.
+
+        Args:
+            interaction (discord.Interaction): The interaction object representing the command invocation.
+            words (str): The words to be added to the database, separated by commas.
+        """
+        await interaction.response.defer()
+        bot_logger.info(f'Add words requested - Words: {words}, Admin: {interaction.user.display_name}')
+
+        if await async_queries.check_user_is_admin(interaction.user.id):
+            new_words = list(dict.fromkeys(word.strip() for word in words.split(',') if word.strip()))
+            if not new_words:
+                no_words_embed = Embed(
+                    title='No words',
+                    description='Separate the words to add with commas, e.g. word1, word2',
+                    color=Color.red()
+                )
+                await interaction.followup.send(embed=no_words_embed)
+                return
+
+            await async_queries.add_words(*new_words)
+            job = scan_scheduler.submit(target_words=new_words)
+            bot_logger.info(f"{len(new_words)} words added by admin {interaction.user.display_name}, scan queued")
+
+            add_words_embed = Embed(
+                title='Words added',
+                description=f"""Words that were added to the database:
+                {', '.join(new_words)}""",
+                color=Color.green()
+            ).set_footer(
+                text=f'Counting past messages in the background (queue position {scan_scheduler.position(job)}), '
+                     'see /sj'
+            )
+            await interaction.followup.send(embed=add_words_embed)
+            bot_logger.debug('Add words confirmation sent')
+        else:
+            await self.permission_abuse(interaction)
+            bot_logger.warning(f'Unauthorized add words attempt by {interaction.user.display_name} '
+                               f'(ID: {interaction.user.id})')
+
     @app_commands.command(name="rw", description="Remove a word from the database (admin-only)")
     async def remove_word(self, interaction: discord.Interaction, word: str):
         """
@@ -69,8 +116,10 @@ class AdminCommands(commands.Cog):
         await interaction.response.defer()
         bot_logger.info(f'Remove word requested - Word: {word}, Admin: {interaction.user.display_name}')
 
-        if queries.check_user_is_admin(interaction.user.id):
-            queries.remove_word(word)
+        if await async_queries.check_user_is_admin(interaction.user.id):
+            # Pending counts are dropped first so a flush cannot write them after the removal
+            count_buffer.discard_word(word)
+            await async_queries.remove_word(word)
             bot_logger.info(f"Word '{word}' removed by admin {interaction.user.display_name}")
 
             remove_word_embed = Embed(
@@ -86,6 +135,43 @@ class AdminCommands(commands.Cog):
             bot_logger.warning(f'Unauthorized remove word attempt by {interaction.user.display_name} '
                                f'(ID: {interaction.user.id})')
 
+    @app_commands.command(name="rc", description="Reload the bot configuration (admin-only)")
+    async def reload_config(self, interaction: discord.Interaction):
+        """
+        Reloads the bot configuration if the user is an admin, adds its words, makes exactly its
+        admins the admins and queues a scan for words that were not tracked yet.
+
+        Other settings only take effect after a restart.
+
+        Args:
+            interaction (discord.Interaction): The interaction object representing the command invocation.
+        """
+        await interaction.response.defer()
+        bot_logger.info(f'Config reload requested - Admin: {interaction.user.display_name}')
+
+        if await async_queries.check_user_is_admin(interaction.user.id):
+            self.bot.config.reload()
+            tracked_words = set(await async_queries.get_words())
+            new_words = [word for word in dict.fromkeys(self.bot.config.words) if word not in tracked_words]
+            await async_queries.add_words(*self.bot.config.words)
+            await async_queries.sync_admins(*self.bot.config.admin_ids)
+            if new_words:
+                scan_scheduler.submit(target_words=new_words)
+            bot_logger.info(f'Config reloaded by admin {interaction.user.display_name} - New words: {new_words}')
+
+            reload_embed = Embed(
+                title='Configuration reloaded',
+                description=f"""Words added: {', '.join(new_words) or 'none'}
+                Admins: {len(await async_queries.get_admin_ids())}""",
+                color=Color.green()
+            )
+            await interaction.followup.send(embed=reload_embed)
+            bot_logger.debug('Config reload confirmation sent')
+        else:
+            await self.permission_abuse(interaction)
+            bot_logger.warning(f'Unauthorized config reload attempt by {interaction.user.display_name} '
+                               f'(ID: {interaction.user.id})')
+
     async def permission_abuse(self, interaction: discord.Interaction):
         """
         Sends a message indicating lack of permission when a non-admin user attempts an admin action.
@@ -95,8 +181,8 @@ class AdminCommands(commands.Cog):
         """
         bot_logger.warning(f'Permission abuse detected - User: {interaction.user.display_name} '
                            f'(ID: {interaction.user.id})')
-        admin_users = [self.bot.get_user(admin_id).display_name for admin_id in self.bot.config.admin_ids]
-        admin_list = ', '.join(admin_users)
+        # Mentions are resolved by Discord, so no user lookup is needed per attempt
+        admin_list = ', '.join(f'<@{admin_id}>' for admin_id in sorted(await async_queries.get_admin_ids()))
         mod_abuse_embed = Embed(
             title='No permission',
             description=f"""You have no permission to perform this action\n
@@ -1,11 +1,14 @@
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import Color, Embed
-from unidecode import unidecode
-import db.queries as queries
+import db.async_queries as async_queries
+from db.count_buffer import count_buffer
+from db.message_archive import message_archive
 import logging
+import time
 import discord
-from logic import scan
-import re
+from logic import catalog_entry, get_tracked_matcher
+from matcher import normalize
+from scan_jobs import scan_scheduler
 
 events_logger = logging.getLogger('cogs.events')
 
@@ -29,8 +32,44 @@ class Events(commands.Cog):
             bot: The Discord bot instance
         """
         self.bot = bot
+        count_buffer.flush_threshold = self.bot.config.count_flush_threshold
+        message_archive.enabled = self.bot.config.message_archive
+        message_archive.flush_threshold = self.bot.config.count_flush_threshold
+        self.flush_counts.change_interval(seconds=self.bot.config.count_flush_interval)
         events_logger.info('Events cog initialized')
 
+    async def cog_load(self):
+        """
+        Starts the periodic flush of buffered word counts and archived messages, and the scan scheduler.
+        """
+        self.flush_counts.start()
+        scan_scheduler.start(self.bot, self.bot.config.server_id, self.bot.config.scan_concurrency)
+
+    async def cog_unload(self):
+        """
+        Stops the scan scheduler and the periodic flush, and writes the remaining buffered word counts
+        and archived messages.
+        """
+        await scan_scheduler.stop()
+        self.flush_counts.cancel()
+        await count_buffer.flush()
+        await message_archive.flush()
+
+    @tasks.loop(seconds=5)
+    async def flush_counts(self):
+        """
+        Writes buffered word counts and archived messages to the database in batches.
+        """
+        try:
+            flushed = await count_buffer.flush()
+            archived = await message_archive.flush()
+        except async_queries.DatabaseError:
+            return
+        if flushed:
+            events_logger.debug(f'Flushed buffered counts for {flushed} user-word pairs')
+        if archived:
+            events_logger.debug(f'Archived {archived} messages')
+
     @commands.Cog.listener()
     async def on_ready(self):
         """
@@ -39,23 +78,34 @@ class Events(commands.Cog):
         Performs initialization tasks when the bot starts up:
         - Syncs command tree with the guild
         - Initializes word list and user IDs
-        - Performs initial message scan if enabled
+        - Queues the initial message scan if enabled
+        - Logs how long each startup step took
         """
+        started_at = time.perf_counter()
         guild = discord.Object(id=self.bot.config.server_id)
         self.bot.tree.copy_global_to(guild=guild)
         await self.bot.tree.sync(guild=guild)
         events_logger.info('Command tree synced with specific guild')
-
-        queries.add_words(*self.bot.config.words)
-        queries.add_user_ids(*[member.id for member in self.bot.get_guild(self.bot.config.server_id).members])
-        queries.add_admins(*self.bot.config.admin_ids)
+        synced_at = time.perf_counter()
+
+        await async_queries.add_words(*self.bot.config.words)
+        guild_members = self.bot.get_guild(self.bot.config.server_id).members
+        await async_queries.add_user_ids(*[member.id for member in guild_members])
+        members_synced_at = time.perf_counter()
+        await async_queries.sync_admins(*self.bot.config.admin_ids)
+        finished_at = time.perf_counter()
         events_logger.info(
             f'Initialized with {len(self.bot.config.words)} words and {len(self.bot.config.admin_ids)} admins'
         )
+        events_logger.info(
+            f'Startup timing - Command sync: {synced_at - started_at:.2f}s, '
+            f'Member sync: {members_synced_at - synced_at:.2f}s ({len(guild_members)} members), '
+            f'Admin sync: {finished_at - members_synced_at:.2f}s, Total: {finished_at - started_at:.2f}s'
+        )
 
         if not self.bot.config.disable_initial_scan:
-            await scan(self.bot, self.bot.config.server_id)
-            events_logger.info('Initial scan completed')
+            scan_scheduler.submit(incremental=self.bot.config.incremental_scan)
+            events_logger.info('Initial scan queued')
 
         events_logger.info('Bot ready')
 
@@ -68,7 +118,7 @@ class Events(commands.Cog):
             member (discord.Member): The member who joined the server.
         """
         events_logger.info(f"Member joined - Name: {member.display_name}, ID: {member.id}")
-        queries.add_user_ids(member.id)
+        await async_queries.add_user_ids(member.id)
 
         username = member.display_name
         new_user_embed = Embed(
@@ -77,13 +127,13 @@ class Events(commands.Cog):
             Be aware of what you type {username}... 😳""",
             color=Color.blue()
         ).set_footer(
-            text=', '.join(queries.get_words())
+            text=', '.join(await async_queries.get_words())
         )
 
         await self.bot.get_channel(self.bot.config.channel_id).send(embed=new_user_embed)
 
-        await scan(self.bot, self.bot.config.server_id, target_user_id=member.id)
         events_logger.info('New user message sent')
+        scan_scheduler.submit(target_user_id=member.id)
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -97,21 +147,57 @@ class Events(commands.Cog):
         if message.author == self.bot.user:
             return
 
-        formatted_content = unidecode(message.content).lower()
+        formatted_content = normalize(message.content)
         events_logger.debug(f'Processing message from {message.author.display_name} (ID: {message.author.id})')
+        if message.guild is not None:
+            await message_archive.add(message, formatted_content)
+
+        word_matches = (await get_tracked_matcher()).count(formatted_content)
+        for word, word_count in word_matches.items():
+            await self.handle_word_count(message, word, word_count)
+            events_logger.info(f'Tracked word "{word}" found in message from {message.author.display_name}')
+
+    @commands.Cog.listener()
+    async def on_thread_create(self, thread: discord.Thread):
+        """
+        Adds a new thread to the thread catalog.
+
+        Args:
+            thread (discord.Thread): The created thread.
+        """
+        if thread.guild.id != self.bot.config.server_id:
+            return
+        await async_queries.save_threads([catalog_entry(thread)])
+        events_logger.debug(f'Thread created - Name: {thread.name}, ID: {thread.id}')
+
+    @commands.Cog.listener()
+    async def on_thread_update(self, before: discord.Thread, after: discord.Thread):
+        """
+        Updates a thread in the thread catalog, e.g. when it is archived or unarchived.
+
+        Args:
+            before (discord.Thread): The thread before the update.
+            after (discord.Thread): The thread after the update.
+        """
+        if after.guild.id != self.bot.config.server_id:
+            return
+        await async_queries.save_threads([catalog_entry(after)])
+        events_logger.debug(f'Thread updated - Name: {after.name}, ID: {after.id}, Archived: {after.archived}')
 
-        current_words = queries.get_words()
-        for word in current_words:
-            if word:
-                pattern = r'\b' + re.escape(word) + r'\b'
-                matches = re.findall(pattern, formatted_content)
-                if matches:
-                    await self.handle_word_count(message, word, matches)
-                    events_logger.info(f'Tracked word "{word}" found in message from {message.author.display_name}')
-                else:
-                    events_logger.debug(f'Word: "{word}" not found in message')
+    @commands.Cog.listener()
+    async def on_raw_thread_delete(self, payload: discord.RawThreadDeleteEvent):
+        """
+        Removes a deleted thread from the thread catalog, even if it was not cached.
 
-    async def handle_word_count(self, message: discord.Message, word: str, matches: list):
+        Args:
+            payload (discord.RawThreadDeleteEvent): The raw event payload.
+        """
+        if payload.guild_id != self.bot.config.server_id:
+            return
+        await async_queries.remove_thread(payload.thread_id)
+        events_logger.debug(f'Thread deleted - ID: {payload.thread_id}')
+
+    async def handle_word_count(self, message: discord.Message, word: str, word_count: int):
         """
         Handle word count in a message.
 
@@ -121,16 +207,14 @@ class Events(commands.Cog):
         Args:
             message (discord.Message): The message containing the word.
             word (str): The word to count in the message.
-            matches (list): The list of matches found in the message.
+            word_count (int): The number of times the word was found in the message.
         """
         events_logger.debug(f'Word: {word} found in message')
 
-        word_count = len(matches)
         user_id = message.author.id
 
-        if queries.get_count(user_id, word) is None:
+        if await count_buffer.add(user_id, word, word_count) is None:
             events_logger.debug(f'First time {user_id} has said {word}')
-            queries.update_user_count(user_id, word, word_count)
 
             username = message.author.display_name
 
@@ -142,9 +226,6 @@ class Events(commands.Cog):
             )
             await message.channel.send(embed=first_time_embed)
             events_logger.info(f'First time message sent: {username}, {word}')
-            return
-
-        queries.update_user_count(user_id, word, word_count)
 
 
 async def setup(bot):
@@ -2,7 +2,9 @@ import discord
 from discord.ext import commands
 from discord import Embed, Color, app_commands
 import logging
-import db.queries as queries
+import db.async_queries as async_queries
+from db.count_buffer import count_buffer
+from scan_jobs import scan_scheduler
 
 bot_logger = logging.getLogger('cogs.general')
 
@@ -33,7 +35,7 @@ class GeneralCommands(commands.Cog):
                         f'Requester: {interaction.user.display_name}')
 
         converted_user_id = user.id
-        count_user_id = queries.get_count(converted_user_id, word)
+        count_user_id = await count_buffer.get_count(converted_user_id, word)
         username = user.display_name
 
         if count_user_id is None:
@@ -53,7 +55,7 @@ class GeneralCommands(commands.Cog):
             color=Color.blue()
         )
 
-        highest_count_tuple = queries.get_highest_count_column(word)
+        highest_count_tuple = await count_buffer.get_highest_count_column(word)
         highest_count_user = self.bot.get_user(highest_count_tuple[0]).display_name
         count_embed.set_footer(text=f'The person who has said {word} the most is '
                                     f'{highest_count_user} with {highest_count_tuple[2]} times. '
@@ -72,7 +74,7 @@ class GeneralCommands(commands.Cog):
         """
         await interaction.response.defer()
         bot_logger.info(f'Highest count requested - Word: {word}, Requester: {interaction.user.display_name}')
-        highest_count_tuple = queries.get_highest_count_column(word)
+        highest_count_tuple = await count_buffer.get_highest_count_column(word)
 
         if highest_count_tuple is None:
             bot_logger.info(f'No counts found for word: {word}')
@@ -96,6 +98,42 @@ class GeneralCommands(commands.Cog):
         await interaction.followup.send(embed=highest_count_embed)
         bot_logger.debug('Highest count message sent')
 
+    @app_commands.command(name="tc", description="Show the users with the highest counts of a word")
+    async def top_counts(self, interaction: discord.Interaction, word: str):
+        """
+        Shows the leaderboard of a word, the users with the highest counts.
+
+        Args:
+            interaction (discord.Interaction): The interaction object.
+            word (str): The word to check.
+        """
+        await interaction.response.defer()
+        bot_logger.info(f'Top counts requested - Word: {word}, Requester: {interaction.user.display_name}')
+        leaderboard = await count_buffer.get_leaderboard(word)
+
+        if not leaderboard:
+            bot_logger.info(f'No counts found for word: {word}')
+            no_count_embed = Embed(
+                title='Dead Server',
+                description=f"""No User in this Server has said {word}\n
+                Or the word is not being monitored :eyes:""",
+                color=Color.red()
+            )
+            await interaction.followup.send(embed=no_count_embed)
+            return
+
+        # Mentions are resolved by Discord, so users missing from the cache are shown too
+        ranking = '\n'.join(
+            f'{position}. <@{user_id}>: {count}' for position, (user_id, count) in enumerate(leaderboard, 1)
+        )
+        top_counts_embed = Embed(
+            title=f'Top {len(leaderboard)} for {word}',
+            description=ranking,
+            color=Color.gold()
+        )
+        await interaction.followup.send(embed=top_counts_embed)
+        bot_logger.debug('Top counts message sent')
+
     @app_commands.command(name="thc", description="Retrieve the total highest count of all words")
     async def total_highest_count_command(self, interaction: discord.Interaction):
         """
@@ -106,7 +144,7 @@ class GeneralCommands(commands.Cog):
         """
         await interaction.response.defer()
         bot_logger.info(f'Total highest count requested by {interaction.user.display_name}')
-        highest_count_result = queries.get_total_highest_count_column()
+        highest_count_result = await count_buffer.get_total_highest_count_column()
 
         if highest_count_result is None:
             bot_logger.info('No counts found in database')
@@ -141,7 +179,7 @@ class GeneralCommands(commands.Cog):
         """
         await interaction.response.defer()
         bot_logger.info(f'Show words requested by {interaction.user.display_name}')
-        words_database = queries.get_words()
+        words_database = await async_queries.get_words()
 
         words_embed = Embed(
             title='All words',
@@ -168,11 +206,15 @@ class GeneralCommands(commands.Cog):
 
             /c [word] [user]: Count occurrences of a word for a specific user.
             /hc [word]: Retrieve the highest count of a word.
+            /tc [word]: Show the users with the highest counts of a word.
             /thc: Retrieve the total highest count of all words.
             /sw: Show all tracked words.
             /aw [word]: Add word to database (admin-only).
+            /aws [word1, word2, ...]: Add several words to database (admin-only).
             /rw [word]: Remove a word from database (admin-only).
+            /rc: Reload the bot configuration and apply its words and admins (admin-only).
             /uwc [user]: Show all words and their counts for a specific user.
+            /sj: Show queued and running scans.
             """,
             color=Color.blue()
         ).set_footer(
@@ -196,7 +238,7 @@ class GeneralCommands(commands.Cog):
                         f'Requester: {interaction.user.display_name}')
 
         user_id = member.id
-        word_counts = queries.get_user_word_counts(user_id)
+        word_counts = await count_buffer.get_user_word_counts(user_id)
 
         if not word_counts:
             bot_logger.info(f'No word counts found for user: {member.display_name}')
@@ -218,6 +260,44 @@ class GeneralCommands(commands.Cog):
         await interaction.followup.send(embed=user_words_embed)
         bot_logger.debug('Word counts message sent')
 
+    @app_commands.command(name="sj", description="Show queued and running scans")
+    async def scan_jobs(self, interaction: discord.Interaction):
+        """
+        Shows the running scan, the queued scans and the recently finished scans.
+
+        Args:
+            interaction (discord.Interaction): The interaction object.
+        """
+        await interaction.response.defer()
+        bot_logger.info(f'Scan jobs requested by {interaction.user.display_name}')
+        jobs = scan_scheduler.jobs
+
+        if not jobs:
+            no_jobs_embed = Embed(
+                title='No scans',
+                description='No scan is queued or running.',
+                color=Color.green()
+            )
+            await interaction.followup.send(embed=no_jobs_embed)
+            return
+
+        job_lines = []
+        for job in jobs:
+            merged = f', {job.merged} requests' if job.merged > 1 else ''
+            if job.state == 'queued':
+                job_lines.append(f'⏳ {job.description}: queued at position {scan_scheduler.position(job)}{merged}')
+            else:
+                icon = {'running': '🔄', 'done': '✅', 'failed': '❌'}[job.state]
+                job_lines.append(f'{icon} {job.description}: {job.state}, {job.messages_scanned} messages in '
+                                 f'{job.elapsed:.0f}s ({job.throughput:.0f}/s){merged}')
+        scan_jobs_embed = Embed(
+            title='Scans',
+            description="\n".join(job_lines),
+            color=Color.blue()
+        )
+        await interaction.followup.send(embed=scan_jobs_embed)
+        bot_logger.debug('Scan jobs message sent')
+
 
 async def setup(bot):
     """
@@ -1,4 +1,5 @@
 from pathlib import Path
+import os
 import yaml
 import logging.config
 import logging
@@ -14,7 +15,32 @@ CONFIG_FOLDER_PATH = BASE_DIR / 'config'
 # Database file path
 DB_PATH = BASE_DIR / 'instance'
 DB_PATH.mkdir(parents=True, exist_ok=True)
-DB_PATH = 'sqlite:///' + str(BASE_DIR / 'instance' / 'word_counter.db')
+DB_PATH = os.environ.get('WORD_COUNTER_DB', 'sqlite:///' + str(BASE_DIR / 'instance' / 'word_counter.db'))
+
+# Database connection pool settings
+DB_POOL_SETTINGS = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+}
+
+# Number of threads running read queries next to the single writer thread
+DB_READER_THREADS = 4
+
+# Number of (user, word) counts kept in memory by the count cache
+COUNT_CACHE_SIZE = 10000
+
+# Number of top users per word kept in the leaderboard table, changing it fills the table again on startup
+LEADERBOARD_SIZE = 10
+
+# SQLite pragmas applied to every new connection
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,  # 256 MiB
+    'cache_size': -65536,    # 64 MiB
+    'busy_timeout': 5000,    # Milliseconds
+}
 
 # Cog folder path
 COG_FOLDER_PATH = BASE_DIR / 'cogs'
@@ -83,6 +109,13 @@ class BotConfig:
         channel_id (int): The ID of the channel.
         admin_ids (list): A list of admin user IDs.
         disable_initial_scan (bool): Flag to disable initial scan.
+        matcher_engine (str): The word matching engine, 'regex', 'aho_corasick' or 'token'.
+        count_flush_interval (float): Seconds between writes of buffered word counts.
+        count_flush_threshold (int): Number of buffered user-word pairs that triggers a write.
+        incremental_scan (bool): Flag to resume the initial scan from the last scanned messages.
+        scan_concurrency (int): Maximum number of channels and threads scanned at the same time.
+        message_archive (bool): Flag to keep a local searchable copy of scanned and new messages.
+        scan_workers (int): Number of worker processes matching scanned messages, 0 to match in the bot process.
     """
 
     _instance = None
@@ -117,6 +150,13 @@ class BotConfig:
                 self.channel_id = config['channel_id']
                 self.admin_ids = config['admin_ids']
                 self.disable_initial_scan = config.get('disable_initial_scan', True)
+                self.matcher_engine = config.get('matcher_engine', 'regex')
+                self.count_flush_interval = config.get('count_flush_interval', 5)
+                self.count_flush_threshold = config.get('count_flush_threshold', 500)
+                self.incremental_scan = config.get('incremental_scan', True)
+                self.scan_concurrency = config.get('scan_concurrency', 4)
+                self.message_archive = config.get('message_archive', False)
+                self.scan_workers = config.get('scan_workers', 0)
         except FileNotFoundError:
             logging.error(f"Bot configuration file not found: {CONFIG_FOLDER_PATH / 'bot_config.yaml'}")
         except yaml.YAMLError as e:
@@ -124,6 +164,13 @@ class BotConfig:
         except Exception as e:
             logging.error(f"Unexpected error in Bot Configuration: {e}")
 
+    def reload(self):
+        """
+        Reloads the configuration from the YAML file, e.g. after words or admins were edited.
+        """
+        self._load_config()
+        logging.info('Bot configuration reloaded')
+
 
 def get_bot_config():
     """
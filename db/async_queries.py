@@ -0,0 +1,104 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from config import DB_READER_THREADS
+import db.queries as queries
+
+DatabaseError = queries.DatabaseError
+
+# SQLite allows a single writer, so all writes run in order on one dedicated thread.
+# Reads run on their own threads and do not wait for writes thanks to WAL journaling.
+_writer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+_reader_executor = ThreadPoolExecutor(max_workers=DB_READER_THREADS, thread_name_prefix='db-reader')
+
+
+async def run_sync(func, *args, **kwargs):
+    """
+    Runs a blocking database function on the writer thread without blocking the event loop.
+
+    Args:
+        func (Callable): The blocking function to run.
+        *args: Positional arguments for the function.
+        **kwargs: Keyword arguments for the function.
+
+    Returns:
+        Any: The return value of the function.
+
+    Raises:
+        DatabaseError: If the function raises it.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_writer_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_read(func, *args, **kwargs):
+    """
+    Runs a blocking read-only database function on a reader thread.
+
+    Args:
+        func (Callable): The blocking function to run.
+        *args: Positional arguments for the function.
+        **kwargs: Keyword arguments for the function.
+
+    Returns:
+        Any: The return value of the function.
+
+    Raises:
+        DatabaseError: If the function raises it.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_reader_executor, functools.partial(func, *args, **kwargs))
+
+
+def _to_async(func, runner=run_sync):
+    """
+    Wraps a blocking query function into a coroutine function running on a database thread.
+
+    Args:
+        func (Callable): The blocking query function.
+        runner (Callable, optional): Either `run_sync` for writes or `run_read` for reads.
+            Defaults to `run_sync`.
+
+    Returns:
+        Callable: The coroutine function with the same signature.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await runner(func, *args, **kwargs)
+    return wrapper
+
+
+drop_tables = _to_async(queries.drop_tables)
+add_words = _to_async(queries.add_words)
+add_user_ids = _to_async(queries.add_user_ids)
+add_admins = _to_async(queries.add_admins)
+sync_admins = _to_async(queries.sync_admins)
+add_user_has_word = _to_async(queries.add_user_has_word)
+remove_word = _to_async(queries.remove_word)
+update_user_count = _to_async(queries.update_user_count)
+increment_user_counts = _to_async(queries.increment_user_counts)
+upsert_highest_counts = _to_async(queries.upsert_highest_counts)
+save_scan_progress = _to_async(queries.save_scan_progress)
+reset_scan_progress = _to_async(queries.reset_scan_progress)
+archive_messages = _to_async(queries.archive_messages)
+save_threads = _to_async(queries.save_threads)
+remove_thread = _to_async(queries.remove_thread)
+
+get_count = _to_async(queries.get_count, run_read)
+get_words = _to_async(queries.get_words, run_read)
+get_all_users = _to_async(queries.get_all_users, run_read)
+get_highest_count_column = _to_async(queries.get_highest_count_column, run_read)
+get_total_highest_count_column = _to_async(queries.get_total_highest_count_column, run_read)
+get_leaderboard = _to_async(queries.get_leaderboard, run_read)
+check_user_has_word = _to_async(queries.check_user_has_word, run_read)
+check_user_is_admin = _to_async(queries.check_user_is_admin, run_read)
+get_admin_ids = _to_async(queries.get_admin_ids, run_read)
+get_user_word_counts = _to_async(queries.get_user_word_counts, run_read)
+get_scan_checkpoint = _to_async(queries.get_scan_checkpoint, run_read)
+has_scan_checkpoints = _to_async(queries.has_scan_checkpoints, run_read)
+get_channel_word_totals = _to_async(queries.get_channel_word_totals, run_read)
+get_author_channels = _to_async(queries.get_author_channels, run_read)
+get_cataloged_threads = _to_async(queries.get_cataloged_threads, run_read)
+get_thread_catalog = _to_async(queries.get_thread_catalog, run_read)
+get_archived_author_messages = _to_async(queries.get_archived_author_messages, run_read)
+get_archived_word_candidates = _to_async(queries.get_archived_word_candidates, run_read)
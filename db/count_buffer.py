@@ -0,0 +1,251 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+import db.async_queries as async_queries
+from config import LEADERBOARD_SIZE
+
+count_buffer_logger = logging.getLogger('db.count_buffer')
+
+
+class CountBuffer:
+    """
+    Write-behind buffer for live word count increments.
+
+    Increments are merged in memory per (user, word) and written in one batched transaction
+    when `flush` is called or the number of pending pairs reaches the flush threshold.
+    Reads through the buffer see counts that are not flushed yet, they add the buffered counts
+    on top of the stored results instead of flushing first, so reads never wait for the writer.
+
+    Attributes:
+        flush_threshold (int): The number of pending pairs that triggers a flush.
+    """
+
+    def __init__(self, flush_threshold: int = 500):
+        """
+        Initializes an empty buffer.
+
+        Args:
+            flush_threshold (int, optional): The number of pending pairs that triggers a flush.
+                Defaults to 500.
+        """
+        self.flush_threshold = flush_threshold
+        # (user_id, word) -> [stored count when first buffered (None if no record), pending increment]
+        self._pending = {}
+        # Pairs of the flush in progress, kept readable until they are committed
+        self._flushing = {}
+        self._flush_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        """
+        Gets the number of pending (user, word) pairs.
+
+        Returns:
+            int: The number of pending (user, word) pairs.
+        """
+        return len(self._pending)
+
+    async def get_count(self, user_id: int, word: str) -> Optional[int]:
+        """
+        Gets the count for a user and word including pending increments.
+
+        Args:
+            user_id (int): The ID of the user.
+            word (str): The word to get the count for.
+
+        Returns:
+            Optional[int]: The count of the word for the user, or None if the user never said it.
+
+        Raises:
+            DatabaseError: If there is an error retrieving the stored count.
+        """
+        key = (user_id, word)
+        for buffered in (self._pending, self._flushing):
+            entry = buffered.get(key)
+            if entry is not None:
+                stored_count, increment = entry
+                return (stored_count or 0) + increment
+        return await async_queries.get_count(user_id, word)
+
+    async def add(self, user_id: int, word: str, count: int) -> Optional[int]:
+        """
+        Buffers a count increment for a user and word.
+
+        Args:
+            user_id (int): The ID of the user.
+            word (str): The word to add the count to.
+            count (int): The count to add.
+
+        Returns:
+            Optional[int]: The count before this increment, or None if this is the first time
+            the user said the word.
+
+        Raises:
+            DatabaseError: If there is an error retrieving the stored count or flushing.
+        """
+        key = (user_id, word)
+        stored_count = None
+        if key not in self._pending:
+            stored_count = await self.get_count(user_id, word)
+
+        # Another message may have buffered the same pair while the stored count was read
+        pending = self._pending.get(key)
+        if pending is None:
+            previous_count = stored_count
+            self._pending[key] = [stored_count, count]
+        else:
+            previous_count = (pending[0] or 0) + pending[1]
+            pending[1] += count
+
+        if len(self._pending) >= self.flush_threshold:
+            await self.flush()
+        return previous_count
+
+    def _buffered_counts(self) -> Dict[Tuple[int, str], int]:
+        """
+        Gets the current count of every buffered pair, including the pairs of a flush in progress.
+
+        Buffered increments only ever raise counts, so a buffered count is at least the stored
+        count unless a scan raised the stored count since the pair was buffered.
+
+        Returns:
+            Dict[Tuple[int, str], int]: The count of each buffered (user_id, word) pair.
+        """
+        counts = {key: (stored_count or 0) + increment
+                  for key, (stored_count, increment) in self._flushing.items()}
+        # Pending pairs were read through the flush in progress, so their counts are newer
+        counts.update({key: (stored_count or 0) + increment
+                       for key, (stored_count, increment) in self._pending.items()})
+        return counts
+
+    @staticmethod
+    def _highest(stored: Optional[Tuple], buffered: List[Tuple[int, str, int]]) -> Optional[Tuple]:
+        """
+        Picks the highest of a stored count and buffered counts, ties go to the lowest user ID.
+
+        Args:
+            stored (Optional[Tuple]): The stored (user_id, word_name, count), or None.
+            buffered (List[Tuple[int, str, int]]): The buffered (user_id, word_name, count) tuples.
+
+        Returns:
+            Optional[Tuple]: The highest (user_id, word_name, count), or None if there is none.
+        """
+        candidates = (buffered + [stored]) if stored else buffered
+        return min(candidates, key=lambda candidate: (-candidate[2], candidate[0]), default=None)
+
+    async def get_highest_count_column(self, word: str) -> Optional[Tuple]:
+        """
+        Gets the user with the highest count of a word including pending increments.
+
+        Args:
+            word (str): The word to find the highest count for.
+
+        Returns:
+            Optional[Tuple]: A tuple of (user_id, word_name, count), or None if nobody said the word.
+
+        Raises:
+            DatabaseError: If there is an error retrieving the stored highest count.
+        """
+        # Taken before the read, so a flush committing during the read is seen by one of them
+        buffered = [(user_id, buffered_word, count)
+                    for (user_id, buffered_word), count in self._buffered_counts().items() if buffered_word == word]
+        return self._highest(await async_queries.get_highest_count_column(word), buffered)
+
+    async def get_total_highest_count_column(self) -> Optional[Tuple]:
+        """
+        Gets the highest count of all words including pending increments.
+
+        Returns:
+            Optional[Tuple]: A tuple of (user_id, word_name, count), or None if there are no counts.
+
+        Raises:
+            DatabaseError: If there is an error retrieving the stored highest count.
+        """
+        buffered = [(user_id, word, count) for (user_id, word), count in self._buffered_counts().items()]
+        return self._highest(await async_queries.get_total_highest_count_column(), buffered)
+
+    async def get_leaderboard(self, word: str) -> List[Tuple[int, int]]:
+        """
+        Gets the users with the highest counts of a word including pending increments.
+
+        Users outside the stored top can only enter it through buffered increments, so merging
+        the buffered counts into the stored top gives the current top.
+
+        Args:
+            word (str): The word to get the top users for.
+
+        Returns:
+            List[Tuple[int, int]]: Up to `LEADERBOARD_SIZE` tuples of (user_id, count), highest count first.
+
+        Raises:
+            DatabaseError: If there is an error retrieving the stored leaderboard.
+        """
+        buffered = {user_id: count for (user_id, buffered_word), count in self._buffered_counts().items()
+                    if buffered_word == word}
+        counts = dict(await async_queries.get_leaderboard(word))
+        for user_id, count in buffered.items():
+            counts[user_id] = max(counts.get(user_id, 0), count)
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:LEADERBOARD_SIZE]
+
+    async def get_user_word_counts(self, user_id: int) -> List[Tuple[str, int]]:
+        """
+        Gets all words and counts of a user including pending increments.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            List[Tuple[str, int]]: A tuple of (word_name, count) for each word the user said.
+
+        Raises:
+            DatabaseError: If there is an error retrieving the stored counts.
+        """
+        buffered = {word: count for (buffered_user_id, word), count in self._buffered_counts().items()
+                    if buffered_user_id == user_id}
+        counts = dict(await async_queries.get_user_word_counts(user_id))
+        for word, count in buffered.items():
+            counts[word] = max(counts.get(word, 0), count)
+        return list(counts.items())
+
+    def discard_word(self, word: str) -> None:
+        """
+        Drops all pending increments of a word, e.g. after the word was removed.
+
+        Args:
+            word (str): The word to drop.
+        """
+        self._pending = {key: pending for key, pending in self._pending.items() if key[1] != word}
+
+    async def flush(self) -> int:
+        """
+        Writes all pending increments to the database in one transaction.
+
+        Returns:
+            int: The number of (user, word) pairs written.
+
+        Raises:
+            DatabaseError: If there is an error writing the counts. The increments stay pending.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, {}
+            self._flushing = pending
+            try:
+                await async_queries.increment_user_counts(
+                    {key: increment for key, (_, increment) in pending.items()}
+                )
+            except async_queries.DatabaseError:
+                # Merge back, pairs buffered during the failed write keep their new increments
+                for key, (stored_count, increment) in pending.items():
+                    entry = self._pending.get(key)
+                    self._pending[key] = [stored_count, increment + (entry[1] if entry else 0)]
+                count_buffer_logger.error(f'Flush failed, keeping {len(pending)} pending pairs')
+                raise
+            finally:
+                self._flushing = {}
+            count_buffer_logger.debug(f'Flushed {len(pending)} pending pairs')
+            return len(pending)
+
+
+count_buffer = CountBuffer()
@@ -1,31 +1,115 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from config import DB_PATH
-from db.models import Base
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import scoped_session, sessionmaker
+from config import DB_PATH, DB_POOL_SETTINGS, SQLITE_PRAGMAS
+from db.models import Base, fill_leaderboard
 
-engine = create_engine(DB_PATH)
+engine = create_engine(DB_PATH, **DB_POOL_SETTINGS)
 
-Base.metadata.create_all(engine)
+
+@event.listens_for(engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Applies the configured SQLite pragmas to every new connection.
+
+    WAL journaling lets readers run while a write is in progress, so slash commands do not
+    wait for the message counting writes.
+
+    Args:
+        dbapi_connection (sqlite3.Connection): The new DBAPI connection.
+        connection_record (ConnectionRecord): The pool record of the connection.
+    """
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+def migrate():
+    """
+    Creates missing tables, adds columns introduced after a table was first created and keeps the
+    indexes in line with the models.
+
+    `create_all` only creates columns and indexes together with new tables, so the ones missing
+    from existing tables are added here. Added columns must be nullable or have a server default.
+    Indexes that were removed from the models or whose columns changed are dropped, the changed
+    ones are created again.
+    """
+    Base.metadata.create_all(engine)
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            model_indexes = {index.name: [column.name for column in index.columns] for index in table.indexes}
+            for index in inspector.get_indexes(table.name):
+                if model_indexes.get(index['name']) != index['column_names']:
+                    connection.execute(text(f'DROP INDEX {index["name"]}'))
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                definition = f'{column.name} {column.type.compile(engine.dialect)}'
+                if not column.nullable:
+                    definition += ' NOT NULL'
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    if isinstance(default, str):
+                        definition += f" DEFAULT '{default}'"
+                    else:
+                        definition += f" DEFAULT {default.compile(engine, compile_kwargs={'literal_binds': True})}"
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {definition}'))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    with engine.begin() as connection:
+        fill_leaderboard(connection)
+
+
+migrate()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# One long-lived session per thread, reused by every query running on that thread
+Session = scoped_session(SessionLocal)
+
+
+@contextmanager
+def session_scope():
+    """
+    Provides the session of the current thread for one unit of work.
+
+    The session is rolled back if the unit of work raises and is always closed afterwards,
+    which returns its connection to the pool while the session itself is reused.
+
+    Yields:
+        Session: The SQLAlchemy session of the current thread.
+
+    Example:
+        with session_scope() as session:
+            # perform database operations
+    """
+    session = Session()
+    try:
+        yield session
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
 
 def get_db():
     """
     Provides a database session for use in database operations.
 
-    This function is a dependency that yields a database session.
+    This function is a dependency that yields the session of the current thread.
     It ensures that the session is properly closed after use.
 
     Yields:
         Session: A SQLAlchemy database session.
 
     Example:
-        with get_db() as db:
+        with next(get_db()) as db:
             # perform database operations
     """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    with session_scope() as session:
+        yield session
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import db.async_queries as async_queries
+
+message_archive_logger = logging.getLogger('db.message_archive')
+
+
+class MessageArchive:
+    """
+    Write-behind buffer for live messages stored in the local message archive.
+
+    Scans store the messages they read together with their checkpoint, live messages are
+    buffered here and written in batches, so per-word scans can search the archive instead
+    of reading the whole history from Discord.
+
+    Attributes:
+        enabled (bool): Whether messages are archived.
+        flush_threshold (int): The number of buffered messages that triggers a flush.
+    """
+
+    def __init__(self, enabled: bool = False, flush_threshold: int = 500):
+        """
+        Initializes an empty archive buffer.
+
+        Args:
+            enabled (bool, optional): Whether messages are archived. Defaults to False.
+            flush_threshold (int, optional): The number of buffered messages that triggers a flush.
+                Defaults to 500.
+        """
+        self.enabled = enabled
+        self.flush_threshold = flush_threshold
+        self._pending = []
+        self._flush_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        """
+        Gets the number of buffered messages.
+
+        Returns:
+            int: The number of buffered messages.
+        """
+        return len(self._pending)
+
+    async def add(self, message, content_normalized: str) -> None:
+        """
+        Buffers a live message if archiving is enabled.
+
+        Args:
+            message (discord.Message): The message to archive.
+            content_normalized (str): The normalized content of the message.
+
+        Raises:
+            DatabaseError: If there is an error flushing.
+        """
+        if not self.enabled:
+            return
+        self._pending.append((message.id, message.channel.id, message.author.id, content_normalized))
+        if len(self._pending) >= self.flush_threshold:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Writes all buffered messages to the archive in one transaction.
+
+        Returns:
+            int: The number of messages written.
+
+        Raises:
+            DatabaseError: If there is an error writing the messages. The messages stay buffered.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, []
+            try:
+                await async_queries.archive_messages(pending)
+            except async_queries.DatabaseError:
+                self._pending = pending + self._pending
+                message_archive_logger.error(f'Flush failed, keeping {len(pending)} buffered messages')
+                raise
+            message_archive_logger.debug(f'Archived {len(pending)} messages')
+            return len(pending)
+
+
+message_archive = MessageArchive()
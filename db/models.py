@@ -1,8 +1,10 @@
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey, CheckConstraint, UniqueConstraint
+    Column, Integer, Float, String, Text, Boolean, ForeignKey, CheckConstraint, UniqueConstraint, Index, DDL, event,
+    delete, false, insert, select, text
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
+from config import LEADERBOARD_SIZE
 
 Base = declarative_base()
 
@@ -61,4 +63,176 @@ class UserHasWord(Base):
     user = relationship("User", back_populates="words")
     word = relationship("Word", back_populates="users")
 
-    __table_args__ = (UniqueConstraint('user_id', 'word_name', name='uq_user_word'),)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'word_name', name='uq_user_word'),
+        # Top counts of a word when its leaderboard is read again, without sorting the table
+        Index('ix_user_has_word_word_name_count', word_name, count.desc()),
+    )
+
+
+class LeaderboardEntry(Base):
+    """
+    One of the `LEADERBOARD_SIZE` highest counts of a word, a materialized top of user_has_word.
+
+    The queries writing counts keep it up to date in the same transaction, so the top users of a
+    word and the highest count of all words are read without sorting user_has_word.
+
+    Attributes:
+        word_name (str): The word.
+        user_id (int): The ID of the user.
+        count (int): The count of the word for the user.
+    """
+    __tablename__ = 'leaderboard'
+
+    word_name = Column(String(45), primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Top of a word (/c, /hc, /tc) and of all words (/thc) in order, including the user_id tie-break
+        Index('ix_leaderboard_word_name_count', word_name, count.desc(), user_id),
+        Index('ix_leaderboard_count', count.desc(), user_id),
+    )
+
+
+class LeaderboardSize(Base):
+    """
+    The number of top counts per word the leaderboard was filled with, stored in a single row.
+
+    Attributes:
+        size (int): The `LEADERBOARD_SIZE` the leaderboard was filled with.
+    """
+    __tablename__ = 'leaderboard_size'
+
+    size = Column(Integer, primary_key=True)
+
+
+def fill_leaderboard(connection) -> None:
+    """
+    Fills the leaderboard from user_has_word if it was not filled with the configured size.
+
+    This fills the table after it was added to an existing database. After a change of
+    `LEADERBOARD_SIZE`, a larger size would leave the top of words incomplete and a smaller size
+    would keep too many users, so the table is filled again.
+
+    Args:
+        connection (Connection): The connection of the migration transaction.
+    """
+    if connection.execute(select(LeaderboardSize.size)).scalar() == LEADERBOARD_SIZE:
+        return
+    connection.execute(delete(LeaderboardEntry))
+    connection.execute(text(
+        "INSERT INTO leaderboard (word_name, user_id, count) "
+        "SELECT word_name, user_id, count FROM ("
+        "SELECT word_name, user_id, count, "
+        "ROW_NUMBER() OVER (PARTITION BY word_name ORDER BY count DESC, user_id) AS position FROM user_has_word"
+        ") WHERE position <= :size"
+    ), {'size': LEADERBOARD_SIZE})
+    connection.execute(delete(LeaderboardSize))
+    connection.execute(insert(LeaderboardSize).values(size=LEADERBOARD_SIZE))
+
+
+class ScanCheckpoint(Base):
+    """
+    The last message of a channel or thread processed by incremental scans.
+
+    Attributes:
+        channel_id (int): The ID of the channel or thread.
+        last_message_id (int): The ID of the last processed message.
+        archived (bool): Whether every message up to the checkpoint is stored in the message archive.
+    """
+    __tablename__ = 'scan_checkpoint'
+
+    channel_id = Column(Integer, primary_key=True)
+    last_message_id = Column(Integer, nullable=False)
+    archived = Column(Boolean, nullable=False, default=False, server_default=false())
+
+
+class ChannelWordCount(Base):
+    """
+    Word counts per user found by incremental scans in one channel or thread, up to its checkpoint.
+
+    The sum over all channels is the count of the whole scanned history.
+
+    Attributes:
+        channel_id (int): The ID of the channel or thread.
+        user_id (int): The ID of the user.
+        word_name (str): The word.
+        count (int): The number of times the user said the word in the channel.
+    """
+    __tablename__ = 'channel_word_count'
+
+    channel_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    word_name = Column(String(45), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ChannelAuthor(Base):
+    """
+    A user who wrote at least one message in a channel or thread, as seen by incremental scans up to its checkpoint.
+
+    The primary key starts with the author, so the channels of a user are found with one index lookup.
+
+    Attributes:
+        author_id (int): The ID of the user.
+        channel_id (int): The ID of the channel or thread.
+    """
+    __tablename__ = 'channel_author'
+
+    author_id = Column(Integer, primary_key=True)
+    channel_id = Column(Integer, primary_key=True)
+
+
+class ThreadCatalog(Base):
+    """
+    A thread known to the bot, kept up to date by thread events so scans do not list threads from Discord.
+
+    Attributes:
+        thread_id (int): The ID of the thread.
+        parent_id (int): The ID of the text channel of the thread.
+        name (str): The name of the thread.
+        archived (bool): Whether the thread is archived.
+        archive_timestamp (float): The POSIX time the archived state last changed.
+        last_message_id (int): The ID of the last message in the thread, None if unknown.
+    """
+    __tablename__ = 'thread_catalog'
+
+    thread_id = Column(Integer, primary_key=True)
+    parent_id = Column(Integer, nullable=False, index=True)
+    name = Column(String(100), nullable=False)
+    archived = Column(Boolean, nullable=False, default=False)
+    archive_timestamp = Column(Float)
+    last_message_id = Column(Integer)
+
+
+class ArchivedMessage(Base):
+    """
+    A message stored in the local message archive, with its content normalized for matching.
+
+    The content is indexed by the `message_archive_fts` full-text table, kept up to date by triggers.
+
+    Attributes:
+        id (int): The message ID.
+        channel_id (int): The ID of the channel or thread of the message.
+        author_id (int): The ID of the author.
+        content (str): The normalized message content.
+    """
+    __tablename__ = 'message_archive'
+
+    id = Column(Integer, primary_key=True)
+    channel_id = Column(Integer, nullable=False)
+    author_id = Column(Integer, nullable=False, index=True)
+    content = Column(Text, nullable=False)
+
+
+for statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS message_archive_fts "
+    "USING fts5(content, content='message_archive', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS message_archive_ai AFTER INSERT ON message_archive BEGIN "
+    "INSERT INTO message_archive_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS message_archive_ad AFTER DELETE ON message_archive BEGIN "
+    "INSERT INTO message_archive_fts(message_archive_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+):
+    event.listen(ArchivedMessage.__table__, 'after_create', DDL(statement))
+event.listen(ArchivedMessage.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS message_archive_fts'))
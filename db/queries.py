@@ -1,17 +1,33 @@
+import heapq
 import logging
+import re
+import threading
+from collections import OrderedDict
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy import delete, func, or_, select, text, tuple_
 from sqlalchemy.exc import SQLAlchemyError
-from db.models import Base, User, Word, UserHasWord
-from typing import Optional, List, Tuple
-from db.database import get_db
+from db.models import (
+    Base, User, Word, UserHasWord, LeaderboardEntry, ScanCheckpoint, ChannelWordCount, ChannelAuthor, ThreadCatalog,
+    ArchivedMessage
+)
+from typing import Callable, Optional, List, Tuple, Dict, Iterable
+from config import COUNT_CACHE_SIZE, LEADERBOARD_SIZE
+from db.database import session_scope
 from dogpile.cache import make_region
 
 queries_logger = logging.getLogger('db.queries')
 queries_logger.info('Logging setup complete')
 
-region = make_region().configure(
-    'dogpile.cache.memory',
-    expiration_time=300
-)
+# Entries never expire, the cached words are keyed by the word set version instead
+region = make_region().configure('dogpile.cache.memory')
+
+# Version of the tracked word set, incremented by every write that changes the words
+_word_set_version = 0
+
+# IDs of the admins mirrored from the user.permission column, None until first loaded.
+# Every write of the column recomputes the set in its transaction and publishes it after commit.
+_admin_ids = None
+_admin_ids_lock = threading.Lock()
 
 
 class DatabaseError(Exception):
@@ -36,6 +52,163 @@ class DatabaseError(Exception):
         super().__init__(self.message)
 
 
+class CountCache:
+    """
+    Bounded LRU cache of user_has_word counts, kept coherent by the queries writing counts.
+
+    Missing records are cached as None, so checking if a user said a word for the first time
+    is served from memory as well. Reads run on several threads and writes on the writer
+    thread, so every access holds a lock. A read only fills the cache if no write happened
+    since it started, otherwise it could replace a newer count with the one it read before the
+    write committed.
+
+    Attributes:
+        max_size (int): The maximum number of cached counts.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that had to query the database.
+    """
+
+    def __init__(self, max_size: int):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_size (int): The maximum number of cached counts.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def __len__(self) -> int:
+        """
+        Gets the number of cached counts.
+
+        Returns:
+            int: The number of cached counts.
+        """
+        return len(self._counts)
+
+    def lookup(self, user_id: int, word: str) -> Tuple[bool, Optional[int], int]:
+        """
+        Looks up a count and records a hit or a miss.
+
+        Args:
+            user_id (int): The ID of the user.
+            word (str): The word.
+
+        Returns:
+            Tuple[bool, Optional[int], int]: Whether the count is cached, the cached count (None if
+            the user never said the word) and the write counter to pass to `fill` after a miss.
+        """
+        key = (user_id, word)
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                self.hits += 1
+                return True, self._counts[key], self._writes
+            self.misses += 1
+            return False, None, self._writes
+
+    def fill(self, user_id: int, word: str, count: Optional[int], writes: int) -> None:
+        """
+        Caches a count read from the database, unless a write happened since the lookup.
+
+        Args:
+            user_id (int): The ID of the user.
+            word (str): The word.
+            count (Optional[int]): The count read, None if there is no record.
+            writes (int): The write counter returned by `lookup`.
+        """
+        with self._lock:
+            if writes == self._writes:
+                self._store((user_id, word), count)
+
+    def store(self, user_id: int, word: str, count: int) -> None:
+        """
+        Caches the count written by a query.
+
+        Args:
+            user_id (int): The ID of the user.
+            word (str): The word.
+            count (int): The stored count.
+        """
+        with self._lock:
+            self._writes += 1
+            self._store((user_id, word), count)
+
+    def update(self, counts: Dict[Tuple[int, str], int], combine: Callable[[Optional[int], int], int]) -> None:
+        """
+        Applies counts written by a batched query to the cached counts.
+
+        Pairs that are not cached stay uncached, their new count is not known without a read.
+
+        Args:
+            counts (Dict[Tuple[int, str], int]): The written count of each (user_id, word) pair.
+            combine (Callable[[Optional[int], int], int]): Computes the stored count from the
+                cached count and the written count, like the query did.
+        """
+        with self._lock:
+            self._writes += 1
+            for key, count in counts.items():
+                if key in self._counts:
+                    self._counts[key] = combine(self._counts[key], count)
+
+    def discard_word(self, word: str) -> None:
+        """
+        Drops all cached counts of a word, e.g. after the word was removed.
+
+        Args:
+            word (str): The word to drop.
+        """
+        with self._lock:
+            self._writes += 1
+            for key in [key for key in self._counts if key[1] == word]:
+                del self._counts[key]
+
+    def clear(self) -> None:
+        """
+        Drops all cached counts.
+        """
+        with self._lock:
+            self._writes += 1
+            self._counts.clear()
+
+    def _store(self, key: Tuple[int, str], count: Optional[int]) -> None:
+        """
+        Caches a count as most recently used, evicting the least recently used count if full.
+
+        Args:
+            key (Tuple[int, str]): The (user_id, word) pair.
+            count (Optional[int]): The count.
+        """
+        self._counts[key] = count
+        self._counts.move_to_end(key)
+        if len(self._counts) > self.max_size:
+            self._counts.popitem(last=False)
+
+
+count_cache = CountCache(COUNT_CACHE_SIZE)
+
+
+def get_count_cache_stats() -> Dict[str, float]:
+    """
+    Gets statistics about the count cache.
+
+    Returns:
+        Dict[str, float]: The number of cache hits, cache misses, cached counts and the hit rate.
+    """
+    lookups = count_cache.hits + count_cache.misses
+    return {
+        'hits': count_cache.hits,
+        'misses': count_cache.misses,
+        'cached': len(count_cache),
+        'hit_rate': count_cache.hits / lookups if lookups else 0.0,
+    }
+
+
 def drop_tables():
     """
     Drops and recreates all tables in the database.
@@ -44,8 +217,14 @@ def drop_tables():
         DatabaseError: If there is an error dropping or recreating the tables.
     """
     try:
-        with next(get_db()) as session:
+        with session_scope() as session:
             # Drop tables
+            ArchivedMessage.__table__.drop(session.bind, checkfirst=True)
+            ChannelAuthor.__table__.drop(session.bind, checkfirst=True)
+            ThreadCatalog.__table__.drop(session.bind, checkfirst=True)
+            ChannelWordCount.__table__.drop(session.bind, checkfirst=True)
+            ScanCheckpoint.__table__.drop(session.bind, checkfirst=True)
+            LeaderboardEntry.__table__.drop(session.bind, checkfirst=True)
             UserHasWord.__table__.drop(session.bind, checkfirst=True)
             Word.__table__.drop(session.bind, checkfirst=True)
             User.__table__.drop(session.bind, checkfirst=True)
@@ -54,6 +233,9 @@ def drop_tables():
             Base.metadata.create_all(session.bind)
 
             queries_logger.info('Tables dropped and recreated successfully')
+        _word_set_changed()
+        count_cache.clear()
+        _set_admin_ids(frozenset())
     except SQLAlchemyError as e:
         queries_logger.error(f'Failed to drop and recreate tables: {e}')
         raise DatabaseError('Failed to drop and recreate tables', e)
@@ -70,20 +252,22 @@ def add_words(*words):
         DatabaseError: If there is an error inserting the words.
     """
     try:
-        with next(get_db()) as session:
+        with session_scope() as session:
             for word in set(words):
                 session.merge(Word(name=word))
             session.commit()
             queries_logger.info(f'Words added: {words}')
+        _word_set_changed()
     except SQLAlchemyError as e:
-        session.rollback()
         queries_logger.error(f'Error inserting words: {e}')
         raise DatabaseError('Error inserting words', e)
 
 
 def add_user_ids(*user_ids):
     """
-    Adds user IDs to the database if they don't exist.
+    Adds user IDs to the database if they don't exist, in one set-based insert.
+
+    Existing users keep their permission, which is only changed by `add_admins` and `sync_admins`.
 
     Args:
         *user_ids: A variable number of user ID integers to add.
@@ -91,21 +275,24 @@ def add_user_ids(*user_ids):
     Raises:
         DatabaseError: If there is an error inserting the user IDs.
     """
+    if not user_ids:
+        return
     try:
-        with next(get_db()) as session:
-            for user_id in set(user_ids):
-                session.merge(User(id=user_id, permission='user'))
+        with session_scope() as session:
+            statement = insert(User).on_conflict_do_nothing(index_elements=[User.id])
+            result = session.connection().execute(
+                statement, [{'id': user_id, 'permission': 'user'} for user_id in set(user_ids)]
+            )
             session.commit()
-            queries_logger.info(f'User IDs added: {user_ids}')
+            queries_logger.info(f'User IDs added: {result.rowcount} new of {len(user_ids)}')
     except SQLAlchemyError as e:
-        session.rollback()
         queries_logger.error(f'Error inserting user IDs: {e}')
         raise DatabaseError('Error inserting user IDs', e)
 
 
 def add_admins(*user_ids: int) -> None:
     """
-    Adds admin permission to the specified user IDs.
+    Adds admin permission to the specified user IDs in one update. Unknown IDs are ignored.
 
     Args:
         *user_ids: A variable number of user ID integers to promote to admin.
@@ -114,19 +301,52 @@ def add_admins(*user_ids: int) -> None:
         DatabaseError: If there is an error making users admin.
     """
     try:
-        with next(get_db()) as session:
-            for user_id in set(user_ids):
-                user = session.query(User).filter_by(id=user_id).first()
-                if user:
-                    user.permission = 'admin'
+        with session_scope() as session:
+            if user_ids:
+                session.query(User).filter(User.id.in_(set(user_ids))).update(
+                    {User.permission: 'admin'}, synchronize_session=False
+                )
+            admin_ids = _query_admin_ids(session)
             session.commit()
+            _set_admin_ids(admin_ids)
             queries_logger.info(f'Admins added: {user_ids}')
     except SQLAlchemyError as e:
-        session.rollback()
         queries_logger.error(f'Failed to make users admin: {e}')
         raise DatabaseError('Failed to make users admin', e)
 
 
+def sync_admins(*user_ids: int) -> None:
+    """
+    Makes exactly the specified user IDs admins in one transaction. Unknown IDs are ignored.
+
+    The given users are promoted and every other admin is demoted to the user permission, so
+    removing an ID from the configured admins revokes it.
+
+    Args:
+        *user_ids: A variable number of user ID integers that should be the admins.
+
+    Raises:
+        DatabaseError: If there is an error synchronizing the admins.
+    """
+    admin_ids = set(user_ids)
+    try:
+        with session_scope() as session:
+            if admin_ids:
+                session.query(User).filter(User.id.in_(admin_ids)).update(
+                    {User.permission: 'admin'}, synchronize_session=False
+                )
+            session.query(User).filter(User.permission == 'admin', User.id.not_in(admin_ids)).update(
+                {User.permission: 'user'}, synchronize_session=False
+            )
+            admin_ids = _query_admin_ids(session)
+            session.commit()
+            _set_admin_ids(admin_ids)
+            queries_logger.info(f'Admins synchronized: {sorted(admin_ids)}')
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Failed to synchronize admins: {e}')
+        raise DatabaseError('Failed to synchronize admins', e)
+
+
 def add_user_has_word(user_id: int, word: str, count: int) -> None:
     """
     Inserts a new user_has_word record.
@@ -140,13 +360,15 @@ def add_user_has_word(user_id: int, word: str, count: int) -> None:
         DatabaseError: If there is an error inserting the record.
     """
     try:
-        with next(get_db()) as session:
+        with session_scope() as session:
             user_has_word = UserHasWord(user_id=user_id, word_name=word, count=count)
             session.merge(user_has_word)
+            # The record may replace a higher count, so the word's top is read again
+            _rebuild_leaderboard(session, [word])
             session.commit()
+            count_cache.store(user_id, word, count)
             queries_logger.info(f'Inserted user_has_word record: {user_id} | {word} | {count}')
     except SQLAlchemyError as e:
-        session.rollback()
         queries_logger.error(f'Error inserting user_has_word record: {e}')
         raise DatabaseError('Error inserting user_has_word record', e)
 
@@ -162,21 +384,24 @@ def remove_word(word: str) -> None:
         DatabaseError: If there is an error removing the word.
     """
     try:
-        with next(get_db()) as session:
+        with session_scope() as session:
             word_obj = session.query(Word).filter_by(name=word).first()
             if word_obj:
                 session.delete(word_obj)
+                session.query(ChannelWordCount).filter_by(word_name=word).delete()
+                session.query(LeaderboardEntry).filter_by(word_name=word).delete()
                 session.commit()
                 queries_logger.info(f'Removed word: {word} successfully')
+                _word_set_changed()
+                count_cache.discard_word(word)
     except SQLAlchemyError as e:
-        session.rollback()
         queries_logger.error(f'Error removing word: {e}')
         raise DatabaseError('Error removing word', e)
 
 
 def get_count(user_id: int, word: str) -> Optional[int]:
     """
-    Gets the count for a specific user ID and word.
+    Gets the count for a specific user ID and word, served from the count cache when possible.
 
     Args:
         user_id (int): The ID of the user.
@@ -188,10 +413,14 @@ def get_count(user_id: int, word: str) -> Optional[int]:
     Raises:
         DatabaseError: If there is an error retrieving the count.
     """
+    cached, result, writes = count_cache.lookup(user_id, word)
+    if cached:
+        return result
     try:
-        with next(get_db()) as session:
+        with session_scope() as session:
             user_has_word = session.query(UserHasWord).filter_by(user_id=user_id, word_name=word).first()
             result = user_has_word.count if user_has_word else None
+            count_cache.fill(user_id, word, result, writes)
             queries_logger.debug(f'get_count result for user {user_id}, word {word}: {result}')
             return result
     except SQLAlchemyError as e:
@@ -199,11 +428,50 @@ def get_count(user_id: int, word: str) -> Optional[int]:
         raise DatabaseError('Error getting count', e)
 
 
-@region.cache_on_arguments()
+def get_word_set_version() -> int:
+    """
+    Gets the version of the tracked word set, which changes whenever words are added or removed.
+
+    Returns:
+        int: The word set version.
+    """
+    return _word_set_version
+
+
+def _word_set_changed() -> None:
+    """
+    Increments the word set version and drops the cached words of the previous version.
+    """
+    global _word_set_version
+    _word_set_version += 1
+    _get_words.invalidate(_word_set_version - 1)
+    queries_logger.debug(f'Word set version changed to {_word_set_version}')
+
+
 def get_words() -> List[str]:
+    """
+    Gets all words from the database, cached until the word set changes.
+
+    Returns:
+        List[str]: A list of all words in the database.
+
+    Raises:
+        DatabaseError: If there is an error retrieving the words.
+    """
+    return _get_words(_word_set_version)
+
+
+@region.cache_on_arguments()
+def _get_words(version: int) -> List[str]:
     """
     Gets all words from the database, with caching using dogpile.cache.
 
+    The version is part of the cache key, so a read racing with a write can only cache the
+    old words under the old version.
+
+    Args:
+        version (int): The word set version the result is cached for.
+
     Returns:
         List[str]: A list of all words in the database.
 
@@ -211,10 +479,10 @@ def get_words() -> List[str]:
         DatabaseError: If there is an error retrieving the words.
     """
     try:
-        with next(get_db()) as session:
+        with session_scope() as session:
             words = session.query(Word.name).all()
             result = [word.name for word in words]
-            queries_logger.debug(f'get_words result: {result}')
+            queries_logger.debug(f'get_words result for version {version}: {result}')
             return result
     except SQLAlchemyError as e:
         queries_logger.error(f'Error retrieving words from the database: {e}')
@@ -232,7 +500,7 @@ def get_all_users() -> List[int]:
         DatabaseError: If there is an error retrieving the user IDs.
     """
     try:
-        with next(get_db()) as session:
+        with session_scope() as session:
             users = session.query(User.id).all()
             result = [user.id for user in users]
             queries_logger.debug(f'get_all_users result: {result}')
@@ -244,7 +512,7 @@ def get_all_users() -> List[int]:
 
 def get_highest_count_column(word: str) -> Optional[Tuple]:
     """
-    Gets the user with the highest count for a specific word.
+    Gets the user with the highest count for a specific word from the leaderboard.
 
     Args:
         word (str): The word to find the highest count for.
@@ -257,8 +525,13 @@ def get_highest_count_column(word: str) -> Optional[Tuple]:
         DatabaseError: If there is an error retrieving the highest count.
     """
     try:
-        with next(get_db()) as session:
-            result = session.query(UserHasWord).filter_by(word_name=word).order_by(UserHasWord.count.desc()).first()
+        with session_scope() as session:
+            result = (
+                session.query(LeaderboardEntry)
+                .filter_by(word_name=word)
+                .order_by(LeaderboardEntry.count.desc(), LeaderboardEntry.user_id)
+                .first()
+            )
             tuple_result = (result.user_id, result.word_name, result.count) if result else None
             queries_logger.debug(f'get_highest_count_column result for word {word}: {tuple_result}')
             return tuple_result
@@ -269,7 +542,7 @@ def get_highest_count_column(word: str) -> Optional[Tuple]:
 
 def get_total_highest_count_column() -> Optional[Tuple]:
     """
-    Gets the column with the highest count from the user_has_word table.
+    Gets the column with the highest count of all words from the leaderboard.
 
     Returns:
         Optional[Tuple]: A tuple of (user_id, word_name, count) for the highest count, or None if not found.
@@ -278,8 +551,12 @@ def get_total_highest_count_column() -> Optional[Tuple]:
         DatabaseError: If there is an error retrieving the highest count column.
     """
     try:
-        with next(get_db()) as session:
-            result = session.query(UserHasWord).order_by(UserHasWord.count.desc()).first()
+        with session_scope() as session:
+            result = (
+                session.query(LeaderboardEntry)
+                .order_by(LeaderboardEntry.count.desc(), LeaderboardEntry.user_id)
+                .first()
+            )
             tuple_result = (result.user_id, result.word_name, result.count) if result else None
             queries_logger.debug(f'get_total_highest_count_column result: {tuple_result}')
             return tuple_result
@@ -288,6 +565,114 @@ def get_total_highest_count_column() -> Optional[Tuple]:
         raise DatabaseError('Error getting highest count column', e)
 
 
+def get_leaderboard(word: str) -> List[Tuple[int, int]]:
+    """
+    Gets the users with the highest counts for a specific word from the leaderboard.
+
+    Args:
+        word (str): The word to get the top users for.
+
+    Returns:
+        List[Tuple[int, int]]: Up to `LEADERBOARD_SIZE` tuples of (user_id, count), highest count first.
+
+    Raises:
+        DatabaseError: If there is an error retrieving the leaderboard.
+    """
+    try:
+        with session_scope() as session:
+            result = [
+                (entry.user_id, entry.count)
+                for entry in session.query(LeaderboardEntry)
+                .filter_by(word_name=word)
+                .order_by(LeaderboardEntry.count.desc(), LeaderboardEntry.user_id)
+            ]
+            queries_logger.debug(f'get_leaderboard result for word {word}: {result}')
+            return result
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error getting leaderboard for word {word}: {e}')
+        raise DatabaseError('Error getting leaderboard', e)
+
+
+def _update_leaderboard(session, new_counts: Dict[Tuple[int, str], int]) -> None:
+    """
+    Applies raised counts to the leaderboard in the transaction that raised them.
+
+    Counts that only grew can push other users out of the top of a word but never bring a user
+    back in, so the new top is within the old top and the raised pairs. Only the highest raised
+    pairs of each word that are not below the lowest count of its full top are written, then each
+    top is cut back to size.
+
+    Args:
+        session (Session): The session writing the counts.
+        new_counts (Dict[Tuple[int, str], int]): The new count of each raised (user_id, word) pair.
+    """
+    if not new_counts:
+        return
+    session.flush()
+    candidates = {}
+    for (user_id, word), count in new_counts.items():
+        candidates.setdefault(word, []).append((-count, user_id))
+    lowest_counts = dict(
+        session.query(LeaderboardEntry.word_name, func.min(LeaderboardEntry.count))
+        .filter(LeaderboardEntry.word_name.in_(candidates))
+        .group_by(LeaderboardEntry.word_name)
+        .having(func.count() >= LEADERBOARD_SIZE)
+    )
+    rows = [
+        {'word_name': word, 'user_id': user_id, 'count': -negative_count}
+        for word, word_candidates in candidates.items()
+        for negative_count, user_id in heapq.nsmallest(LEADERBOARD_SIZE, word_candidates)
+        if -negative_count >= lowest_counts.get(word, 0)
+    ]
+    if not rows:
+        return
+    statement = insert(LeaderboardEntry)
+    statement = statement.on_conflict_do_update(
+        index_elements=[LeaderboardEntry.word_name, LeaderboardEntry.user_id],
+        set_={'count': statement.excluded.count}
+    )
+    session.connection().execute(statement, rows)
+
+    position = func.row_number().over(
+        partition_by=LeaderboardEntry.word_name,
+        order_by=(LeaderboardEntry.count.desc(), LeaderboardEntry.user_id)
+    ).label('position')
+    ranked = (
+        select(LeaderboardEntry.word_name, LeaderboardEntry.user_id, position)
+        .where(LeaderboardEntry.word_name.in_({row['word_name'] for row in rows}))
+        .subquery()
+    )
+    session.execute(delete(LeaderboardEntry).where(
+        tuple_(LeaderboardEntry.word_name, LeaderboardEntry.user_id).in_(
+            select(ranked.c.word_name, ranked.c.user_id).where(ranked.c.position > LEADERBOARD_SIZE)
+        )
+    ))
+
+
+def _rebuild_leaderboard(session, words: Iterable[str]) -> None:
+    """
+    Reads the top of words from user_has_word again, needed after a count was lowered.
+
+    Args:
+        session (Session): The session writing the counts.
+        words (Iterable[str]): The words whose top is read again.
+    """
+    session.flush()
+    for word in words:
+        session.query(LeaderboardEntry).filter_by(word_name=word).delete()
+        top = (
+            session.query(UserHasWord.user_id, UserHasWord.count)
+            .filter_by(word_name=word)
+            .order_by(UserHasWord.count.desc(), UserHasWord.user_id)
+            .limit(LEADERBOARD_SIZE)
+            .all()
+        )
+        if top:
+            session.connection().execute(insert(LeaderboardEntry), [
+                {'word_name': word, 'user_id': user_id, 'count': count} for user_id, count in top
+            ])
+
+
 def update_user_count(user_id: int, word: str, count: int) -> None:
     """
     Updates the user count for a specific word.
@@ -301,21 +686,549 @@ def update_user_count(user_id: int, word: str, count: int) -> None:
         DatabaseError: If there is an error updating the count.
     """
     try:
-        with next(get_db()) as session:
+        with session_scope() as session:
             user_has_word = session.query(UserHasWord).filter_by(user_id=user_id, word_name=word).first()
             if user_has_word:
                 user_has_word.count += count
             else:
                 user_has_word = UserHasWord(user_id=user_id, word_name=word, count=count)
                 session.add(user_has_word)
+            new_count = user_has_word.count
+            if count < 0:
+                _rebuild_leaderboard(session, [word])
+            else:
+                _update_leaderboard(session, {(user_id, word): new_count})
             session.commit()
+            count_cache.store(user_id, word, new_count)
             queries_logger.info(f'Updated count for user: {user_id} with word: {word} to {count}')
     except SQLAlchemyError as e:
-        session.rollback()
         queries_logger.error(f'Error updating count for user: {user_id} with word: {word}: {e}')
         raise DatabaseError('Error updating count', e)
 
 
+def _filter_tracked_pairs(session, counts: Dict[Tuple[int, str], int]) -> Dict[Tuple[int, str], int]:
+    """
+    Drops the counts of words that are no longer tracked, inside the transaction that writes them.
+
+    Counts are buffered and scanned outside of the writer thread, so a word can be removed between
+    counting and writing. Checking in the writing transaction keeps the write from recreating
+    user_has_word and leaderboard records of the removed word.
+
+    Args:
+        session: The session of the writing transaction.
+        counts (Dict[Tuple[int, str], int]): The counts for each (user_id, word) pair.
+
+    Returns:
+        Dict[Tuple[int, str], int]: The counts of the pairs whose word still exists.
+    """
+    words = {word for _, word in counts}
+    tracked_words = set(session.scalars(select(Word.name).where(Word.name.in_(words))))
+    if len(tracked_words) == len(words):
+        return counts
+    queries_logger.info(f'Skipped counts of removed words: {sorted(words - tracked_words)}')
+    return {key: count for key, count in counts.items() if key[1] in tracked_words}
+
+
+def increment_user_counts(increments: Dict[Tuple[int, str], int]) -> None:
+    """
+    Adds many count increments in one transaction, creating missing user_has_word records.
+
+    Increments of words that were removed in the meantime are skipped.
+
+    Args:
+        increments (Dict[Tuple[int, str], int]): The count to add for each (user_id, word) pair.
+
+    Raises:
+        DatabaseError: If there is an error updating the counts.
+    """
+    if not increments:
+        return
+    try:
+        with session_scope() as session:
+            increments = _filter_tracked_pairs(session, increments)
+            if not increments:
+                return
+            statement = insert(UserHasWord)
+            statement = statement.on_conflict_do_update(
+                index_elements=[UserHasWord.user_id, UserHasWord.word_name],
+                set_={'count': UserHasWord.count + statement.excluded.count}
+            ).returning(UserHasWord.user_id, UserHasWord.word_name, UserHasWord.count)
+            result = session.connection().execute(statement, [
+                {'user_id': user_id, 'word_name': word, 'count': count}
+                for (user_id, word), count in increments.items()
+            ])
+            new_counts = {(user_id, word): count for user_id, word, count in result}
+            decreased_words = {word for (_, word), increment in increments.items() if increment < 0}
+            _update_leaderboard(session, {key: count for key, count in new_counts.items()
+                                          if key[1] not in decreased_words})
+            _rebuild_leaderboard(session, decreased_words)
+            session.commit()
+            count_cache.update(new_counts, lambda cached, count: count)
+            queries_logger.info(f'Incremented counts for {len(increments)} user-word pairs')
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error incrementing counts: {e}')
+        raise DatabaseError('Error incrementing counts', e)
+
+
+def upsert_highest_counts(word_counts: Dict[int, Dict[str, int]]) -> int:
+    """
+    Applies scanned word counts in one transaction, only ever raising stored counts.
+
+    Missing user_has_word records are inserted, existing records are updated only if the new
+    count is higher than the stored count. Counts of words that were removed in the meantime are
+    skipped.
+
+    Args:
+        word_counts (Dict[int, Dict[str, int]]): The counts per word for each user ID.
+
+    Returns:
+        int: The number of records inserted or updated.
+
+    Raises:
+        DatabaseError: If there is an error writing the counts.
+    """
+    counts = {
+        (user_id, word): count
+        for user_id, user_word_counts in word_counts.items()
+        for word, count in user_word_counts.items()
+    }
+    if not counts:
+        return 0
+    try:
+        with session_scope() as session:
+            rows = [{'user_id': user_id, 'word_name': word, 'count': count}
+                    for (user_id, word), count in _filter_tracked_pairs(session, counts).items()]
+            if not rows:
+                return 0
+            statement = insert(UserHasWord)
+            statement = statement.on_conflict_do_update(
+                index_elements=[UserHasWord.user_id, UserHasWord.word_name],
+                set_={'count': statement.excluded.count},
+                where=statement.excluded.count > UserHasWord.count
+            ).returning(UserHasWord.user_id, UserHasWord.word_name, UserHasWord.count)
+            result = session.connection().execute(statement, rows)
+            # Only inserted and raised records are returned
+            new_counts = {(user_id, word): count for user_id, word, count in result}
+            _update_leaderboard(session, new_counts)
+            session.commit()
+            count_cache.update(new_counts, lambda cached, count: count)
+            queries_logger.info(f'Upserted highest counts - {len(new_counts)} of {len(rows)} records modified')
+            return len(new_counts)
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error upserting highest counts: {e}')
+        raise DatabaseError('Error upserting highest counts', e)
+
+
+def get_scan_checkpoint(channel_id: int) -> Optional[Tuple[int, bool]]:
+    """
+    Gets the last message processed by incremental scans in a channel or thread.
+
+    Args:
+        channel_id (int): The ID of the channel or thread.
+
+    Returns:
+        Optional[Tuple[int, bool]]: A tuple of (last_message_id, archived), or None if the channel
+        was never scanned. `archived` is True if all messages up to the checkpoint are archived.
+
+    Raises:
+        DatabaseError: If there is an error retrieving the checkpoint.
+    """
+    try:
+        with session_scope() as session:
+            checkpoint = session.get(ScanCheckpoint, channel_id)
+            result = (checkpoint.last_message_id, checkpoint.archived) if checkpoint else None
+            queries_logger.debug(f'get_scan_checkpoint result for channel {channel_id}: {result}')
+            return result
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error getting scan checkpoint for channel {channel_id}: {e}')
+        raise DatabaseError('Error getting scan checkpoint', e)
+
+
+def has_scan_checkpoints() -> bool:
+    """
+    Checks if any channel or thread was scanned by an incremental scan.
+
+    Returns:
+        bool: True if at least one checkpoint exists.
+
+    Raises:
+        DatabaseError: If there is an error checking the checkpoints.
+    """
+    try:
+        with session_scope() as session:
+            result = session.query(ScanCheckpoint.channel_id).first() is not None
+            queries_logger.debug(f'has_scan_checkpoints result: {result}')
+            return result
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error checking scan checkpoints: {e}')
+        raise DatabaseError('Error checking scan checkpoints', e)
+
+
+def save_scan_progress(channel_id: int, last_message_id: int, word_counts: Dict[int, Dict[str, int]],
+                       archived_messages: Optional[List[Tuple[int, int, int, str]]] = None,
+                       author_ids: Iterable[int] = ()) -> None:
+    """
+    Adds the counts of newly scanned messages of a channel and moves its checkpoint in one transaction.
+
+    Counts of words that were removed in the meantime are skipped.
+
+    Args:
+        channel_id (int): The ID of the channel or thread.
+        last_message_id (int): The ID of the last scanned message.
+        word_counts (Dict[int, Dict[str, int]]): The counts per word for each user ID found in the
+            messages since the previous checkpoint.
+        archived_messages (List[Tuple[int, int, int, str]], optional): The scanned messages as
+            (message_id, channel_id, author_id, normalized content) to store in the message archive.
+            If None, the checkpoint is marked as not archived. Defaults to None.
+        author_ids (Iterable[int], optional): The IDs of the authors of the scanned messages.
+            Defaults to no authors.
+
+    Raises:
+        DatabaseError: If there is an error saving the progress.
+    """
+    counts = {
+        (user_id, word): count
+        for user_id, user_word_counts in word_counts.items()
+        for word, count in user_word_counts.items()
+    }
+    try:
+        with session_scope() as session:
+            rows = [{'channel_id': channel_id, 'user_id': user_id, 'word_name': word, 'count': count}
+                    for (user_id, word), count in _filter_tracked_pairs(session, counts).items()] if counts else []
+            if rows:
+                statement = insert(ChannelWordCount)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[ChannelWordCount.channel_id, ChannelWordCount.user_id, ChannelWordCount.word_name],
+                    set_={'count': ChannelWordCount.count + statement.excluded.count}
+                )
+                session.execute(statement, rows)
+            if archived_messages:
+                _insert_archived_messages(session, archived_messages)
+            author_rows = [{'author_id': author_id, 'channel_id': channel_id} for author_id in set(author_ids)]
+            if author_rows:
+                session.execute(insert(ChannelAuthor).on_conflict_do_nothing(), author_rows)
+            session.merge(ScanCheckpoint(
+                channel_id=channel_id, last_message_id=last_message_id, archived=archived_messages is not None
+            ))
+            session.commit()
+            queries_logger.debug(f'Scan progress saved for channel {channel_id} at message {last_message_id}: '
+                                 f'{len(rows)} records')
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error saving scan progress for channel {channel_id}: {e}')
+        raise DatabaseError('Error saving scan progress', e)
+
+
+def reset_scan_progress(channel_id: int) -> None:
+    """
+    Removes the checkpoint, the stored counts and the authors of a channel, so the next incremental
+    scan starts over.
+
+    Args:
+        channel_id (int): The ID of the channel or thread.
+
+    Raises:
+        DatabaseError: If there is an error resetting the progress.
+    """
+    try:
+        with session_scope() as session:
+            session.query(ChannelWordCount).filter_by(channel_id=channel_id).delete()
+            session.query(ChannelAuthor).filter_by(channel_id=channel_id).delete()
+            session.query(ScanCheckpoint).filter_by(channel_id=channel_id).delete()
+            session.commit()
+            queries_logger.info(f'Scan progress reset for channel {channel_id}')
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error resetting scan progress for channel {channel_id}: {e}')
+        raise DatabaseError('Error resetting scan progress', e)
+
+
+def get_author_channels(author_id: int, archived: Optional[bool] = None) -> List[int]:
+    """
+    Gets the channels and threads where a user wrote messages, up to their checkpoints.
+
+    Args:
+        author_id (int): The ID of the user.
+        archived (bool, optional): If given, only the channels whose checkpoint is archived (True)
+            or not archived (False). Defaults to all channels.
+
+    Returns:
+        List[int]: The IDs of the channels and threads.
+
+    Raises:
+        DatabaseError: If there is an error retrieving the channels.
+    """
+    try:
+        with session_scope() as session:
+            query = session.query(ChannelAuthor.channel_id).filter_by(author_id=author_id)
+            if archived is not None:
+                query = query.join(ScanCheckpoint, ScanCheckpoint.channel_id == ChannelAuthor.channel_id).filter(
+                    ScanCheckpoint.archived.is_(archived)
+                )
+            result = [channel_id for channel_id, in query.all()]
+            queries_logger.debug(f'get_author_channels result for user {author_id}: {len(result)} channels')
+            return result
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error getting channels of user {author_id}: {e}')
+        raise DatabaseError('Error getting channels of user', e)
+
+
+def get_cataloged_threads(thread_ids: Iterable[int]) -> Dict[int, Tuple[int, str, Optional[int]]]:
+    """
+    Gets the catalog entries of threads by ID.
+
+    Args:
+        thread_ids (Iterable[int]): The IDs of the threads. IDs of other channels are ignored.
+
+    Returns:
+        Dict[int, Tuple[int, str, Optional[int]]]: The (parent_id, name, last_message_id) of each
+        cataloged thread by thread ID.
+
+    Raises:
+        DatabaseError: If there is an error retrieving the threads.
+    """
+    thread_ids = set(thread_ids)
+    if not thread_ids:
+        return {}
+    try:
+        with session_scope() as session:
+            rows = session.query(
+                ThreadCatalog.thread_id, ThreadCatalog.parent_id, ThreadCatalog.name, ThreadCatalog.last_message_id
+            ).filter(ThreadCatalog.thread_id.in_(thread_ids)).all()
+            result = {thread_id: (parent_id, name, last_message_id)
+                      for thread_id, parent_id, name, last_message_id in rows}
+            queries_logger.debug(f'get_cataloged_threads result: {len(result)} of {len(thread_ids)} threads')
+            return result
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error getting cataloged threads: {e}')
+        raise DatabaseError('Error getting cataloged threads', e)
+
+
+def get_thread_catalog(parent_id: int) -> List[Tuple[int, str, bool, Optional[float], Optional[int]]]:
+    """
+    Gets the known threads of a text channel.
+
+    Args:
+        parent_id (int): The ID of the text channel.
+
+    Returns:
+        List[Tuple[int, str, bool, Optional[float], Optional[int]]]: A list of
+        (thread_id, name, archived, archive_timestamp, last_message_id) for each thread.
+
+    Raises:
+        DatabaseError: If there is an error retrieving the threads.
+    """
+    try:
+        with session_scope() as session:
+            rows = session.query(
+                ThreadCatalog.thread_id, ThreadCatalog.name, ThreadCatalog.archived,
+                ThreadCatalog.archive_timestamp, ThreadCatalog.last_message_id
+            ).filter_by(parent_id=parent_id).all()
+            result = [tuple(row) for row in rows]
+            queries_logger.debug(f'get_thread_catalog result for channel {parent_id}: {len(result)} threads')
+            return result
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error getting threads of channel {parent_id}: {e}')
+        raise DatabaseError('Error getting thread catalog', e)
+
+
+def save_threads(threads: List[Tuple[int, int, str, bool, Optional[float], Optional[int]]]) -> None:
+    """
+    Adds threads to the thread catalog or updates their state.
+
+    Args:
+        threads (List[Tuple[int, int, str, bool, Optional[float], Optional[int]]]): The threads as
+            (thread_id, parent_id, name, archived, archive_timestamp, last_message_id).
+
+    Raises:
+        DatabaseError: If there is an error saving the threads.
+    """
+    if not threads:
+        return
+    rows = [
+        {'thread_id': thread_id, 'parent_id': parent_id, 'name': name, 'archived': archived,
+         'archive_timestamp': archive_timestamp, 'last_message_id': last_message_id}
+        for thread_id, parent_id, name, archived, archive_timestamp, last_message_id in threads
+    ]
+    try:
+        with session_scope() as session:
+            statement = insert(ThreadCatalog)
+            statement = statement.on_conflict_do_update(
+                index_elements=[ThreadCatalog.thread_id],
+                set_={column: statement.excluded[column] for column in rows[0] if column != 'thread_id'}
+            )
+            session.execute(statement, rows)
+            session.commit()
+            queries_logger.debug(f'Saved {len(rows)} threads to the catalog')
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error saving threads: {e}')
+        raise DatabaseError('Error saving threads', e)
+
+
+def remove_thread(thread_id: int) -> None:
+    """
+    Removes a deleted thread from the thread catalog.
+
+    Args:
+        thread_id (int): The ID of the thread.
+
+    Raises:
+        DatabaseError: If there is an error removing the thread.
+    """
+    try:
+        with session_scope() as session:
+            session.query(ThreadCatalog).filter_by(thread_id=thread_id).delete()
+            session.commit()
+            queries_logger.debug(f'Thread {thread_id} removed from the catalog')
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error removing thread {thread_id}: {e}')
+        raise DatabaseError('Error removing thread', e)
+
+
+def get_channel_word_totals() -> Dict[int, Dict[str, int]]:
+    """
+    Gets the word counts of the incrementally scanned history, summed over all channels.
+
+    Returns:
+        Dict[int, Dict[str, int]]: The counts per word for each user ID.
+
+    Raises:
+        DatabaseError: If there is an error retrieving the counts.
+    """
+    try:
+        with session_scope() as session:
+            rows = session.query(
+                ChannelWordCount.user_id, ChannelWordCount.word_name, func.sum(ChannelWordCount.count)
+            ).group_by(ChannelWordCount.user_id, ChannelWordCount.word_name).all()
+            result = {}
+            for user_id, word, count in rows:
+                result.setdefault(user_id, {})[word] = count
+            queries_logger.debug(f'get_channel_word_totals result: {len(rows)} records')
+            return result
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error getting channel word totals: {e}')
+        raise DatabaseError('Error getting channel word totals', e)
+
+
+def _insert_archived_messages(session, messages: List[Tuple[int, int, int, str]]) -> None:
+    """
+    Inserts messages into the message archive, skipping messages that are already archived.
+
+    Args:
+        session (Session): The session of the current transaction.
+        messages (List[Tuple[int, int, int, str]]): The messages as
+            (message_id, channel_id, author_id, normalized content).
+    """
+    statement = insert(ArchivedMessage).on_conflict_do_nothing(index_elements=[ArchivedMessage.id])
+    session.execute(statement, [
+        {'id': message_id, 'channel_id': channel_id, 'author_id': author_id, 'content': content}
+        for message_id, channel_id, author_id, content in messages
+    ])
+
+
+def archive_messages(messages: List[Tuple[int, int, int, str]]) -> None:
+    """
+    Stores messages in the message archive.
+
+    Args:
+        messages (List[Tuple[int, int, int, str]]): The messages as
+            (message_id, channel_id, author_id, normalized content).
+
+    Raises:
+        DatabaseError: If there is an error archiving the messages.
+    """
+    if not messages:
+        return
+    try:
+        with session_scope() as session:
+            _insert_archived_messages(session, messages)
+            session.commit()
+            queries_logger.debug(f'Archived {len(messages)} messages')
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error archiving messages: {e}')
+        raise DatabaseError('Error archiving messages', e)
+
+
+def get_archived_word_candidates(*words: str) -> List[Tuple[int, str]]:
+    """
+    Gets the archived messages that may contain any of the given words, using the full-text index.
+
+    The full-text index splits content at every character that is not a letter or digit, so
+    the result can contain messages where a word is not a whole word. The caller counts
+    the exact matches. Words without letters or digits are searched with a substring match.
+
+    Args:
+        *words (str): The normalized words to search for.
+
+    Returns:
+        List[Tuple[int, str]]: A list of (author_id, content) for each candidate message, each
+        message listed once.
+
+    Raises:
+        DatabaseError: If there is an error searching the archive.
+    """
+    phrases = []
+    substrings = []
+    for word in words:
+        tokens = re.findall(r'[^\W_]+', word)
+        if tokens:
+            phrases.append('"' + ' '.join(tokens) + '"')
+        elif word:
+            substrings.append(word)
+    try:
+        with session_scope() as session:
+            candidates = {}
+            if phrases:
+                rows = session.execute(text(
+                    'SELECT message_archive.id, message_archive.author_id, message_archive.content '
+                    'FROM message_archive_fts '
+                    'JOIN message_archive ON message_archive.id = message_archive_fts.rowid '
+                    'WHERE message_archive_fts MATCH :query'
+                ), {'query': ' OR '.join(phrases)})
+                candidates.update((message_id, (author_id, content)) for message_id, author_id, content in rows)
+            if substrings:
+                rows = session.query(ArchivedMessage.id, ArchivedMessage.author_id, ArchivedMessage.content).filter(
+                    or_(*[func.instr(ArchivedMessage.content, substring) > 0 for substring in substrings])
+                )
+                candidates.update((message_id, (author_id, content)) for message_id, author_id, content in rows)
+            result = list(candidates.values())
+            queries_logger.debug(f'get_archived_word_candidates result for words {words}: {len(result)} messages')
+            return result
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error searching archive for words {words}: {e}')
+        raise DatabaseError('Error searching message archive', e)
+
+
+def get_archived_author_messages(author_id: int) -> List[str]:
+    """
+    Gets the content of the archived messages of a user in channels with an archived checkpoint.
+
+    Channels whose checkpoint is not archived were scanned before the archive was enabled, so
+    their archive misses older history and their messages are not returned.
+
+    Args:
+        author_id (int): The ID of the user.
+
+    Returns:
+        List[str]: The normalized content of each archived message of the user.
+
+    Raises:
+        DatabaseError: If there is an error reading the archive.
+    """
+    try:
+        with session_scope() as session:
+            rows = (
+                session.query(ArchivedMessage.content)
+                .join(ScanCheckpoint, ScanCheckpoint.channel_id == ArchivedMessage.channel_id)
+                .filter(ArchivedMessage.author_id == author_id, ScanCheckpoint.archived.is_(True))
+                .all()
+            )
+            result = [content for content, in rows]
+            queries_logger.debug(f'get_archived_author_messages result for user {author_id}: {len(result)} messages')
+            return result
+    except SQLAlchemyError as e:
+        queries_logger.error(f'Error reading archived messages of user {author_id}: {e}')
+        raise DatabaseError('Error reading archived messages of user', e)
+
+
 def check_user_has_word(user_id: int, word: str) -> bool:
     """
     Checks if a user has an association with a specific word.
@@ -331,7 +1244,7 @@ def check_user_has_word(user_id: int, word: str) -> bool:
         DatabaseError: If there is an error checking the association.
     """
     try:
-        with next(get_db()) as session:
+        with session_scope() as session:
             exists = session.query(UserHasWord).filter_by(user_id=user_id, word_name=word).first() is not None
             queries_logger.debug(f'check_user_has_word result for user {user_id}, word {word}: {exists}')
             return exists
@@ -340,9 +1253,61 @@ def check_user_has_word(user_id: int, word: str) -> bool:
         raise DatabaseError('Error checking user-word association', e)
 
 
+def _query_admin_ids(session) -> frozenset:
+    """
+    Reads the IDs of all admins in a session, including its uncommitted changes.
+
+    Args:
+        session (Session): The session to read in.
+
+    Returns:
+        frozenset: The IDs of the admins.
+    """
+    session.flush()
+    return frozenset(user_id for user_id, in session.query(User.id).filter_by(permission='admin'))
+
+
+def _set_admin_ids(admin_ids: frozenset) -> None:
+    """
+    Publishes the admin IDs after a committed write of the user.permission column.
+
+    Args:
+        admin_ids (frozenset): The IDs of the admins.
+    """
+    global _admin_ids
+    with _admin_ids_lock:
+        _admin_ids = admin_ids
+    queries_logger.debug(f'Admin IDs set to {sorted(admin_ids)}')
+
+
+def get_admin_ids() -> frozenset:
+    """
+    Gets the IDs of all admins, loading them from the database only the first time.
+
+    Returns:
+        frozenset: The IDs of the admins.
+
+    Raises:
+        DatabaseError: If there is an error loading the admins.
+    """
+    global _admin_ids
+    # The lock is held while loading, so a write publishing its admins cannot be overwritten
+    # by a load that read the column before the write committed
+    with _admin_ids_lock:
+        if _admin_ids is None:
+            try:
+                with session_scope() as session:
+                    _admin_ids = _query_admin_ids(session)
+                    queries_logger.debug(f'Admin IDs loaded: {sorted(_admin_ids)}')
+            except SQLAlchemyError as e:
+                queries_logger.error(f'Error loading admins: {e}')
+                raise DatabaseError('Error loading admins', e)
+        return _admin_ids
+
+
 def check_user_is_admin(user_id: int) -> bool:
     """
-    Checks if a user has admin privileges.
+    Checks if a user has admin privileges, using the admin IDs kept in memory.
 
     Args:
         user_id (int): The ID of the user.
@@ -351,17 +1316,11 @@ def check_user_is_admin(user_id: int) -> bool:
         bool: True if the user is an admin, False otherwise.
 
     Raises:
-        DatabaseError: If there is an error checking admin status.
+        DatabaseError: If there is an error loading the admins.
     """
-    try:
-        with next(get_db()) as session:
-            user = session.query(User).filter_by(id=user_id).first()
-            result = user.permission == 'admin' if user else False
-            queries_logger.debug(f'check_user_is_admin result for user {user_id}: {result}')
-            return result
-    except SQLAlchemyError as e:
-        queries_logger.error(f'Error checking if user is admin: {e}')
-        raise DatabaseError('Error checking admin status', e)
+    result = user_id in get_admin_ids()
+    queries_logger.debug(f'check_user_is_admin result for user {user_id}: {result}')
+    return result
 
 
 def get_user_word_counts(user_id: int) -> List[Tuple[str, int]]:
@@ -378,7 +1337,7 @@ def get_user_word_counts(user_id: int) -> List[Tuple[str, int]]:
         DatabaseError: If there is an error retrieving the user's word counts.
     """
     try:
-        with next(get_db()) as session:
+        with session_scope() as session:
             results = session.query(UserHasWord).filter_by(user_id=user_id).all()
             result_list = [(result.word_name, result.count) for result in results]
             queries_logger.debug(f'get_user_word_counts result for user {user_id}: {result_list}')
@@ -1,94 +1,674 @@
-from collections import defaultdict
-from unidecode import unidecode
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import itertools
+import multiprocessing
+import discord
 import logging
 import db.queries as queries
-import re
+import db.async_queries as async_queries
+from aggregator import WordCountAggregator
+from db.count_buffer import count_buffer
+from db.message_archive import message_archive
+from matcher import count_batch, get_default_engine, get_matcher, get_normalization_stats, normalize
 
 logic_logger = logging.getLogger('bot.logic')
 
+# Number of messages after which an incremental scan saves its progress
+SCAN_CHECKPOINT_INTERVAL = 1000
+# Number of messages per batch passed from the history readers to the matching stage
+SCAN_BATCH_SIZE = 100
+# Number of batches waiting to be matched before the history readers pause
+SCAN_QUEUE_SIZE = 16
+# Number of matched messages after which a scan writes its partial counts
+SCAN_FLUSH_INTERVAL = 5000
 
-async def scan(bot, server_id, word_counts=None, target_user_id=None, target_word=None):
+# Text channels whose thread catalog was refreshed from Discord since the bot started,
+# thread events keep their catalog up to date afterwards
+_refreshed_catalogs = set()
+
+# Worker processes matching scan batches, None to match on the event loop
+_match_executor = None
+_match_workers = 0
+# Keys of the word sets sent to the worker processes, a new key per scan
+_words_keys = itertools.count()
+
+# Matcher of all tracked words with the word set version and engine it was built for
+_tracked_matcher = (None, None)
+
+
+def set_scan_workers(workers: int) -> None:
+    """
+    Sets the number of worker processes that normalize and match scan batches.
+
+    Args:
+        workers (int): The number of worker processes, 0 to match on the event loop.
+    """
+    global _match_executor, _match_workers
+    if _match_executor is not None:
+        _match_executor.shutdown(wait=False, cancel_futures=True)
+    # Workers are spawned instead of forked, a forked child could inherit a lock held by the
+    # database threads or a logging handler and would share the open log files
+    _match_executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+    ) if workers > 0 else None
+    _match_workers = max(workers, 0)
+    logic_logger.info(f"Scan matching workers set to {workers}")
+
+
+async def get_tracked_matcher():
+    """
+    Gets the matcher of all tracked words, fetching the words only after the word set changed.
+
+    Returns:
+        WordMatcher: The compiled matcher of the tracked words.
+    """
+    global _tracked_matcher
+    key, matcher = _tracked_matcher
+    # Read before fetching the words, so a change during the fetch is seen by the next call
+    current_key = (queries.get_word_set_version(), get_default_engine())
+    if key != current_key:
+        matcher = get_matcher(await async_queries.get_words())
+        _tracked_matcher = (current_key, matcher)
+    return matcher
+
+
+async def scan(bot, server_id, word_counts=None, target_user_id=None, target_word=None, incremental=False,
+               concurrency=1, progress=None, target_words=None):
     """
     Initiates a scan of all text channels in a server to count word occurrences.
 
     Args:
         bot (discord.Client): The Discord bot instance.
         server_id (int): The ID of the server to scan.
-        word_counts (dict, optional): A dictionary to accumulate word counts. Defaults to None.
+        word_counts (WordCountAggregator, optional): The aggregator to accumulate word counts.
+            Defaults to None.
         target_user_id (int, optional): If provided, scans only for this user. Defaults to None.
         target_word (str, optional): If provided, scans for this word only. Defaults to None.
+        incremental (bool, optional): If True, a full scan only reads messages after the checkpoint of
+            each channel and thread and adds them to the counts of the previous scans. Targeted scans
+            always read the whole history. Defaults to False.
+        concurrency (int, optional): The maximum number of channels and threads whose history is read
+            at the same time. Defaults to 1.
+        progress (Callable[[int], None], optional): Called with the number of messages read since
+            the previous call while the scan runs. Defaults to None.
+        target_words (Iterable[str], optional): If provided, scans for these words only, in a single
+            pass over the history. Combined with `target_word` if both are given. Defaults to None.
     """
-    scan_type = "targeted" if target_user_id or target_word else "full"
-    logic_logger.info(f"Starting {scan_type} scan - Server: {server_id}, User: {target_user_id}, Word: {target_word}")
+    target_words = sorted(set(target_words or ()) | ({target_word} if target_word else set()))
+    if target_words and not target_user_id and message_archive.enabled:
+        await scan_archive(bot, server_id, target_words, concurrency, progress)
+        return
+    if target_user_id and not target_words:
+        await scan_user(bot, server_id, target_user_id, concurrency, progress)
+        return
+
+    scan_type = "targeted" if target_user_id or target_words else "full"
+    incremental = incremental and scan_type == "full"
+    logic_logger.info(f"Starting {scan_type} scan - Server: {server_id}, User: {target_user_id}, "
+                      f"Words: {target_words}, Incremental: {incremental}, Concurrency: {concurrency}")
 
     guild = bot.get_guild(server_id)
-    word_counts = word_counts or defaultdict(lambda: defaultdict(int))
-    total_messages_scanned = 0
+    matcher = get_matcher(target_words) if target_words else await get_tracked_matcher()
+    word_counts = WordCountAggregator(sorted(matcher.words)) if word_counts is None else word_counts
+    pipeline = ScanPipeline(word_counts, matcher, target_user_id, incremental, progress)
+    semaphore = asyncio.Semaphore(concurrency)
 
-    for channel in guild.text_channels:
-        logic_logger.debug(f"Scanning channel: {channel.name} (ID: {channel.id})")
-        messages_scanned = await scan_channel(channel, word_counts, target_user_id, target_word)
-        total_messages_scanned += messages_scanned
-        logic_logger.debug(f"Channel scan complete - {channel.name}: {messages_scanned} messages")
+    total_messages_scanned = await pipeline.run(
+        scan_channel(bot, channel, pipeline, semaphore) for channel in guild.text_channels
+    )
 
-    update_word_counts(word_counts)
+    if incremental:
+        word_counts = await async_queries.get_channel_word_totals()
+        await update_word_counts(word_counts)
     logic_logger.info(f"Scan completed - Total messages: {total_messages_scanned}, Words tracked: {len(word_counts)}")
 
+    stats = get_normalization_stats()
+    logic_logger.info(f"Normalization stats - ASCII: {stats['ascii']}, Cache hits: {stats['hits']}, "
+                      f"Cache misses: {stats['misses']}, Hit rate: {stats['hit_rate']:.1%}")
+    stats = queries.get_count_cache_stats()
+    logic_logger.info(f"Count cache stats - Hits: {stats['hits']}, Misses: {stats['misses']}, "
+                      f"Cached: {stats['cached']}, Hit rate: {stats['hit_rate']:.1%}")
+
 
-async def scan_channel(channel, word_counts, target_user_id=None, target_word=None) -> int:
+async def scan_archive(bot, server_id, target_words, concurrency=1, progress=None):
     """
-    Scans a channel and its threads for word occurrences.
+    Counts words in the local message archive instead of reading the whole history from Discord.
+
+    An incremental full scan runs first, so the archive holds every message up to now. Only the
+    archived messages found by the full-text index for any of the words are then counted.
 
     Args:
+        bot (discord.Client): The Discord bot instance.
+        server_id (int): The ID of the server to scan.
+        target_words (List[str]): The words to count.
+        concurrency (int, optional): The maximum number of channels and threads whose history is read
+            at the same time during the catch-up scan. Defaults to 1.
+        progress (Callable[[int], None], optional): Called with the number of messages read by
+            the catch-up scan. Defaults to None.
+    """
+    logic_logger.info(f"Starting archive scan - Server: {server_id}, Words: {target_words}")
+    await scan(bot, server_id, incremental=True, concurrency=concurrency, progress=progress)
+    await message_archive.flush()
+
+    matcher = get_matcher(target_words)
+    word_counts = WordCountAggregator(target_words)
+    candidates = await async_queries.get_archived_word_candidates(*target_words)
+    for author_id, content_normalized in candidates:
+        for word, count in matcher.count(content_normalized).items():
+            word_counts.add(author_id, word, count)
+
+    await update_word_counts(word_counts)
+    logic_logger.info(f"Archive scan completed - Candidate messages: {len(candidates)}, Users: {len(word_counts)}")
+
+
+async def scan_user(bot, server_id, user_id, concurrency=1, progress=None):
+    """
+    Counts the words of one user from author-indexed data instead of reading the whole history.
+
+    Messages after the checkpoints of incremental scans were counted live, so only the history
+    up to the checkpoints is needed. With the message archive enabled, the archived messages of
+    the user in channels with an archived checkpoint are counted without any request to Discord.
+    Of the other channels and threads, only those where incremental scans saw the user write are
+    read. If no incremental scan ran yet, an
+    incremental full scan builds the index and counts the user with everyone else. Channels
+    created after the last incremental scan are covered by the next one.
+
+    Args:
+        bot (discord.Client): The Discord bot instance.
+        server_id (int): The ID of the server to scan.
+        user_id (int): The ID of the user.
+        concurrency (int, optional): The maximum number of channels and threads whose history is read
+            at the same time. Defaults to 1.
+        progress (Callable[[int], None], optional): Called with the number of messages read.
+            Defaults to None.
+    """
+    if not await async_queries.has_scan_checkpoints():
+        logic_logger.info(f"No scan index yet, running an incremental full scan for user {user_id}")
+        await scan(bot, server_id, incremental=True, concurrency=concurrency, progress=progress)
+        return
+
+    matcher = await get_tracked_matcher()
+    word_counts = WordCountAggregator(sorted(matcher.words))
+    archived_messages = 0
+    if message_archive.enabled:
+        # Channels scanned before the archive was enabled are not archived until rebuilt,
+        # so only the channels with an archived checkpoint are counted from the archive
+        await message_archive.flush()
+        contents = await async_queries.get_archived_author_messages(user_id)
+        for content_normalized in contents:
+            for word, count in matcher.count(content_normalized).items():
+                word_counts.add(user_id, word, count)
+        archived_messages = len(contents)
+        channel_ids = await async_queries.get_author_channels(user_id, archived=False)
+    else:
+        channel_ids = await async_queries.get_author_channels(user_id)
+
+    guild = bot.get_guild(server_id)
+    uncached_ids = [channel_id for channel_id in channel_ids if guild.get_channel_or_thread(channel_id) is None]
+    catalog = await async_queries.get_cataloged_threads(uncached_ids)
+    channels = [
+        channel for channel in [_resolve_channel(bot, guild, channel_id, catalog) for channel_id in channel_ids]
+        if channel is not None
+    ]
+    messages_scanned = 0
+    if channels:
+        pipeline = ScanPipeline(word_counts, matcher, user_id, progress=progress)
+        semaphore = asyncio.Semaphore(concurrency)
+        messages_scanned = await pipeline.run(scan_thread(channel, pipeline, semaphore) for channel in channels)
+    # The archived counts are not written by the pipeline, which only writes the counts it changed
+    await update_word_counts(word_counts)
+    logic_logger.info(f"User backfill completed - User: {user_id}, Archived messages: {archived_messages}, "
+                      f"Channels: {len(channels)}, Messages: {messages_scanned}")
+
+
+def _resolve_channel(bot, guild, channel_id, catalog):
+    """
+    Gets a channel or thread by ID, reading threads that are not cached through the thread catalog.
+
+    Archived threads are not cached, they are read through a partial messageable like cataloged
+    threads in `list_threads`, which avoids one API request per thread.
+
+    Args:
+        bot (discord.Client): The Discord bot instance.
+        guild (discord.Guild): The guild of the channel.
+        channel_id (int): The ID of the channel or thread.
+        catalog (Dict[int, Tuple[int, str, Optional[int]]]): The catalog entries of the threads that
+            are not cached, as returned by `get_cataloged_threads`.
+
+    Returns:
+        discord.TextChannel or discord.Thread or CatalogedThread: The channel or thread, or None if it
+        no longer exists.
+    """
+    channel = guild.get_channel_or_thread(channel_id)
+    if channel is not None:
+        return channel
+    entry = catalog.get(channel_id)
+    if entry is None:
+        logic_logger.debug(f"Channel {channel_id} not found, skipping")
+        return None
+    parent_id, name, last_message_id = entry
+    messageable = bot.get_partial_messageable(channel_id, guild_id=guild.id, type=discord.ChannelType.public_thread)
+    return CatalogedThread(messageable, name, parent_id, last_message_id)
+
+
+async def _gather_or_cancel(coroutines) -> list:
+    """
+    Runs coroutines concurrently and cancels the remaining ones as soon as one fails.
+
+    Args:
+        coroutines (Iterable[Coroutine]): The coroutines to run.
+
+    Returns:
+        list: The results in the order of the coroutines.
+    """
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+class ScanPipeline:
+    """
+    Connects the stages of a scan: history reads, matching and aggregation, and database writes.
+
+    History readers put batches of messages into a bounded queue and a single consumer matches
+    them, so reads from Discord continue while messages are matched, and the readers pause
+    once `SCAN_QUEUE_SIZE` batches are waiting. If scan workers are set, the consumer sends
+    batches to the worker processes and keeps two batches per worker in flight, completing
+    them in queue order. The consumer writes partial results as it goes:
+    an incremental scan saves the counts and checkpoint of each batch, other scans write the
+    changed highest counts every `SCAN_FLUSH_INTERVAL` messages.
+
+    Attributes:
+        word_counts (WordCountAggregator): The accumulated counts per user ID and word.
+        matcher (WordMatcher): The matcher for the scanned words.
+        target_user_id (int): If set, only messages of this user are matched.
+        incremental (bool): Whether the history is resumed from the checkpoint of each channel.
+        batch_size (int): The number of messages per batch.
+        executor (ProcessPoolExecutor): The worker processes matching batches, None to match on the event loop.
+        progress (Callable[[int], None]): Called with the number of messages read since the previous call.
+    """
+
+    def __init__(self, word_counts, matcher, target_user_id=None, incremental=False, progress=None):
+        """
+        Initializes the pipeline with empty queues.
+
+        Args:
+            word_counts (WordCountAggregator): The aggregator to accumulate word counts.
+            matcher (WordMatcher): The matcher for the scanned words.
+            target_user_id (int, optional): If provided, matches only messages of this user.
+                Defaults to None.
+            incremental (bool, optional): If True, resumes each channel and thread from its
+                checkpoint. Defaults to False.
+            progress (Callable[[int], None], optional): Called with the number of messages read
+                since the previous call. Defaults to None.
+        """
+        self.word_counts = word_counts
+        self.matcher = matcher
+        self.target_user_id = target_user_id
+        self.incremental = incremental
+        # A batch of an incremental scan is saved with its checkpoint in one transaction
+        self.batch_size = SCAN_CHECKPOINT_INTERVAL if incremental else SCAN_BATCH_SIZE
+        self.progress = progress
+        self.executor = _match_executor
+        self._words_key = next(_words_keys)
+        self._max_in_flight = 2 * _match_workers if self.executor else 0
+        self._batches = asyncio.Queue(SCAN_QUEUE_SIZE)
+        self._dirty = set()
+        self._unflushed_messages = 0
+
+    async def run(self, readers) -> int:
+        """
+        Runs the history readers and the consumer until every read message is processed.
+
+        If a reader fails, the batches it already queued are still processed before the error
+        is raised, so an interrupted scan keeps its progress.
+
+        Args:
+            readers (Iterable[Coroutine]): The coroutines reading histories into the pipeline
+                with `read_history`, each returning the number of messages it read.
+
+        Returns:
+            int: The number of messages read.
+
+        Raises:
+            DatabaseError: If there is an error writing partial results.
+        """
+        consumer = asyncio.ensure_future(self._consume())
+        reading = asyncio.ensure_future(_gather_or_cancel(readers))
+        end_of_history = None
+        try:
+            await asyncio.wait([reading, consumer], return_when=asyncio.FIRST_COMPLETED)
+            if not reading.done():
+                # The consumer failed, stop the readers waiting for space in the queue
+                consumer.result()
+
+            end_of_history = asyncio.ensure_future(self._batches.put(None))
+            await asyncio.wait([end_of_history, consumer], return_when=asyncio.FIRST_COMPLETED)
+            await consumer
+            return sum(reading.result())
+        finally:
+            for task in (reading, consumer, end_of_history):
+                if task is not None:
+                    task.cancel()
+
+    async def read_history(self, channel) -> int:
+        """
+        Reads the history of a channel or thread into the pipeline in batches.
+
+        Args:
+            channel (discord.TextChannel or discord.Thread): The channel or thread to read.
+
+        Returns:
+            int: The number of messages read.
+        """
+        after = None
+        if self.incremental:
+            checkpoint = await async_queries.get_scan_checkpoint(channel.id)
+            if checkpoint and message_archive.enabled and not checkpoint[1]:
+                logic_logger.info(f"Rebuilding scan progress of {channel.name} to fill the message archive")
+                await async_queries.reset_scan_progress(channel.id)
+                checkpoint = None
+            if checkpoint and channel.last_message_id is not None and channel.last_message_id <= checkpoint[0]:
+                logic_logger.debug(f"No new messages in {channel.name}, skipping")
+                return 0
+            after = discord.Object(id=checkpoint[0]) if checkpoint else None
+
+        messages_scanned = 0
+        batch = []
+        oldest_first = True if self.incremental else None
+        async for message in channel.history(limit=None, after=after, oldest_first=oldest_first):
+            messages_scanned += 1
+            if self.target_user_id and message.author.id != self.target_user_id:
+                continue
+            batch.append(message)
+            if len(batch) >= self.batch_size:
+                await self._batches.put((channel, batch))
+                batch = []
+            if messages_scanned % 200 == 0:
+                logic_logger.debug(f"Progress update - {channel.name}: {messages_scanned} messages read")
+                if self.progress:
+                    self.progress(200)
+
+        if batch:
+            await self._batches.put((channel, batch))
+        if self.progress and messages_scanned % 200:
+            self.progress(messages_scanned % 200)
+        return messages_scanned
+
+    async def _consume(self):
+        """
+        Matches queued batches and writes their counts until the end of the history is queued.
+
+        Raises:
+            DatabaseError: If there is an error writing partial results.
+        """
+        in_flight = deque()
+        while True:
+            item = await self._batches.get()
+            if item is None:
+                break
+            channel, messages = item
+            in_flight.append((channel, messages, self._match(messages)))
+            if len(in_flight) > self._max_in_flight:
+                await self._complete(*in_flight.popleft())
+
+        while in_flight:
+            await self._complete(*in_flight.popleft())
+        if not self.incremental:
+            await self._flush()
+
+    def _match(self, messages) -> asyncio.Future:
+        """
+        Starts matching a batch of messages, in a worker process if scan workers are set.
+
+        Args:
+            messages (List[discord.Message]): The messages to match.
+
+        Returns:
+            asyncio.Future: Resolves to the counts per word for each author ID, and the normalized
+            contents if the message archive is enabled during an incremental scan.
+        """
+        keep_content = self.incremental and message_archive.enabled
+        loop = asyncio.get_running_loop()
+        if self.executor is not None:
+            batch = [(message.author.id, message.content) for message in messages]
+            return asyncio.ensure_future(self._match_in_worker(batch, keep_content))
+
+        batch_counts = defaultdict(lambda: defaultdict(int))
+        for message in messages:
+            process_message(message, batch_counts, matcher=self.matcher)
+        contents = [normalize(message.content) for message in messages] if keep_content else None
+        future = loop.create_future()
+        future.set_result((batch_counts, contents))
+        return future
+
+    async def _match_in_worker(self, batch, keep_content):
+        """
+        Matches a batch in a worker process, sending the words only to a worker that lacks them.
+
+        Args:
+            batch (List[Tuple[int, str]]): The author ID and raw content of each message.
+            keep_content (bool): If True, the normalized contents are returned too.
+
+        Returns:
+            Tuple[Dict[int, Dict[str, int]], Optional[List[str]]]: The counts per word for each author
+            ID, and the normalized contents if `keep_content` is True.
+        """
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.executor, count_batch, self._words_key, self.matcher.engine,
+                                            batch, keep_content)
+        if result is None:
+            result = await loop.run_in_executor(self.executor, count_batch, self._words_key, self.matcher.engine,
+                                                batch, keep_content, self.matcher.words)
+        return result
+
+    async def _complete(self, channel, messages, matching):
+        """
+        Waits for the counts of a batch and writes them or adds them to the accumulated counts.
+
+        An incremental scan saves the counts of the batch with the new checkpoint. Other scans
+        write the changed counts every `SCAN_FLUSH_INTERVAL` messages.
+
+        Args:
+            channel (discord.TextChannel or discord.Thread): The channel or thread of the messages.
+            messages (List[discord.Message]): The messages, in history order.
+            matching (asyncio.Future): The future returned by `_match` for the messages.
+        """
+        batch_counts, contents = await matching
+        if self.incremental:
+            archived_messages = None
+            if contents is not None:
+                archived_messages = [
+                    (message.id, channel.id, message.author.id, content_normalized)
+                    for message, content_normalized in zip(messages, contents)
+                ]
+            author_ids = {message.author.id for message in messages}
+            await async_queries.save_scan_progress(channel.id, messages[-1].id, batch_counts, archived_messages,
+                                                   author_ids)
+            logic_logger.debug(f"Progress saved - {channel.name}: checkpoint at message {messages[-1].id}")
+            return
+
+        for user_id, user_word_counts in batch_counts.items():
+            for word, count in user_word_counts.items():
+                self.word_counts.add(user_id, word, count)
+                self._dirty.add((user_id, word))
+        self._unflushed_messages += len(messages)
+        if self._unflushed_messages >= SCAN_FLUSH_INTERVAL:
+            await self._flush()
+
+    async def _flush(self):
+        """
+        Writes the accumulated counts of the pairs changed since the last flush.
+
+        The counts only grow during a scan, so writing them early never lowers the final result.
+        """
+        partial_counts = defaultdict(dict)
+        for user_id, word in self._dirty:
+            partial_counts[user_id][word] = self.word_counts.get(user_id, word)
+        self._dirty = set()
+        self._unflushed_messages = 0
+        await update_word_counts(partial_counts)
+
+
+async def scan_channel(bot, channel, pipeline, semaphore=None) -> int:
+    """
+    Reads the history of a channel and its threads into a scan pipeline.
+
+    The threads are read concurrently, each one waiting for a free slot of the semaphore.
+
+    Args:
+        bot (discord.Client): The Discord bot instance.
         channel (discord.TextChannel): The channel to scan.
-        word_counts (dict): A dictionary to accumulate word counts.
-        target_user_id (int, optional): If provided, scans only for this user. Defaults to None.
-        target_word (str, optional): If provided, scans for this word only. Defaults to None.
+        pipeline (ScanPipeline): The pipeline matching the messages.
+        semaphore (asyncio.Semaphore, optional): Limits the histories read at the same time.
+            Defaults to one history at a time.
 
     Returns:
         int: The number of messages scanned.
     """
-    messages_scanned = await scan_messages(channel, word_counts, target_user_id, target_word)
-    logic_logger.debug(f"Main channel scanned - {channel.name}: {messages_scanned} messages")
+    semaphore = semaphore or asyncio.Semaphore(1)
+    logic_logger.debug(f"Scanning channel: {channel.name} (ID: {channel.id})")
+
+    async with semaphore:
+        messages_scanned = await pipeline.read_history(channel)
+        logic_logger.debug(f"Main channel scanned - {channel.name}: {messages_scanned} messages")
 
-    threads = [thread async for thread in channel.archived_threads()] + channel.threads
+        threads = await list_threads(bot, channel)
     if threads:
         logic_logger.debug(f"Found {len(threads)} threads in {channel.name}")
 
-    for thread in threads:
-        logic_logger.debug(f"Scanning thread: {thread.name} (ID: {thread.id})")
-        thread_messages_scanned = await scan_messages(thread, word_counts, target_user_id, target_word)
-        messages_scanned += thread_messages_scanned
-        logic_logger.debug(f"Thread scan complete - {thread.name}: {thread_messages_scanned} messages")
-
+    thread_messages_scanned = await _gather_or_cancel(
+        scan_thread(thread, pipeline, semaphore) for thread in threads
+    )
+    messages_scanned += sum(thread_messages_scanned)
+    logic_logger.debug(f"Channel scan complete - {channel.name}: {messages_scanned} messages")
     return messages_scanned
 
 
-async def scan_messages(channel, word_counts, target_user_id=None, target_word=None) -> int:
+async def scan_thread(thread, pipeline, semaphore) -> int:
     """
-    Scans messages in a channel or thread for word occurrences.
+    Reads the history of a thread, or of a channel without its threads, into a scan pipeline once
+    the semaphore has a free slot. A thread that was deleted is removed from the thread catalog.
 
     Args:
-        channel (discord.TextChannel or discord.Thread): The channel or thread to scan.
-        word_counts (dict): A dictionary to accumulate word counts.
-        target_user_id (int, optional): If provided, scans only for this user. Defaults to None.
-        target_word (str, optional): If provided, scans for this word only. Defaults to None.
+        thread (discord.Thread): The thread to scan.
+        pipeline (ScanPipeline): The pipeline matching the messages.
+        semaphore (asyncio.Semaphore): Limits the histories read at the same time.
 
     Returns:
         int: The number of messages scanned.
     """
-    messages_scanned = 0
-    async for message in channel.history(limit=None):
-        messages_scanned += 1
-        if target_user_id and message.author.id != target_user_id:
-            continue
-        process_message(message, word_counts, target_word)
-        if messages_scanned % 200 == 0:
-            logic_logger.debug(f"Progress update - {channel.name}: {messages_scanned} messages scanned")
+    async with semaphore:
+        logic_logger.debug(f"Scanning thread: {thread.name} (ID: {thread.id})")
+        try:
+            messages_scanned = await pipeline.read_history(thread)
+        except discord.NotFound:
+            logic_logger.info(f"Thread {thread.name} (ID: {thread.id}) no longer exists, removing it from the catalog")
+            await async_queries.remove_thread(thread.id)
+            return 0
+        logic_logger.debug(f"Thread scan complete - {thread.name}: {messages_scanned} messages")
     return messages_scanned
 
 
-def process_message(message, word_counts, target_word=None):
+class CatalogedThread:
+    """
+    An archived thread known from the thread catalog, read without fetching it from Discord.
+
+    Attributes:
+        id (int): The ID of the thread.
+        name (str): The name of the thread.
+        parent_id (int): The ID of the text channel of the thread.
+        last_message_id (int): The ID of the last message in the thread, None if unknown.
+    """
+
+    def __init__(self, messageable, name, parent_id, last_message_id):
+        """
+        Initializes the thread.
+
+        Args:
+            messageable (discord.PartialMessageable): The messageable for the thread ID.
+            name (str): The name of the thread.
+            parent_id (int): The ID of the text channel of the thread.
+            last_message_id (int): The ID of the last message in the thread, None if unknown.
+        """
+        self._messageable = messageable
+        self.id = messageable.id
+        self.name = name
+        self.parent_id = parent_id
+        self.last_message_id = last_message_id
+
+    def history(self, **kwargs):
+        """
+        Iterates the message history of the thread like `discord.abc.Messageable.history`.
+
+        Args:
+            **kwargs: Keyword arguments for `history`.
+
+        Returns:
+            AsyncIterator[discord.Message]: The messages of the thread.
+        """
+        return self._messageable.history(**kwargs)
+
+
+def catalog_entry(thread) -> tuple:
+    """
+    Gets the thread catalog entry of a thread.
+
+    Args:
+        thread (discord.Thread): The thread.
+
+    Returns:
+        tuple: The (thread_id, parent_id, name, archived, archive_timestamp, last_message_id) of the thread.
+    """
+    archive_timestamp = thread.archive_timestamp.timestamp() if thread.archive_timestamp else None
+    return thread.id, thread.parent_id, thread.name, thread.archived, archive_timestamp, thread.last_message_id
+
+
+async def list_threads(bot, channel) -> list:
+    """
+    Lists the active and archived threads of a channel from the thread catalog.
+
+    Active threads come from the cache of the client. On the first scan of a channel since the
+    bot started, the archived threads are listed from Discord newest first, until a thread that
+    was archived before the newest archived thread of the catalog, and the catalog is updated.
+    Later scans rely on thread events to keep the catalog up to date.
+
+    Args:
+        bot (discord.Client): The Discord bot instance.
+        channel (discord.TextChannel): The channel.
+
+    Returns:
+        list: The active threads, and a `CatalogedThread` for every other thread of the catalog.
+    """
+    entries = await async_queries.get_thread_catalog(channel.id)
+    if channel.id not in _refreshed_catalogs:
+        newest = max((entry[3] for entry in entries if entry[2] and entry[3] is not None), default=None)
+        changed = []
+        async for thread in channel.archived_threads(limit=None):
+            if newest is not None and thread.archive_timestamp and thread.archive_timestamp.timestamp() < newest:
+                break
+            changed.append(thread)
+        logic_logger.debug(f"Thread catalog of {channel.name} refreshed - {len(changed)} archived threads changed")
+        await async_queries.save_threads([catalog_entry(thread) for thread in changed + channel.threads])
+        _refreshed_catalogs.add(channel.id)
+        entries = await async_queries.get_thread_catalog(channel.id)
+
+    threads = list(channel.threads)
+    active_ids = {thread.id for thread in threads}
+    for thread_id, name, archived, archive_timestamp, last_message_id in entries:
+        if thread_id not in active_ids:
+            messageable = bot.get_partial_messageable(thread_id, guild_id=channel.guild.id,
+                                                      type=discord.ChannelType.public_thread)
+            threads.append(CatalogedThread(messageable, name, channel.id, last_message_id))
+    return threads
+
+
+def process_message(message, word_counts, target_word=None, matcher=None):
     """
     Processes a message to count occurrences of words.
 
@@ -96,39 +676,27 @@ def process_message(message, word_counts, target_word=None):
         message (discord.Message): The message to process.
         word_counts (dict): A dictionary to accumulate word counts.
         target_word (str, optional): If provided, counts only occurrences of this word. Defaults to None.
+        matcher (WordMatcher, optional): A precompiled matcher to reuse. Defaults to the matcher
+            for `target_word` or for all tracked words.
     """
-    content_normalized = unidecode(message.content).lower()
-    words_to_check = [target_word] if target_word else queries.get_words()
+    content_normalized = normalize(message.content)
+    if matcher is None:
+        matcher = get_matcher([target_word] if target_word else queries.get_words())
 
-    for word in words_to_check:
-        if word:
-            pattern = r'\b' + re.escape(word) + r'\b'
-            matches = re.findall(pattern, content_normalized)
-            count = len(matches)
-            if count > 0:
-                word_counts[message.author.id][word] += count
-                logic_logger.debug(f"Word found - '{word}' ({count}x) by user {message.author.display_name}")
+    for word, count in matcher.count(content_normalized).items():
+        word_counts[message.author.id][word] += count
+        logic_logger.debug(f"Word found - '{word}' ({count}x) by user {message.author.display_name}")
 
 
-def update_word_counts(word_counts):
+async def update_word_counts(word_counts):
     """
     Updates the database with word counts, only if the new count is higher.
 
     Args:
         word_counts (dict): A dictionary containing word counts for users.
     """
-    updates_made = 0
-    for user_id, update_words in word_counts.items():
-        for word, update_count in update_words.items():
-            current_count = queries.get_count(user_id, word)
-            if current_count is None:
-                queries.add_user_has_word(user_id, word, update_count)
-                updates_made += 1
-                logic_logger.info(f"New word count added - User: {user_id}, Word: '{word}', Count: {update_count}")
-            elif update_count > current_count:
-                queries.update_user_count(user_id, word, update_count - current_count)
-                updates_made += 1
-                logic_logger.info(f"Word count updated - User: {user_id}, Word: '{word}', New total: {update_count}")
+    await count_buffer.flush()
+    updates_made = await async_queries.upsert_highest_counts(word_counts)
 
     if updates_made > 0:
         logic_logger.info(f"Database update complete - {updates_made} records modified")
@@ -0,0 +1,432 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from unidecode import unidecode
+import logging
+import re
+
+matcher_logger = logging.getLogger('bot.matcher')
+
+# A `\bword\b` match of a word made only of word characters always spans a whole run of
+# word characters, so such words can be matched as tokens instead of one pattern per word
+_TOKEN_RE = re.compile(r'\w+')
+
+DEFAULT_ENGINE = 'regex'
+_default_engine = DEFAULT_ENGINE
+
+# Number of distinct non-ASCII message contents whose transliteration is kept
+NORMALIZE_CACHE_SIZE = 8192
+_ascii_normalizations = 0
+
+# Number of word sets whose matcher is kept by a scan worker process, one per recent scan
+WORKER_MATCHER_CACHE_SIZE = 4
+# Matchers of the word sets sent to this worker process, by the key of their word set
+_worker_matchers = {}
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _transliterate(content: str) -> str:
+    """
+    Transliterates and lowercases non-ASCII content, memoizing repeated content.
+
+    Args:
+        content (str): The raw message content.
+
+    Returns:
+        str: The normalized content.
+    """
+    return unidecode(content).lower()
+
+
+def normalize(content: str) -> str:
+    """
+    Normalizes message content for matching, equal to `unidecode(content).lower()`.
+
+    Pure ASCII content is only lowercased, since unidecode leaves ASCII unchanged. Other content
+    goes through a bounded LRU cache, so rescanning the same history does not transliterate the
+    same messages again.
+
+    Args:
+        content (str): The raw message content.
+
+    Returns:
+        str: The normalized content.
+    """
+    global _ascii_normalizations
+    if content.isascii():
+        _ascii_normalizations += 1
+        return content.lower()
+    return _transliterate(content)
+
+
+def get_normalization_stats() -> Dict[str, float]:
+    """
+    Gets statistics about the normalization fast path and cache.
+
+    Returns:
+        Dict[str, float]: The number of ASCII fast path normalizations, cache hits, cache misses,
+        cached entries and the cache hit rate of non-ASCII content.
+    """
+    cache_info = _transliterate.cache_info()
+    lookups = cache_info.hits + cache_info.misses
+    return {
+        'ascii': _ascii_normalizations,
+        'hits': cache_info.hits,
+        'misses': cache_info.misses,
+        'cached': cache_info.currsize,
+        'hit_rate': cache_info.hits / lookups if lookups else 0.0,
+    }
+
+
+def _is_word_char(char: str) -> bool:
+    """
+    Checks if a character counts as a word character for `\\b`, like `\\w` in `re`.
+
+    Args:
+        char (str): The character to check.
+
+    Returns:
+        bool: True if the character is a word character, False otherwise.
+    """
+    return char.isalnum() or char == '_'
+
+
+class WordMatcher(ABC):
+    """
+    Base class for counting a fixed set of tracked words in normalized message content.
+
+    Every engine returns exactly the counts of a separate `re.findall(r'\\bword\\b', content)`
+    per word.
+
+    Attributes:
+        words (frozenset): The words this matcher counts.
+    """
+
+    engine = None
+
+    def __init__(self, words: Iterable[str]):
+        """
+        Stores the words to count.
+
+        Args:
+            words (Iterable[str]): The words to count. Empty words are ignored.
+        """
+        self.words = frozenset(word for word in words if word)
+
+    @abstractmethod
+    def count(self, content: str) -> Dict[str, int]:
+        """
+        Counts the tracked words in already normalized content.
+
+        Args:
+            content (str): The normalized message content.
+
+        Returns:
+            Dict[str, int]: The count of every tracked word found in the content. Words that
+            were not found are omitted.
+        """
+
+
+class RegexMatcher(WordMatcher):
+    """
+    Matcher backed by precompiled regular expressions.
+
+    Single-token words are compiled into one alternation pattern that finds all of them in a
+    single pass. Words containing other characters (phrases, punctuation) keep their own
+    precompiled pattern so their counts stay identical to a separate `re.findall` per word.
+    """
+
+    engine = 'regex'
+
+    def __init__(self, words: Iterable[str]):
+        """
+        Compiles the patterns for the given words.
+
+        Args:
+            words (Iterable[str]): The words to count. Empty words are ignored.
+        """
+        super().__init__(words)
+
+        simple_words = sorted(
+            (word for word in self.words if _TOKEN_RE.fullmatch(word)),
+            key=len,
+            reverse=True
+        )
+        self._simple_pattern = (
+            re.compile(r'\b(?:' + '|'.join(re.escape(word) for word in simple_words) + r')\b')
+            if simple_words else None
+        )
+        self._complex_patterns = [
+            (word, re.compile(r'\b' + re.escape(word) + r'\b'))
+            for word in self.words if not _TOKEN_RE.fullmatch(word)
+        ]
+        matcher_logger.debug(f'Regex matcher compiled - {len(simple_words)} single-token words, '
+                             f'{len(self._complex_patterns)} other words')
+
+    def count(self, content: str) -> Dict[str, int]:
+        """
+        Counts the tracked words with one pass for single-token words and one per other word.
+
+        Args:
+            content (str): The normalized message content.
+
+        Returns:
+            Dict[str, int]: The count of every tracked word found in the content.
+        """
+        counts = {}
+        if self._simple_pattern is not None:
+            for word in self._simple_pattern.findall(content):
+                counts[word] = counts.get(word, 0) + 1
+        for word, pattern in self._complex_patterns:
+            matches = pattern.findall(content)
+            if matches:
+                counts[word] = len(matches)
+        return counts
+
+
+class AhoCorasickMatcher(WordMatcher):
+    """
+    Matcher backed by an Aho-Corasick automaton over all tracked words.
+
+    The automaton finds every occurrence of every word in one pass over the content, so the
+    cost no longer grows with the number of tracked words. Occurrences are then filtered with
+    the same word boundary rules as `\\b`, and overlapping occurrences of the same word are
+    skipped like `re.findall` does.
+    """
+
+    engine = 'aho_corasick'
+
+    def __init__(self, words: Iterable[str]):
+        """
+        Builds the automaton for the given words.
+
+        Args:
+            words (Iterable[str]): The words to count. Empty words are ignored.
+        """
+        super().__init__(words)
+
+        self._goto = [{}]
+        self._outputs = [[]]
+        for word in self.words:
+            state = 0
+            for char in word:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append((word, len(word), _is_word_char(word[0]), _is_word_char(word[-1])))
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+        matcher_logger.debug(f'Aho-Corasick matcher compiled - {len(self.words)} words, '
+                             f'{len(self._goto)} states')
+
+    def count(self, content: str) -> Dict[str, int]:
+        """
+        Counts the tracked words with a single pass of the automaton over the content.
+
+        Args:
+            content (str): The normalized message content.
+
+        Returns:
+            Dict[str, int]: The count of every tracked word found in the content.
+        """
+        counts = {}
+        match_ends = {}
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        last_index = len(content) - 1
+        state = 0
+
+        for index, char in enumerate(content):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not outputs[state]:
+                continue
+
+            for word, length, starts_with_word_char, ends_with_word_char in outputs[state]:
+                start = index - length + 1
+                if start < match_ends.get(word, 0):
+                    continue
+                before_is_word = start > 0 and _is_word_char(content[start - 1])
+                if before_is_word == starts_with_word_char:
+                    continue
+                after_is_word = index < last_index and _is_word_char(content[index + 1])
+                if after_is_word == ends_with_word_char:
+                    continue
+                counts[word] = counts.get(word, 0) + 1
+                match_ends[word] = index + 1
+        return counts
+
+
+class TokenSetMatcher(WordMatcher):
+    """
+    Matcher that tokenizes the content once and looks every token up in a set.
+
+    Single-token words are counted through the lookup, which costs the same no matter how many
+    words are tracked. Words containing other characters (phrases, punctuation) are counted by a
+    `RegexMatcher` over just those words.
+    """
+
+    engine = 'token'
+
+    def __init__(self, words: Iterable[str]):
+        """
+        Splits the words into token words and phrases.
+
+        Args:
+            words (Iterable[str]): The words to count. Empty words are ignored.
+        """
+        super().__init__(words)
+
+        self._token_words = frozenset(word for word in self.words if _TOKEN_RE.fullmatch(word))
+        phrases = self.words - self._token_words
+        self._phrase_matcher = RegexMatcher(phrases) if phrases else None
+        matcher_logger.debug(f'Token set matcher compiled - {len(self._token_words)} token words, '
+                             f'{len(phrases)} phrases')
+
+    def count(self, content: str) -> Dict[str, int]:
+        """
+        Counts the tracked words with one tokenization pass and a phrase pass if needed.
+
+        Args:
+            content (str): The normalized message content.
+
+        Returns:
+            Dict[str, int]: The count of every tracked word found in the content.
+        """
+        counts = {}
+        token_words = self._token_words
+        if token_words:
+            for token in _TOKEN_RE.findall(content):
+                if token in token_words:
+                    counts[token] = counts.get(token, 0) + 1
+        if self._phrase_matcher is not None:
+            counts.update(self._phrase_matcher.count(content))
+        return counts
+
+
+ENGINES = {
+    RegexMatcher.engine: RegexMatcher,
+    AhoCorasickMatcher.engine: AhoCorasickMatcher,
+    TokenSetMatcher.engine: TokenSetMatcher,
+}
+
+
+def set_default_engine(engine: str) -> None:
+    """
+    Sets the matching engine used when no engine is requested explicitly.
+
+    Args:
+        engine (str): The name of the engine, one of `ENGINES`.
+
+    Raises:
+        ValueError: If the engine is unknown.
+    """
+    global _default_engine
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown matcher engine '{engine}', expected one of: {', '.join(ENGINES)}")
+    _default_engine = engine
+    matcher_logger.info(f'Default matcher engine set to {engine}')
+
+
+def get_default_engine() -> str:
+    """
+    Gets the matching engine used when no engine is requested explicitly.
+
+    Returns:
+        str: The name of the engine.
+    """
+    return _default_engine
+
+
+@lru_cache(maxsize=16)
+def _build_matcher(words: frozenset, engine: str) -> WordMatcher:
+    """
+    Builds a matcher for a word set, reusing it while the same set is requested again.
+
+    Args:
+        words (frozenset): The words to count.
+        engine (str): The name of the engine to build.
+
+    Returns:
+        WordMatcher: The compiled matcher.
+    """
+    return ENGINES[engine](words)
+
+
+def get_matcher(words: Iterable[str], engine: Optional[str] = None) -> WordMatcher:
+    """
+    Gets the compiled matcher for a word set, compiling it only if the set changed.
+
+    Args:
+        words (Iterable[str]): The words to count.
+        engine (str, optional): The name of the engine to use. Defaults to the default engine.
+
+    Returns:
+        WordMatcher: The compiled matcher for these words.
+
+    Raises:
+        ValueError: If the engine is unknown.
+    """
+    engine = engine or _default_engine
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown matcher engine '{engine}', expected one of: {', '.join(ENGINES)}")
+    return _build_matcher(frozenset(word for word in words if word), engine)
+
+
+def count_batch(words_key: int, engine: str, messages: List[Tuple[int, str]], keep_content: bool = False,
+                words: Optional[frozenset] = None) -> Optional[Tuple[Dict[int, Dict[str, int]], Optional[List[str]]]]:
+    """
+    Normalizes a batch of raw messages and counts the tracked words per author.
+
+    This is the entry point of scan worker processes, so it only takes picklable arguments.
+    Batches only carry the key of their word set. The words are sent once per worker and scan,
+    after the worker reported the key as unknown, and their matcher is kept for later batches.
+
+    Args:
+        words_key (int): The key of the word set, unique per scan.
+        engine (str): The name of the engine to use, one of `ENGINES`.
+        messages (List[Tuple[int, str]]): The author ID and raw content of each message.
+        keep_content (bool, optional): If True, the normalized contents are returned too.
+            Defaults to False.
+        words (frozenset, optional): The words of the key, needed if this worker does not know
+            the key yet. Defaults to None.
+
+    Returns:
+        Optional[Tuple[Dict[int, Dict[str, int]], Optional[List[str]]]]: The counts per word for each
+        author ID, and the normalized content of each message if `keep_content` is True. None if the
+        key is unknown and no words were sent, the batch must then be sent again with the words.
+    """
+    matcher = _worker_matchers.get(words_key)
+    if matcher is None:
+        if words is None:
+            return None
+        matcher = _worker_matchers[words_key] = _build_matcher(words, engine)
+        if len(_worker_matchers) > WORKER_MATCHER_CACHE_SIZE:
+            del _worker_matchers[next(iter(_worker_matchers))]
+    counts = {}
+    contents = [] if keep_content else None
+    for author_id, content in messages:
+        content_normalized = normalize(content)
+        if keep_content:
+            contents.append(content_normalized)
+        for word, count in matcher.count(content_normalized).items():
+            author_counts = counts.setdefault(author_id, {})
+            author_counts[word] = author_counts.get(word, 0) + count
+    return counts, contents
@@ -0,0 +1,305 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Iterable, List, Optional
+from logic import scan
+
+scan_jobs_logger = logging.getLogger('bot.scan_jobs')
+
+# Number of finished jobs kept for the status command
+FINISHED_JOBS_KEPT = 5
+
+
+class ScanJob:
+    """
+    A scan waiting in or run by the scan scheduler.
+
+    Attributes:
+        target_user_id (int): If set, the scan only counts messages of this user.
+        target_words (frozenset): If set, the scan only counts these words.
+        incremental (bool): Whether a full scan resumes from the checkpoints of the channels.
+        state (str): One of 'queued', 'running', 'done' or 'failed'.
+        merged (int): The number of requests merged into this job.
+        messages_scanned (int): The number of messages read so far.
+        queued_at (float): The time the job was queued.
+        started_at (float): The time the job started, None while queued.
+        finished_at (float): The time the job finished, None until then.
+    """
+
+    def __init__(self, target_user_id: Optional[int] = None, target_words: Optional[Iterable[str]] = None,
+                 incremental: bool = False):
+        """
+        Initializes a queued job.
+
+        Args:
+            target_user_id (int, optional): If provided, scans only for this user. Defaults to None.
+            target_words (Iterable[str], optional): If provided, scans for these words only.
+                Defaults to None.
+            incremental (bool, optional): If True, a full scan resumes from the checkpoints of the
+                channels. Defaults to False.
+        """
+        self.target_user_id = target_user_id
+        self.target_words = frozenset(target_words) if target_words else None
+        self.incremental = incremental
+        self.state = 'queued'
+        self.merged = 1
+        self.messages_scanned = 0
+        self.queued_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def key(self) -> tuple:
+        """
+        Gets the key identifying duplicate jobs.
+
+        Returns:
+            tuple: The user ID and words of the job, both None for a full scan.
+        """
+        return self.target_user_id, self.target_words
+
+    @property
+    def is_full(self) -> bool:
+        """
+        Checks if the job scans all words of all users.
+
+        Returns:
+            bool: True if the job is a full scan.
+        """
+        return self.target_user_id is None and self.target_words is None
+
+    @property
+    def description(self) -> str:
+        """
+        Gets a short description of the job.
+
+        Returns:
+            str: The description for logs and the status command.
+        """
+        if self.target_words:
+            words = ', '.join(f"'{word}'" for word in sorted(self.target_words))
+            return f'word {words}' if len(self.target_words) == 1 else f'words {words}'
+        if self.target_user_id:
+            return f'user {self.target_user_id}'
+        return 'incremental full scan' if self.incremental else 'full scan'
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Gets the run time of the job.
+
+        Returns:
+            float: The seconds since the job started, 0 while queued.
+        """
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """
+        Gets the scan speed of the job.
+
+        Returns:
+            float: The messages read per second.
+        """
+        elapsed = self.elapsed
+        return self.messages_scanned / elapsed if elapsed else 0.0
+
+    def covers(self, job: 'ScanJob') -> bool:
+        """
+        Checks if running this job makes another job unnecessary.
+
+        A full scan counts every user, so it covers user scans. Only a full scan reading the
+        whole history covers a word scan, an incremental one skips the history of a new word.
+        A word scan covers scans of a subset of its words.
+
+        Args:
+            job (ScanJob): The other job.
+
+        Returns:
+            bool: True if the other job is covered by this one.
+        """
+        if self.key == job.key:
+            return self.incremental <= job.incremental
+        if self.target_words and job.target_words and self.target_user_id == job.target_user_id:
+            return job.target_words <= self.target_words
+        if not self.is_full:
+            return False
+        return job.target_words is None or not self.incremental
+
+    def add_progress(self, messages: int) -> None:
+        """
+        Adds messages read by the running scan.
+
+        Args:
+            messages (int): The number of messages read since the previous call.
+        """
+        self.messages_scanned += messages
+
+
+class ScanScheduler:
+    """
+    Runs queued scans one at a time in the background.
+
+    Commands and events queue scans and return at once. A queued job that is covered by
+    another queued job is merged into it, and queued word scans are combined into one scan of
+    all their words, so the same history is never scanned twice in a row or by several scans
+    at once.
+
+    Attributes:
+        concurrency (int): The maximum number of histories read at the same time by a scan.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty scheduler that is not running.
+        """
+        self.concurrency = 1
+        self._bot = None
+        self._server_id = None
+        self._queued: List[ScanJob] = []
+        self._running: Optional[ScanJob] = None
+        self._finished = deque(maxlen=FINISHED_JOBS_KEPT)
+        self._wakeup = None
+        self._worker = None
+
+    def start(self, bot, server_id: int, concurrency: int = 1) -> None:
+        """
+        Starts running queued jobs in the background.
+
+        Args:
+            bot (discord.Client): The Discord bot instance.
+            server_id (int): The ID of the server to scan.
+            concurrency (int, optional): The maximum number of histories read at the same time by
+                a scan. Defaults to 1.
+        """
+        self._bot = bot
+        self._server_id = server_id
+        self.concurrency = concurrency
+        self._wakeup = asyncio.Event()
+        if self._queued:
+            self._wakeup.set()
+        self._worker = asyncio.ensure_future(self._run())
+        scan_jobs_logger.info('Scan scheduler started')
+
+    async def stop(self) -> None:
+        """
+        Stops the background worker, cancelling the running job. Queued jobs are kept.
+        """
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        scan_jobs_logger.info('Scan scheduler stopped')
+
+    def submit(self, target_user_id: Optional[int] = None, target_words: Optional[Iterable[str]] = None,
+               incremental: bool = False) -> ScanJob:
+        """
+        Queues a scan, merging it with queued jobs that cover it or that it covers.
+
+        Args:
+            target_user_id (int, optional): If provided, scans only for this user. Defaults to None.
+            target_words (Iterable[str], optional): If provided, scans for these words only.
+                Defaults to None.
+            incremental (bool, optional): If True, a full scan resumes from the checkpoints of the
+                channels. Defaults to False.
+
+        Returns:
+            ScanJob: The queued job that will run the scan.
+        """
+        job = ScanJob(target_user_id, target_words, incremental)
+        for queued_job in self._queued:
+            if queued_job.covers(job):
+                queued_job.merged += 1
+                scan_jobs_logger.info(f'Scan of {job.description} merged into queued {queued_job.description}')
+                return queued_job
+            if queued_job.target_words and job.target_words and queued_job.target_user_id == job.target_user_id:
+                # Reading the history once for all new words is as fast as reading it for one
+                queued_job.target_words |= job.target_words
+                queued_job.merged += 1
+                scan_jobs_logger.info(f'Scan of {job.description} combined into queued {queued_job.description}')
+                return queued_job
+
+        covered = [queued_job for queued_job in self._queued if job.covers(queued_job)]
+        for queued_job in covered:
+            self._queued.remove(queued_job)
+            job.merged += queued_job.merged
+            scan_jobs_logger.info(f'Queued {queued_job.description} merged into scan of {job.description}')
+
+        self._queued.append(job)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        scan_jobs_logger.info(f'Scan of {job.description} queued at position {len(self._queued)}')
+        return job
+
+    @property
+    def jobs(self) -> List[ScanJob]:
+        """
+        Gets the running job, the queued jobs in order and the recently finished jobs.
+
+        Returns:
+            List[ScanJob]: The jobs, most recently finished last.
+        """
+        running = [self._running] if self._running else []
+        return running + self._queued + list(reversed(self._finished))
+
+    def position(self, job: ScanJob) -> int:
+        """
+        Gets the position of a job in the queue.
+
+        Args:
+            job (ScanJob): The job.
+
+        Returns:
+            int: 0 if the job is running, its 1-based queue position if queued, -1 otherwise.
+        """
+        if job is self._running:
+            return 0
+        return self._queued.index(job) + 1 if job in self._queued else -1
+
+    async def _run(self) -> None:
+        """
+        Runs queued jobs in order until the scheduler is stopped.
+        """
+        while True:
+            await self._wakeup.wait()
+            while self._queued:
+                await self._execute(self._queued.pop(0))
+            self._wakeup.clear()
+
+    async def _execute(self, job: ScanJob) -> None:
+        """
+        Runs a job and records its result. Errors are logged, the next job still runs.
+
+        Args:
+            job (ScanJob): The job to run.
+        """
+        self._running = job
+        job.state = 'running'
+        job.started_at = time.monotonic()
+        scan_jobs_logger.info(f'Scan of {job.description} started')
+        try:
+            await scan(self._bot, self._server_id, target_user_id=job.target_user_id, target_words=job.target_words,
+                       incremental=job.incremental, concurrency=self.concurrency, progress=job.add_progress)
+            job.state = 'done'
+        except asyncio.CancelledError:
+            job.state = 'failed'
+            raise
+        except Exception as e:
+            job.state = 'failed'
+            scan_jobs_logger.error(f'Scan of {job.description} failed: {e}')
+        finally:
+            job.finished_at = time.monotonic()
+            self._running = None
+            self._finished.append(job)
+        scan_jobs_logger.info(f'Scan of {job.description} {job.state} - {job.messages_scanned} messages in '
+                              f'{job.elapsed:.1f}s ({job.throughput:.0f} messages/s)')
+
+
+scan_scheduler = ScanScheduler()
@@ -0,0 +1,85 @@
+import unittest
+import logging
+from collections import defaultdict
+from config import setup_logging
+from aggregator import DENSE_WORD_LIMIT, WordCountAggregator
+
+
+class TestAggregator(unittest.TestCase):
+    """
+    Test suite for the compact scan aggregator.
+
+    Attributes:
+        test_logger: Logger instance for test-specific logging.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Set up class-level fixtures.
+        This method is called once before running all tests in the class.
+        """
+        setup_logging()
+        cls.test_logger = logging.getLogger('tests.aggregator')
+        cls.test_logger.info('Test logging configuration complete')
+
+    def assert_matches_nested_dicts(self, aggregator, additions):
+        """
+        Adds counts to an aggregator and to nested dictionaries and compares them.
+
+        Args:
+            aggregator (WordCountAggregator): The aggregator.
+            additions (list): The (user ID, word, count) tuples to add.
+        """
+        expected = defaultdict(lambda: defaultdict(int))
+        for user_id, word, count in additions:
+            aggregator.add(user_id, word, count)
+            expected[user_id][word] += count
+        aggregator.merge({2: {'dog': 4, 'hot dog': 1}})
+        expected[2]['dog'] += 4
+        expected[2]['hot dog'] += 1
+
+        for user_id in (1, 2, 3):
+            for word in ('cat', 'dog', 'bird'):
+                self.assertEqual(aggregator.get(user_id, word), expected.get(user_id, {}).get(word, 0))
+        self.assertEqual(len(aggregator), len(expected))
+        self.assertEqual(dict(aggregator.items()), {user_id: dict(counts) for user_id, counts in expected.items()})
+
+    def test_matches_nested_dicts(self):
+        """
+        Test that the aggregator returns the same counts as nested dictionaries.
+
+        Tests:
+            - Counts of interned and new words are summed per user and word
+            - Rows are widened for new words after users were added
+            - Large word sets switch to sparse rows without losing counts
+            - Unknown users and words count 0
+        """
+        self.test_logger.info('Starting test_matches_nested_dicts')
+        additions = [(1, 'cat', 2), (2, 'dog', 1), (1, 'dog', 3), (1, 'cat', 1), (2 ** 63, 'cat', 5)]
+        many_words = [(user_id, f'word{index}', index + 1) for index in range(DENSE_WORD_LIMIT + 1) for user_id in (1, 4)]
+        self.assertFalse(WordCountAggregator())
+
+        with self.subTest('interned words'):
+            self.assert_matches_nested_dicts(WordCountAggregator(['cat', 'dog']), additions)
+        with self.subTest('new words'):
+            self.assert_matches_nested_dicts(WordCountAggregator(), additions)
+        with self.subTest('sparse rows'):
+            self.assert_matches_nested_dicts(WordCountAggregator(), additions + many_words + additions)
+        with self.subTest('sparse from the start'):
+            words = [f'word{index}' for index in range(DENSE_WORD_LIMIT + 1)]
+            self.assert_matches_nested_dicts(WordCountAggregator(words), many_words + additions)
+        self.test_logger.info('Completed test_matches_nested_dicts')
+
+    def test_has_no_instance_dict(self):
+        """
+        Test that the aggregator uses slots and rejects new attributes.
+        """
+        self.test_logger.info('Starting test_has_no_instance_dict')
+        with self.assertRaises(AttributeError):
+            WordCountAggregator().extra = 1
+        self.test_logger.info('Completed test_has_no_instance_dict')
+
+
+if __name__ == '__main__':
+    unittest.main()
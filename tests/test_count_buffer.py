@@ -0,0 +1,143 @@
+import asyncio
+import unittest
+import logging
+from config import setup_logging
+from db import queries
+from db.count_buffer import CountBuffer
+
+
+class TestCountBuffer(unittest.IsolatedAsyncioTestCase):
+    """
+    Test suite for the write-behind count buffer.
+
+    Attributes:
+        test_logger: Logger instance for test-specific logging.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Set up class-level fixtures.
+        This method is called once before running all tests in the class.
+        """
+        setup_logging()
+        cls.test_logger = logging.getLogger('tests.count_buffer')
+        cls.test_logger.info('Test logging configuration complete')
+
+    def setUp(self):
+        """
+        Set up test fixtures.
+        This method is called before each test method.
+        """
+        queries.drop_tables()
+        self.buffer = CountBuffer(flush_threshold=10)
+
+    def tearDown(self):
+        """
+        Clean up test fixtures.
+        This method is called after each test method.
+        """
+        queries.drop_tables()
+
+    async def test_reads_see_pending_counts(self):
+        """
+        Test that buffered increments are visible before they are flushed.
+
+        Tests:
+            - The first increment of a pair is reported as first time
+            - Later increments are not reported as first time
+            - Reads include pending increments, the database does not until flushed
+        """
+        self.test_logger.info('Starting test_reads_see_pending_counts')
+        user_id = 123456789012345678
+        word = 'testword'
+        queries.add_words(word)
+
+        self.assertIsNone(await self.buffer.add(user_id, word, 2))
+        self.assertEqual(await self.buffer.add(user_id, word, 3), 2)
+        self.assertEqual(await self.buffer.get_count(user_id, word), 5)
+        self.assertIsNone(queries.get_count(user_id, word))
+
+        self.assertEqual(await self.buffer.flush(), 1)
+        self.assertEqual(queries.get_count(user_id, word), 5)
+        self.assertEqual(await self.buffer.get_count(user_id, word), 5)
+        self.test_logger.info('Completed test_reads_see_pending_counts')
+
+    async def test_reads_add_pending_counts_to_stored_results(self):
+        """
+        Test that the leaderboard and per-user reads include pending increments without flushing.
+
+        Tests:
+            - Pending increments raise stored counts and add users missing from the stored results
+            - Nothing is written to the database by the reads
+        """
+        self.test_logger.info('Starting test_reads_add_pending_counts_to_stored_results')
+        queries.add_user_ids(1, 2, 3)
+        queries.add_words('cat', 'dog')
+        queries.upsert_highest_counts({1: {'cat': 5}, 2: {'cat': 4, 'dog': 1}})
+
+        await self.buffer.add(2, 'cat', 3)
+        await self.buffer.add(3, 'dog', 2)
+
+        self.assertEqual(await self.buffer.get_leaderboard('cat'), [(2, 7), (1, 5)])
+        self.assertEqual(await self.buffer.get_leaderboard('dog'), [(3, 2), (2, 1)])
+        self.assertEqual(await self.buffer.get_highest_count_column('cat'), (2, 'cat', 7))
+        self.assertEqual(await self.buffer.get_highest_count_column('dog'), (3, 'dog', 2))
+        self.assertEqual(await self.buffer.get_total_highest_count_column(), (2, 'cat', 7))
+        self.assertCountEqual(await self.buffer.get_user_word_counts(2), [('cat', 7), ('dog', 1)])
+        self.assertEqual(await self.buffer.get_user_word_counts(3), [('dog', 2)])
+
+        self.assertEqual(len(self.buffer), 2)
+        self.assertEqual(queries.get_total_highest_count_column(), (1, 'cat', 5))
+        self.test_logger.info('Completed test_reads_add_pending_counts_to_stored_results')
+
+    async def test_concurrent_first_time(self):
+        """
+        Test that concurrent messages of the same pair report the first time only once.
+        """
+        self.test_logger.info('Starting test_concurrent_first_time')
+        user_id = 123456789012345678
+        word = 'testword'
+
+        previous_counts = await asyncio.gather(*[self.buffer.add(user_id, word, 1) for _ in range(3)])
+
+        self.assertEqual(previous_counts.count(None), 1)
+        self.assertEqual(await self.buffer.get_count(user_id, word), 3)
+        self.test_logger.info('Completed test_concurrent_first_time')
+
+    async def test_flush_threshold(self):
+        """
+        Test that the buffer flushes once the threshold of pending pairs is reached.
+
+        Tests:
+            - Pending pairs are written when the threshold is reached
+            - Existing counts are incremented, not replaced
+        """
+        self.test_logger.info('Starting test_flush_threshold')
+        word = 'testword'
+        queries.add_words(word)
+        queries.add_user_has_word(0, word, 4)
+
+        for user_id in range(10):
+            await self.buffer.add(user_id, word, 1)
+
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(queries.get_count(0, word), 5)
+        self.assertEqual(queries.get_count(9, word), 1)
+        self.test_logger.info('Completed test_flush_threshold')
+
+    async def test_discard_word(self):
+        """
+        Test that pending increments of a removed word are dropped.
+        """
+        self.test_logger.info('Starting test_discard_word')
+        await self.buffer.add(123456789012345678, 'removed', 1)
+        await self.buffer.add(123456789012345678, 'kept', 1)
+        self.buffer.discard_word('removed')
+
+        self.assertEqual(len(self.buffer), 1)
+        self.test_logger.info('Completed test_discard_word')
+
+
+if __name__ == '__main__':
+    unittest.main()
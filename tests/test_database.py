@@ -0,0 +1,140 @@
+import unittest
+import logging
+from unittest import mock
+from sqlalchemy import event, text
+from config import LEADERBOARD_SIZE, setup_logging
+from db import models, queries
+from db.database import Session, engine, migrate, session_scope
+from db.models import LeaderboardSize
+
+
+def explain_query_plans(func, *args) -> str:
+    """
+    Gets the SQLite query plans of the selects a function runs.
+
+    Args:
+        func (Callable): The query function to run.
+        *args: The arguments of the function.
+
+    Returns:
+        str: The details of all query plan steps, one per line.
+    """
+    statements = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        func(*args)
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    with engine.connect() as connection:
+        return '\n'.join(
+            row[-1]
+            for statement, parameters in statements
+            for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        )
+
+
+class TestDatabase(unittest.TestCase):
+    """
+    Test suite for the engine and session management.
+
+    Attributes:
+        test_logger: Logger instance for test-specific logging.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Set up class-level fixtures.
+        This method is called once before running all tests in the class.
+        """
+        setup_logging()
+        cls.test_logger = logging.getLogger('tests.database')
+        cls.test_logger.info('Test logging configuration complete')
+
+    def test_sqlite_pragmas(self):
+        """
+        Test that connections use the tuned SQLite settings.
+
+        Tests:
+            - WAL journaling is enabled
+            - Synchronous mode is NORMAL
+            - The busy timeout is set
+        """
+        self.test_logger.info('Starting test_sqlite_pragmas')
+        with session_scope() as session:
+            journal_mode = session.execute(text('PRAGMA journal_mode')).scalar()
+            synchronous = session.execute(text('PRAGMA synchronous')).scalar()
+            busy_timeout = session.execute(text('PRAGMA busy_timeout')).scalar()
+
+        self.assertEqual(journal_mode, 'wal')
+        self.assertEqual(synchronous, 1)
+        self.assertEqual(busy_timeout, 5000)
+        self.test_logger.info('Completed test_sqlite_pragmas')
+
+    def test_session_is_reused(self):
+        """
+        Test that the same thread reuses its session across units of work.
+        """
+        self.test_logger.info('Starting test_session_is_reused')
+        with session_scope() as first_session:
+            pass
+        with session_scope() as second_session:
+            pass
+
+        self.assertIs(first_session, second_session)
+        self.assertIs(second_session, Session())
+        self.test_logger.info('Completed test_session_is_reused')
+
+    def test_highest_count_uses_index(self):
+        """
+        Test that the highest count queries read the leaderboard indexes instead of sorting.
+
+        Tests:
+            - The highest count of a word uses the (word_name, count, user_id) index
+            - The highest count of all words uses the (count, user_id) index
+            - Neither query sorts with a temporary b-tree, including the user_id tie-break
+        """
+        self.test_logger.info('Starting test_highest_count_uses_index')
+        word_plan = explain_query_plans(queries.get_highest_count_column, 'word')
+        total_plan = explain_query_plans(queries.get_total_highest_count_column)
+
+        self.assertIn('ix_leaderboard_word_name_count', word_plan)
+        self.assertIn('ix_leaderboard_count', total_plan)
+        self.assertNotIn('TEMP B-TREE', word_plan + total_plan)
+        self.test_logger.info('Completed test_highest_count_uses_index')
+
+    def test_leaderboard_filled_again_after_size_change(self):
+        """
+        Test that the migration fills the leaderboard again when its configured size changes.
+
+        Tests:
+            - A smaller size trims the top of every word
+            - A larger size completes the top of every word from user_has_word
+            - An unchanged size keeps the leaderboard
+        """
+        self.test_logger.info('Starting test_leaderboard_filled_again_after_size_change')
+        queries.drop_tables()
+        try:
+            queries.add_user_ids(1, 2, 3)
+            queries.add_words('word')
+            queries.upsert_highest_counts({1: {'word': 5}, 2: {'word': 7}, 3: {'word': 6}})
+
+            with mock.patch.object(models, 'LEADERBOARD_SIZE', 2):
+                migrate()
+                self.assertEqual(queries.get_leaderboard('word'), [(2, 7), (3, 6)])
+            migrate()
+            self.assertEqual(queries.get_leaderboard('word'), [(2, 7), (3, 6), (1, 5)])
+            with session_scope() as session:
+                self.assertEqual(session.query(LeaderboardSize.size).scalar(), LEADERBOARD_SIZE)
+        finally:
+            queries.drop_tables()
+        self.test_logger.info('Completed test_leaderboard_filled_again_after_size_change')
+
+
+if __name__ == '__main__':
+    unittest.main()
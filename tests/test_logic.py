@@ -0,0 +1,411 @@
+import asyncio
+import discord
+import unittest
+import logging
+from unittest import mock
+from config import setup_logging
+from db import queries
+from benchmarks.fakes import FakeBot, FakeGuild, FakeMessage, FakeTextChannel, FakeThread, FakeUser
+from db.message_archive import message_archive
+import logic
+
+
+class InterruptedChannel(FakeTextChannel):
+    """
+    Fake channel whose history fails after a number of messages, like a lost connection.
+
+    Attributes:
+        fail_after (int): The number of messages returned before the history fails, None to never fail.
+    """
+
+    fail_after = None
+
+    async def history(self, **kwargs):
+        """
+        Iterates the history and raises once `fail_after` messages were returned.
+
+        Yields:
+            FakeMessage: The messages of the channel.
+        """
+        returned = 0
+        async for message in super().history(**kwargs):
+            if self.fail_after is not None and returned == self.fail_after:
+                raise ConnectionError('History interrupted')
+            returned += 1
+            yield message
+
+
+class SlowThread(FakeThread):
+    """
+    Fake thread whose history yields to the event loop and tracks how many histories are read at once.
+
+    Attributes:
+        active (list): The number of histories read right now, shared by all slow threads.
+        peak (list): The highest number of histories read at once, shared by all slow threads.
+    """
+
+    active = [0]
+    peak = [0]
+
+    async def history(self, **kwargs):
+        """
+        Iterates the history while counting it as active.
+
+        Yields:
+            FakeMessage: The messages of the thread.
+        """
+        self.active[0] += 1
+        self.peak[0] = max(self.peak[0], self.active[0])
+        try:
+            async for message in super().history(**kwargs):
+                await asyncio.sleep(0)
+                yield message
+        finally:
+            self.active[0] -= 1
+
+
+class TestLogic(unittest.IsolatedAsyncioTestCase):
+    """
+    Test suite for scanning a fake server history.
+
+    Attributes:
+        test_logger: Logger instance for test-specific logging.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Set up class-level fixtures.
+        This method is called once before running all tests in the class.
+        """
+        setup_logging()
+        cls.test_logger = logging.getLogger('tests.logic')
+        cls.test_logger.info('Test logging configuration complete')
+
+    def setUp(self):
+        """
+        Set up test fixtures.
+        This method is called before each test method.
+        """
+        queries.drop_tables()
+        queries.add_words('cat', 'dog')
+        logic._refreshed_catalogs.clear()
+        self.alice = FakeUser(1)
+        self.bob = FakeUser(2)
+        contents = [
+            (self.alice, 'cat cat dog'),
+            (self.bob, 'Dog!'),
+            (self.alice, 'concatenate'),
+            (self.bob, 'a cat, a dög'),
+        ]
+        self.messages = [FakeMessage(index, author, content) for index, (author, content) in enumerate(contents, 1)]
+        thread = FakeThread(11, 'thread', [FakeMessage(5, self.bob, 'cat')], parent_id=10, archived=True)
+        self.channel = InterruptedChannel(10, 'channel', list(self.messages), [thread])
+        self.bot = FakeBot(FakeGuild(100, [self.channel], [self.alice, self.bob]))
+
+    def tearDown(self):
+        """
+        Clean up test fixtures.
+        This method is called after each test method.
+        """
+        queries.drop_tables()
+        message_archive.enabled = False
+
+    def assertCounts(self, expected):
+        """
+        Asserts the stored counts of all users and words.
+
+        Args:
+            expected (dict): The expected (user_id, word) -> count mapping.
+        """
+        for (user_id, word), count in expected.items():
+            self.assertEqual(queries.get_count(user_id, word), count, f'{user_id} {word}')
+
+    async def test_full_scan(self):
+        """
+        Test that a full scan counts every tracked word in channels and threads.
+        """
+        self.test_logger.info('Starting test_full_scan')
+        await logic.scan(self.bot, 100)
+
+        self.assertCounts({(1, 'cat'): 2, (1, 'dog'): 1, (2, 'cat'): 2, (2, 'dog'): 2})
+        self.test_logger.info('Completed test_full_scan')
+
+    async def test_tracked_matcher_follows_word_set(self):
+        """
+        Test that the matcher of the tracked words is reused until the word set changes.
+        """
+        self.test_logger.info('Starting test_tracked_matcher_follows_word_set')
+        matcher = await logic.get_tracked_matcher()
+        self.assertEqual(matcher.words, {'cat', 'dog'})
+        self.assertIs(await logic.get_tracked_matcher(), matcher)
+
+        queries.add_words('bird')
+        self.assertEqual((await logic.get_tracked_matcher()).words, {'cat', 'dog', 'bird'})
+        queries.remove_word('cat')
+        self.assertEqual((await logic.get_tracked_matcher()).count('cat bird'), {'bird': 1})
+        self.test_logger.info('Completed test_tracked_matcher_follows_word_set')
+
+    async def test_incremental_scan(self):
+        """
+        Test that incremental scans only read new messages and keep the totals of the history.
+
+        Tests:
+            - The first incremental scan counts the whole history
+            - Checkpoints are saved for channels and threads
+            - A later scan adds only the new messages
+        """
+        self.test_logger.info('Starting test_incremental_scan')
+        await logic.scan(self.bot, 100, incremental=True)
+
+        self.assertCounts({(1, 'cat'): 2, (1, 'dog'): 1, (2, 'cat'): 2, (2, 'dog'): 2})
+        self.assertEqual(queries.get_scan_checkpoint(10), (4, False))
+        self.assertEqual(queries.get_scan_checkpoint(11), (5, False))
+
+        self.channel.messages.append(FakeMessage(6, self.alice, 'cat'))
+        with mock.patch.object(logic, 'process_message', wraps=logic.process_message) as process_message:
+            await logic.scan(self.bot, 100, incremental=True)
+
+        self.assertEqual(process_message.call_count, 1)
+        self.assertCounts({(1, 'cat'): 3, (2, 'cat'): 2})
+        self.test_logger.info('Completed test_incremental_scan')
+
+    async def test_interrupted_scan_resumes(self):
+        """
+        Test that an interrupted incremental scan continues from its last checkpoint.
+
+        Tests:
+            - Progress is saved every SCAN_CHECKPOINT_INTERVAL messages
+            - The resumed scan does not count saved messages twice
+        """
+        self.test_logger.info('Starting test_interrupted_scan_resumes')
+        self.channel.fail_after = 3
+        with mock.patch.object(logic, 'SCAN_CHECKPOINT_INTERVAL', 2):
+            with self.assertRaises(ConnectionError):
+                await logic.scan(self.bot, 100, incremental=True)
+            self.assertEqual(queries.get_scan_checkpoint(10), (2, False))
+
+            self.channel.fail_after = None
+            await logic.scan(self.bot, 100, incremental=True)
+
+        self.assertCounts({(1, 'cat'): 2, (1, 'dog'): 1, (2, 'cat'): 2, (2, 'dog'): 2})
+        self.test_logger.info('Completed test_interrupted_scan_resumes')
+
+    async def test_concurrent_scan(self):
+        """
+        Test that concurrent scans respect the concurrency limit and count like sequential scans.
+        """
+        self.test_logger.info('Starting test_concurrent_scan')
+        threads = [
+            SlowThread(20 + index, f'slow-{index}', [FakeMessage(100 + index, self.alice, 'dog')], parent_id=10)
+            for index in range(6)
+        ]
+        self.channel.threads = threads
+        SlowThread.peak[0] = 0
+
+        await logic.scan(self.bot, 100, concurrency=3)
+
+        self.assertEqual(SlowThread.peak[0], 3)
+        self.assertCounts({(1, 'cat'): 2, (1, 'dog'): 7, (2, 'cat'): 2, (2, 'dog'): 2})
+        self.test_logger.info('Completed test_concurrent_scan')
+
+    async def test_thread_catalog(self):
+        """
+        Test that scans list threads from the thread catalog instead of Discord.
+
+        Tests:
+            - The first scan lists archived threads from Discord and fills the catalog
+            - Later scans read archived threads from the catalog without listing them
+            - Incremental scans skip threads without new messages
+            - Deleted threads are removed from the catalog
+        """
+        self.test_logger.info('Starting test_thread_catalog')
+        await logic.scan(self.bot, 100, incremental=True)
+        self.assertEqual([entry[0] for entry in queries.get_thread_catalog(10)], [11])
+
+        thread = self.channel.archived[0]
+        with mock.patch.object(self.channel, 'archived_threads') as archived_threads, \
+                mock.patch.object(thread, 'history', wraps=thread.history) as history:
+            await logic.scan(self.bot, 100, incremental=True)
+            self.assertEqual(history.call_count, 0)
+
+            # A new message unarchives the thread, the thread update event refreshes the catalog
+            thread.messages.append(FakeMessage(6, self.alice, 'dog'))
+            queries.save_threads([logic.catalog_entry(thread)])
+            await logic.scan(self.bot, 100, incremental=True)
+            self.assertEqual(history.call_count, 1)
+
+        self.assertEqual(archived_threads.call_count, 0)
+        self.assertCounts({(1, 'dog'): 2})
+
+        not_found = discord.NotFound(mock.Mock(status=404, reason='Not Found'), 'Unknown Channel')
+        with mock.patch.object(thread, 'history', side_effect=not_found):
+            await logic.scan(self.bot, 100)
+        self.assertEqual(queries.get_thread_catalog(10), [])
+        self.test_logger.info('Completed test_thread_catalog')
+
+    async def test_user_backfill(self):
+        """
+        Test that a user scan only reads the channels where the user wrote, once an index exists.
+
+        Tests:
+            - Without an index, a user scan builds it with an incremental full scan
+            - With an index, only channels of the user are read, and words added later are counted
+            - With the message archive, no history is read at all
+        """
+        self.test_logger.info('Starting test_user_backfill')
+        other_channel = InterruptedChannel(30, 'other', [FakeMessage(7, self.bob, 'dog')])
+        self.bot.guild.text_channels.append(other_channel)
+        await logic.scan(self.bot, 100, target_user_id=1)
+        self.assertTrue(queries.has_scan_checkpoints())
+        self.assertEqual(queries.get_author_channels(1), [10])
+
+        queries.add_words('concatenate')
+        other_channel.fail_after = 0
+        await logic.scan(self.bot, 100, target_user_id=1)
+        self.assertCounts({(1, 'cat'): 2, (1, 'dog'): 1, (1, 'concatenate'): 1})
+
+        message_archive.enabled = True
+        other_channel.fail_after = None
+        await logic.scan(self.bot, 100, incremental=True)
+        self.channel.fail_after = other_channel.fail_after = 0
+        queries.add_words('a')
+        await logic.scan(self.bot, 100, target_user_id=2)
+        self.assertCounts({(2, 'a'): 2, (2, 'dog'): 3})
+        self.test_logger.info('Completed test_user_backfill')
+
+    async def test_multi_word_scan(self):
+        """
+        Test that a scan for several new words reads the history once and counts only those words.
+        """
+        self.test_logger.info('Starting test_multi_word_scan')
+        queries.add_words('a', 'concatenate')
+        with mock.patch.object(self.channel, 'history', wraps=self.channel.history) as history:
+            await logic.scan(self.bot, 100, target_words=['a', 'concatenate'])
+
+        self.assertEqual(history.call_count, 1)
+        self.assertCounts({(1, 'concatenate'): 1, (2, 'a'): 2, (1, 'cat'): None, (2, 'dog'): None})
+        self.test_logger.info('Completed test_multi_word_scan')
+
+    async def test_pipeline_flushes_partial_counts(self):
+        """
+        Test that a scan writes partial counts as it goes and ends with the same counts.
+
+        Tests:
+            - Batches wait in a bounded queue of one batch
+            - Changed counts are written every SCAN_FLUSH_INTERVAL messages
+        """
+        self.test_logger.info('Starting test_pipeline_flushes_partial_counts')
+        with mock.patch.multiple(logic, SCAN_BATCH_SIZE=1, SCAN_QUEUE_SIZE=1, SCAN_FLUSH_INTERVAL=2), \
+                mock.patch.object(logic, 'update_word_counts', wraps=logic.update_word_counts) as update_word_counts:
+            await logic.scan(self.bot, 100)
+
+        self.assertEqual(update_word_counts.call_count, 3)
+        self.assertEqual(dict(update_word_counts.call_args_list[0].args[0]), {2: {'cat': 1, 'dog': 1}})
+        self.assertCounts({(1, 'cat'): 2, (1, 'dog'): 1, (2, 'cat'): 2, (2, 'dog'): 2})
+        self.test_logger.info('Completed test_pipeline_flushes_partial_counts')
+
+    async def test_pipeline_stops_readers_on_write_error(self):
+        """
+        Test that a failed write stops the history readers instead of leaving them waiting on a full queue.
+        """
+        self.test_logger.info('Starting test_pipeline_stops_readers_on_write_error')
+        error = queries.DatabaseError('Error saving scan progress', None)
+        with mock.patch.multiple(logic, SCAN_CHECKPOINT_INTERVAL=1, SCAN_QUEUE_SIZE=1), \
+                mock.patch.object(logic.async_queries, 'save_scan_progress', side_effect=error):
+            with self.assertRaises(queries.DatabaseError):
+                await asyncio.wait_for(logic.scan(self.bot, 100, incremental=True), timeout=5)
+
+        self.assertIsNone(queries.get_scan_checkpoint(10))
+        self.test_logger.info('Completed test_pipeline_stops_readers_on_write_error')
+
+    async def test_scan_workers(self):
+        """
+        Test that scans matched by worker processes count like scans matched on the event loop.
+
+        Tests:
+            - Full and incremental scans with the message archive
+            - Batches in flight are completed in order, so checkpoints stay correct
+        """
+        self.test_logger.info('Starting test_scan_workers')
+        message_archive.enabled = True
+        logic.set_scan_workers(2)
+        try:
+            with mock.patch.multiple(logic, SCAN_BATCH_SIZE=1, SCAN_CHECKPOINT_INTERVAL=1):
+                await logic.scan(self.bot, 100)
+                self.assertCounts({(1, 'cat'): 2, (1, 'dog'): 1, (2, 'cat'): 2, (2, 'dog'): 2})
+
+                await logic.scan(self.bot, 100, incremental=True)
+        finally:
+            logic.set_scan_workers(0)
+
+        self.assertEqual(queries.get_scan_checkpoint(10), (4, True))
+        self.assertEqual(queries.get_channel_word_totals(), {1: {'cat': 2, 'dog': 1}, 2: {'cat': 2, 'dog': 2}})
+        self.assertEqual(len(queries.get_archived_word_candidates('dog')), 3)
+        self.test_logger.info('Completed test_scan_workers')
+
+    async def test_user_backfill_before_archive(self):
+        """
+        Test that a user scan reads the channels that were scanned before the archive was enabled.
+
+        Tests:
+            - Channels without an archived checkpoint are read from their history
+            - Archived threads that are not cached are read through the thread catalog
+        """
+        self.test_logger.info('Starting test_user_backfill_before_archive')
+        await logic.scan(self.bot, 100, incremental=True)
+        message_archive.enabled = True
+        queries.add_words('a')
+
+        # Discord does not cache archived threads
+        get_channel_or_thread = self.bot.guild.get_channel_or_thread
+        with mock.patch.object(self.bot.guild, 'get_channel_or_thread',
+                               side_effect=lambda channel_id: None if channel_id == 11 else get_channel_or_thread(channel_id)), \
+                mock.patch.object(self.bot, 'get_partial_messageable',
+                                  side_effect=lambda channel_id, **kwargs: get_channel_or_thread(channel_id)) as partial:
+            await logic.scan(self.bot, 100, target_user_id=2)
+        self.assertEqual([call.args for call in partial.call_args_list], [(11,)])
+        self.assertCounts({(2, 'a'): 2, (2, 'cat'): 2, (2, 'dog'): 2})
+        self.test_logger.info('Completed test_user_backfill_before_archive')
+
+    async def test_archive_word_scan(self):
+        """
+        Test that a scan for a new word searches the message archive instead of the history.
+
+        Tests:
+            - An incremental scan fills the archive
+            - The word scan only reads messages added since the last scan
+            - Whole-word matching is kept for candidates of the full-text index
+        """
+        self.test_logger.info('Starting test_archive_word_scan')
+        message_archive.enabled = True
+        await logic.scan(self.bot, 100, incremental=True)
+        self.assertEqual(queries.get_scan_checkpoint(10), (4, True))
+
+        queries.add_words('dog', 'a')
+        self.channel.messages.append(FakeMessage(6, self.alice, 'dog dogs'))
+        with mock.patch.object(logic, 'process_message', wraps=logic.process_message) as process_message:
+            await logic.scan(self.bot, 100, target_words=['dog', 'a'])
+
+        self.assertEqual(process_message.call_count, 1)
+        self.assertCounts({(1, 'dog'): 2, (2, 'dog'): 2, (2, 'a'): 2})
+        self.test_logger.info('Completed test_archive_word_scan')
+
+    async def test_archive_rebuilds_unarchived_channels(self):
+        """
+        Test that enabling the archive rescans channels without counting their messages twice.
+        """
+        self.test_logger.info('Starting test_archive_rebuilds_unarchived_channels')
+        await logic.scan(self.bot, 100, incremental=True)
+
+        message_archive.enabled = True
+        await logic.scan(self.bot, 100, incremental=True)
+
+        self.assertEqual(queries.get_scan_checkpoint(10), (4, True))
+        self.assertEqual(queries.get_channel_word_totals()[2]['cat'], 2)
+        self.assertEqual(len(queries.get_archived_word_candidates('cat')), 3)
+        self.test_logger.info('Completed test_archive_rebuilds_unarchived_channels')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import unittest
+import logging
+import re
+from unidecode import unidecode
+from config import setup_logging
+from matcher import ENGINES, WordMatcher, count_batch, get_matcher, get_normalization_stats, normalize
+
+
+def legacy_count(words, content):
+    """
+    Counts words the way the bot did before matchers existed, one `re.findall` per word.
+
+    Args:
+        words (list): The words to count.
+        content (str): The normalized content.
+
+    Returns:
+        dict: The count of every word found in the content.
+    """
+    counts = {}
+    for word in words:
+        if word:
+            matches = re.findall(r'\b' + re.escape(word) + r'\b', content)
+            if matches:
+                counts[word] = len(matches)
+    return counts
+
+
+class TestMatcher(unittest.TestCase):
+    """
+    Test suite for the word matchers.
+
+    Every matcher must return exactly the counts of a separate `re.findall` per word.
+
+    Attributes:
+        test_logger: Logger instance for test-specific logging.
+    """
+
+    WORDS = ['cat', 'cats', 'dog', 'hot dog', 'c++', 'e-mail', 'a_b', 'x', 'aa aa', 'a a', '-x', '']
+    CONTENTS = [
+        '',
+        'cat cats catalog concat cat',
+        'hot dog, hot dog! dog',
+        'i like c++ and c++11, not c+++',
+        'send an e-mail or e-mails to e-mail',
+        'a_b a_bc a_b_ a-b',
+        'x x-x xx _x x',
+        'dogcat cat-dog cat_dog',
+        'aa aa aa a a a',
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Set up class-level fixtures.
+        This method is called once before running all tests in the class.
+        """
+        setup_logging()
+        cls.test_logger = logging.getLogger('tests.matcher')
+        cls.test_logger.info('Test logging configuration complete')
+
+    def test_counts_match_legacy(self):
+        """
+        Test that the counts of every engine equal the per-word regex counts.
+
+        Tests:
+            - Single-token words are counted in one pass
+            - Phrases and words with punctuation keep their own semantics
+            - Overlapping occurrences of the same word are not counted twice
+            - Empty words are ignored
+        """
+        self.test_logger.info('Starting test_counts_match_legacy')
+        for engine, matcher_class in ENGINES.items():
+            matcher = matcher_class(self.WORDS)
+            for content in self.CONTENTS:
+                with self.subTest(engine=engine, content=content):
+                    self.assertEqual(matcher.count(content), legacy_count(self.WORDS, content))
+        self.test_logger.info('Completed test_counts_match_legacy')
+
+    def test_get_matcher_reuses_compiled_matcher(self):
+        """
+        Test that matchers are only rebuilt when the word set changes.
+
+        Tests:
+            - The same word set returns the same matcher, regardless of order
+            - A different word set returns a new matcher
+        """
+        self.test_logger.info('Starting test_get_matcher_reuses_compiled_matcher')
+        matcher = get_matcher(['word1', 'word2'])
+
+        self.assertIs(get_matcher(['word2', 'word1', '']), matcher)
+        self.assertIsNot(get_matcher(['word1', 'word3']), matcher)
+        self.assertIsNot(get_matcher(['word1', 'word2'], engine='aho_corasick'), matcher)
+        self.test_logger.info('Completed test_get_matcher_reuses_compiled_matcher')
+
+    def test_incomplete_engine_cannot_be_constructed(self):
+        """
+        Test that an engine without a count method fails when constructed.
+
+        Tests:
+            - The base class cannot be instantiated
+            - A subclass that does not implement count cannot be instantiated
+        """
+        self.test_logger.info('Starting test_incomplete_engine_cannot_be_constructed')
+
+        class IncompleteMatcher(WordMatcher):
+            engine = 'incomplete'
+
+        with self.assertRaises(TypeError):
+            WordMatcher(['word'])
+        with self.assertRaises(TypeError):
+            IncompleteMatcher(['word'])
+        self.test_logger.info('Completed test_incomplete_engine_cannot_be_constructed')
+
+    def test_normalize(self):
+        """
+        Test the normalization fast path and cache.
+
+        Tests:
+            - Normalized content equals unidecode(content).lower()
+            - ASCII content takes the fast path
+            - Repeated non-ASCII content is served from the cache
+        """
+        self.test_logger.info('Starting test_normalize')
+        for content in ['Hello World', 'Größe ÄRGER', 'Ça Va? Ünïcödé', '', '東京']:
+            self.assertEqual(normalize(content), unidecode(content).lower())
+
+        stats_before = get_normalization_stats()
+        normalize('PLAIN ascii')
+        normalize('Noch Einmal Grüße')
+        normalize('Noch Einmal Grüße')
+        stats_after = get_normalization_stats()
+
+        self.assertEqual(stats_after['ascii'] - stats_before['ascii'], 1)
+        self.assertGreaterEqual(stats_after['hits'] - stats_before['hits'], 1)
+        self.test_logger.info('Completed test_normalize')
+
+    def test_count_batch(self):
+        """
+        Test that worker batches normalize raw contents and sum the counts per author.
+
+        Tests:
+            - A batch with an unknown word set key is reported back
+            - The words are only needed with the first batch of a key
+        """
+        self.test_logger.info('Starting test_count_batch')
+        words = frozenset(self.WORDS) - {''}
+        messages = [(1, content.upper()) for content in self.CONTENTS] + [(2, 'Hôt Dôg, CAT')]
+        expected = {}
+        for author_id, content in messages:
+            for word, count in legacy_count(self.WORDS, unidecode(content).lower()).items():
+                expected.setdefault(author_id, {})[word] = expected.get(author_id, {}).get(word, 0) + count
+
+        for words_key, engine in enumerate(ENGINES):
+            with self.subTest(engine=engine):
+                self.assertIsNone(count_batch(words_key, engine, messages))
+                counts, contents = count_batch(words_key, engine, messages, keep_content=True, words=words)
+                self.assertEqual(counts, expected)
+                self.assertEqual(contents, [unidecode(content).lower() for _, content in messages])
+                # Later batches of the key only carry the key
+                self.assertEqual(count_batch(words_key, engine, messages)[0], expected)
+        self.assertIsNone(count_batch(0, 'regex', messages, words=words)[1])
+        self.test_logger.info('Completed test_count_batch')
+
+
+if __name__ == '__main__':
+    unittest.main()
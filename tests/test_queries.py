@@ -1,7 +1,11 @@
+import random
 import unittest
 import logging
+from unittest import mock
 from config import setup_logging
 from db import queries
+from db.database import session_scope
+from db.models import User, UserHasWord
 
 
 class TestQueries(unittest.TestCase):
@@ -140,6 +144,31 @@ class TestQueries(unittest.TestCase):
         self.assertNotIn(word, words, f"The word '{word}' still exists in the database.")
         self.test_logger.info('Completed test_remove_word')
 
+    def test_counts_of_removed_word_are_not_written(self):
+        """
+        Test that counts written after a word was removed do not bring the word back.
+
+        Tests:
+            - Buffered increments of a removed word are skipped
+            - Scanned counts of a removed word are skipped
+            - Counts of other words in the same write are still applied
+        """
+        self.test_logger.info('Starting test_counts_of_removed_word_are_not_written')
+        user_id = 372045873095639040
+
+        queries.add_user_ids(user_id)
+        queries.add_words('cat', 'dog')
+        queries.remove_word('cat')
+        queries.increment_user_counts({(user_id, 'cat'): 2, (user_id, 'dog'): 1})
+        queries.upsert_highest_counts({user_id: {'cat': 5}})
+        queries.save_scan_progress(1, 10, {user_id: {'cat': 3, 'dog': 1}})
+
+        self.assertEqual(queries.get_user_word_counts(user_id), [('dog', 1)])
+        self.assertEqual(queries.get_leaderboard('cat'), [])
+        self.assertEqual(queries.get_channel_word_totals(), {user_id: {'dog': 1}})
+        self.assertEqual(queries.get_total_highest_count_column(), (user_id, 'dog', 1))
+        self.test_logger.info('Completed test_counts_of_removed_word_are_not_written')
+
     def test_get_count(self):
         """
         Test retrieving word counts for user-word pairs.
@@ -187,6 +216,77 @@ class TestQueries(unittest.TestCase):
         self.assertCountEqual(retrieved_words, test_words)
         self.test_logger.info('Completed test_get_words')
 
+    def test_word_set_version(self):
+        """
+        Test that the cached words follow every change of the word set.
+
+        Tests:
+            - The words are cached while the word set is unchanged
+            - Adding and removing words changes the version and the cached words at once
+            - Removing a missing word keeps the version
+        """
+        self.test_logger.info('Starting test_word_set_version')
+        queries.add_words('word1')
+        version = queries.get_word_set_version()
+        words = queries.get_words()
+        self.assertIs(queries.get_words(), words)
+
+        queries.add_words('word2')
+        self.assertCountEqual(queries.get_words(), ['word1', 'word2'])
+        queries.remove_word('word1')
+        self.assertEqual(queries.get_words(), ['word2'])
+        self.assertEqual(queries.get_word_set_version(), version + 2)
+
+        queries.remove_word('missing')
+        self.assertEqual(queries.get_word_set_version(), version + 2)
+        self.test_logger.info('Completed test_word_set_version')
+
+    def test_count_cache(self):
+        """
+        Test that cached counts stay coherent with every query writing counts.
+
+        Tests:
+            - Repeated lookups, including of missing records, are cache hits
+            - Single and batched writes update cached counts
+            - Removing a word and dropping the tables drop its cached counts
+            - A read started before a write does not cache its stale count
+            - The least recently used count is evicted when the cache is full
+        """
+        self.test_logger.info('Starting test_count_cache')
+        queries.add_user_ids(1, 2)
+        queries.add_words('cat', 'dog')
+        stats = queries.get_count_cache_stats()
+        self.assertIsNone(queries.get_count(1, 'cat'))
+        self.assertIsNone(queries.get_count(1, 'cat'))
+        self.assertEqual(queries.get_count_cache_stats()['hits'], stats['hits'] + 1)
+        self.assertEqual(queries.get_count_cache_stats()['misses'], stats['misses'] + 1)
+
+        queries.update_user_count(1, 'cat', 2)
+        self.assertEqual(queries.get_count(1, 'cat'), 2)
+        queries.add_user_has_word(2, 'dog', 5)
+        queries.increment_user_counts({(1, 'cat'): 3, (2, 'dog'): 1})
+        queries.upsert_highest_counts({1: {'cat': 4}, 2: {'dog': 9}})
+        self.assertEqual((queries.get_count(1, 'cat'), queries.get_count(2, 'dog')), (5, 9))
+
+        queries.remove_word('cat')
+        self.assertIsNone(queries.get_count(1, 'cat'))
+        queries.drop_tables()
+        self.assertIsNone(queries.get_count(2, 'dog'))
+
+        cached, _, writes = queries.count_cache.lookup(1, 'dog')
+        self.assertFalse(cached)
+        queries.count_cache.store(2, 'dog', 1)
+        queries.count_cache.fill(1, 'dog', 7, writes)
+        self.assertFalse(queries.count_cache.lookup(1, 'dog')[0])
+
+        cache = queries.CountCache(2)
+        cache.store(1, 'cat', 1)
+        cache.store(1, 'dog', 2)
+        cache.lookup(1, 'cat')
+        cache.store(2, 'cat', 3)
+        self.assertEqual([cache.lookup(1, word)[:2] for word in ('cat', 'dog')], [(True, 1), (False, None)])
+        self.test_logger.info('Completed test_count_cache')
+
     def test_get_all_users(self):
         """
         Test retrieving all users from the database.
@@ -255,6 +355,56 @@ class TestQueries(unittest.TestCase):
         self.assertEqual(new_count, initial_count + increment)
         self.test_logger.info('Completed test_update_user_count')
 
+    def test_increment_user_counts(self):
+        """
+        Test adding many count increments at once.
+
+        Tests:
+            - Existing counts are incremented
+            - Missing user-word pairs are created with the increment
+        """
+        self.test_logger.info('Starting test_increment_user_counts')
+        user_ids = [372045873095639040, 123456789012345678]
+        word = 'word1'
+
+        queries.add_user_ids(*user_ids)
+        queries.add_words(word)
+        queries.add_user_has_word(user_ids[0], word, 5)
+        queries.increment_user_counts({(user_ids[0], word): 3, (user_ids[1], word): 2})
+
+        self.assertEqual(queries.get_count(user_ids[0], word), 8)
+        self.assertEqual(queries.get_count(user_ids[1], word), 2)
+        self.test_logger.info('Completed test_increment_user_counts')
+
+    def test_upsert_highest_counts(self):
+        """
+        Test applying scanned counts in bulk.
+
+        Tests:
+            - Missing user-word pairs are inserted
+            - Higher counts replace stored counts
+            - Lower counts never replace stored counts
+        """
+        self.test_logger.info('Starting test_upsert_highest_counts')
+        user_ids = [372045873095639040, 123456789012345678]
+        words = ['word1', 'word2']
+
+        queries.add_user_ids(*user_ids)
+        queries.add_words(*words)
+        queries.add_user_has_word(user_ids[0], words[0], 5)
+        queries.add_user_has_word(user_ids[0], words[1], 5)
+
+        modified = queries.upsert_highest_counts({
+            user_ids[0]: {words[0]: 3, words[1]: 8},
+            user_ids[1]: {words[0]: 2},
+        })
+
+        self.assertEqual(modified, 2)
+        self.assertEqual(queries.get_count(user_ids[0], words[0]), 5)
+        self.assertEqual(queries.get_count(user_ids[0], words[1]), 8)
+        self.assertEqual(queries.get_count(user_ids[1], words[0]), 2)
+        self.test_logger.info('Completed test_upsert_highest_counts')
+
     def test_check_user_has_word(self):
         """
         Test checking if a user has a specific word.
@@ -299,6 +449,105 @@ class TestQueries(unittest.TestCase):
         self.assertFalse(queries.check_user_is_admin(non_admin_id))
         self.test_logger.info('Completed test_check_user_is_admin')
 
+    def test_sync_admins(self):
+        """
+        Test that synchronizing the admins revokes admins removed from the configuration.
+
+        Tests:
+            - The given users are promoted
+            - Admins that are not given anymore are demoted, like after a restart or a reload
+            - Unknown IDs are ignored
+        """
+        self.test_logger.info('Starting test_sync_admins')
+        queries.add_user_ids(1, 2, 3)
+        queries.sync_admins(1, 2)
+        self.assertEqual(queries.get_admin_ids(), {1, 2})
+
+        queries.add_user_ids(1, 2, 3)
+        queries.sync_admins(1, 4)
+        self.assertTrue(queries.check_user_is_admin(1))
+        self.assertFalse(queries.check_user_is_admin(2))
+
+        queries._admin_ids = None
+        self.assertEqual(queries.get_admin_ids(), {1})
+        queries.sync_admins()
+        self.assertEqual(queries.get_admin_ids(), set())
+        self.test_logger.info('Completed test_sync_admins')
+
+    def test_admin_ids_follow_permission_column(self):
+        """
+        Test that the admins kept in memory never diverge from the user.permission column.
+
+        Tests:
+            - The admins are loaded from the database once
+            - Promoting users updates the admins at once, re-adding them keeps their permission
+            - Dropping the tables removes all admins
+        """
+        self.test_logger.info('Starting test_admin_ids_follow_permission_column')
+
+        def stored_admin_ids():
+            with session_scope() as session:
+                return {user.id for user in session.query(User).filter_by(permission='admin')}
+
+        queries.add_user_ids(1, 2, 3)
+        queries.add_admins(1, 2, 4)
+        self.assertEqual(queries.get_admin_ids(), stored_admin_ids())
+        self.assertEqual(queries.get_admin_ids(), {1, 2})
+
+        queries.add_user_ids(2)
+        self.assertEqual(queries.get_admin_ids(), stored_admin_ids())
+        self.assertTrue(queries.check_user_is_admin(2))
+
+        queries._admin_ids = None
+        self.assertEqual(queries.get_admin_ids(), {1, 2})
+        queries.drop_tables()
+        self.assertFalse(queries.check_user_is_admin(1))
+        self.test_logger.info('Completed test_admin_ids_follow_permission_column')
+
+    def test_leaderboard_follows_counts(self):
+        """
+        Test that the leaderboard always holds the top counts of every word.
+
+        Tests:
+            - Single, batched and scanned writes keep the top of each word exact
+            - Lowered counts and removed words update the top
+            - The highest count of all words is read from the leaderboard
+        """
+        self.test_logger.info('Starting test_leaderboard_follows_counts')
+
+        def expected_top(word):
+            with session_scope() as session:
+                return [
+                    (record.user_id, record.count)
+                    for record in session.query(UserHasWord).filter_by(word_name=word)
+                    .order_by(UserHasWord.count.desc(), UserHasWord.user_id).limit(3)
+                ]
+
+        random.seed(25)
+        words = ['cat', 'dog']
+        queries.add_user_ids(*range(1, 9))
+        queries.add_words(*words)
+        with mock.patch.object(queries, 'LEADERBOARD_SIZE', 3):
+            for step in range(60):
+                user_id, word, count = random.randint(1, 8), random.choice(words), random.randint(1, 5)
+                write = step % 4
+                if write == 0:
+                    queries.update_user_count(user_id, word, count)
+                elif write == 1:
+                    queries.increment_user_counts({(user_id, word): count, (user_id % 8 + 1, word): 1})
+                elif write == 2:
+                    queries.upsert_highest_counts({user_id: {word: count * 3}})
+                else:
+                    queries.add_user_has_word(user_id, word, count)
+                for tracked_word in words:
+                    self.assertEqual(queries.get_leaderboard(tracked_word), expected_top(tracked_word))
+
+        top_count = max(count for word in words for _, count in expected_top(word))
+        self.assertEqual(queries.get_total_highest_count_column()[2], top_count)
+        queries.remove_word('cat')
+        self.assertEqual(queries.get_leaderboard('cat'), [])
+        self.test_logger.info('Completed test_leaderboard_follows_counts')
+
     def test_get_total_highest_count_column(self):
         """
         Test retrieving the highest count across all words.
@@ -0,0 +1,128 @@
+import asyncio
+import unittest
+import logging
+from unittest import mock
+from config import setup_logging
+from db import queries
+from benchmarks.fakes import FakeBot, FakeGuild, FakeMessage, FakeTextChannel, FakeUser
+import logic
+import scan_jobs
+from scan_jobs import ScanScheduler
+
+
+class TestScanJobs(unittest.IsolatedAsyncioTestCase):
+    """
+    Test suite for the background scan scheduler.
+
+    Attributes:
+        test_logger: Logger instance for test-specific logging.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Set up class-level fixtures.
+        This method is called once before running all tests in the class.
+        """
+        setup_logging()
+        cls.test_logger = logging.getLogger('tests.scan_jobs')
+        cls.test_logger.info('Test logging configuration complete')
+
+    def setUp(self):
+        """
+        Set up test fixtures.
+        This method is called before each test method.
+        """
+        queries.drop_tables()
+        queries.add_words('cat', 'dog')
+        logic._refreshed_catalogs.clear()
+        self.alice = FakeUser(1)
+        self.bob = FakeUser(2)
+        messages = [FakeMessage(1, self.alice, 'cat dog'), FakeMessage(2, self.bob, 'dog dog')]
+        self.bot = FakeBot(FakeGuild(100, [FakeTextChannel(10, 'channel', messages)], [self.alice, self.bob]))
+        self.scheduler = ScanScheduler()
+
+    async def asyncTearDown(self):
+        """
+        Stop the scheduler after each test method.
+        """
+        await self.scheduler.stop()
+
+    def tearDown(self):
+        """
+        Clean up test fixtures.
+        This method is called after each test method.
+        """
+        queries.drop_tables()
+
+    def test_submit_merges_duplicates(self):
+        """
+        Test that queued jobs are merged when one covers the other.
+
+        Tests:
+            - The same word or user is queued once
+            - A queued full scan covers user scans
+            - A full scan replaces queued user scans and an incremental full scan
+            - An incremental full scan does not cover word scans
+            - Queued word scans are combined into one scan
+        """
+        self.test_logger.info('Starting test_submit_merges_duplicates')
+        word_job = self.scheduler.submit(target_words=['cat'])
+        self.assertIs(self.scheduler.submit(target_words=['cat']), word_job)
+        user_job = self.scheduler.submit(target_user_id=1)
+        self.assertIs(self.scheduler.submit(target_user_id=1), user_job)
+
+        incremental_job = self.scheduler.submit(incremental=True)
+        self.assertEqual(self.scheduler.jobs, [word_job, incremental_job])
+        self.assertEqual(incremental_job.merged, 3)
+        self.assertIs(self.scheduler.submit(target_user_id=2), incremental_job)
+        self.assertIs(self.scheduler.submit(target_words=['dog']), word_job)
+        self.assertEqual(word_job.target_words, {'cat', 'dog'})
+
+        full_job = self.scheduler.submit()
+        self.assertEqual(self.scheduler.jobs, [full_job])
+        self.assertEqual(full_job.merged, 8)
+        self.assertIs(self.scheduler.submit(incremental=True), full_job)
+        self.test_logger.info('Completed test_submit_merges_duplicates')
+
+    async def test_jobs_run_in_background(self):
+        """
+        Test that queued jobs run one at a time and record their progress.
+        """
+        self.test_logger.info('Starting test_jobs_run_in_background')
+        user_job = self.scheduler.submit(target_user_id=2)
+        word_job = self.scheduler.submit(target_words=['cat'])
+        self.assertEqual(self.scheduler.position(word_job), 2)
+
+        self.scheduler.start(self.bot, 100)
+        while self.scheduler.jobs[0].state in ('queued', 'running'):
+            await asyncio.sleep(0.01)
+
+        self.assertEqual([job.state for job in (user_job, word_job)], ['done', 'done'])
+        self.assertEqual(self.scheduler.jobs, [word_job, user_job])
+        self.assertEqual(user_job.messages_scanned, 2)
+        self.assertEqual(queries.get_count(2, 'dog'), 2)
+        self.assertEqual(queries.get_count(1, 'cat'), 1)
+        self.assertTrue(queries.has_scan_checkpoints())
+        self.test_logger.info('Completed test_jobs_run_in_background')
+
+    async def test_failed_job_does_not_stop_scheduler(self):
+        """
+        Test that a failing scan is recorded and the next job still runs.
+        """
+        self.test_logger.info('Starting test_failed_job_does_not_stop_scheduler')
+        scan = mock.AsyncMock(side_effect=[queries.DatabaseError('Error', None), None])
+        with mock.patch.object(scan_jobs, 'scan', scan):
+            failing_job = self.scheduler.submit(target_words=['cat'])
+            next_job = self.scheduler.submit(target_user_id=1)
+            self.scheduler.start(self.bot, 100)
+            while next_job.state in ('queued', 'running'):
+                await asyncio.sleep(0.01)
+
+        self.assertEqual(failing_job.state, 'failed')
+        self.assertEqual(next_job.state, 'done')
+        self.test_logger.info('Completed test_failed_job_does_not_stop_scheduler')
+
+
+if __name__ == '__main__':
+    unittest.main()